@@ -76,6 +76,12 @@ options:
       - A list of assets to keep in the extract
     required: true
     type: list
+  collect_metrics:
+    description:
+      - Whether to collect (and return as I(metrics)) the count, latency and volume of the REST API calls made.
+    required: false
+    type: bool
+    default: false
   cert:
     description:
       - The path to a certificate file to use for SSL verification against the server
@@ -107,12 +113,17 @@ asset_count:
   description: A numeric indication of the number of assets that were extracted
   type: int
   returned: always
+metrics:
+  description: The count, latency percentiles and volume of the REST API calls made (by endpoint), along with paging and cache hit counts
+  returned: when collect_metrics is true
+  type: dict
 '''
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils._text import to_bytes, to_native
 from ansible.module_utils.ia_rest import RestIA
 from ansible.module_utils.ia_handler import IAHandler
+import io
 import os
 import os.path
 import tempfile
@@ -128,6 +139,7 @@ def main():
         project=dict(type='str', required=True),
         dest=dict(type='path', required=True),
         assets_to_keep=dict(type='list', required=True),
+        collect_metrics=dict(type='bool', required=False, default=False),
         cert=dict(type='path', required=False),
         unsafe_writes=dict(type='bool', required=False, default=False)
     )
@@ -156,7 +168,8 @@ def main():
         password=module.params['password'],
         host=module.params['host'],
         port=module.params['port'],
-        cert=module.params['cert']
+        cert=module.params['cert'],
+        collect_metrics=module.params['collect_metrics']
     )
 
     # Execute the retrieval
@@ -169,7 +182,7 @@ def main():
     # Write temporary file with the full XML output to operate against
     try:
         tmpfd_full, tmpfile_full = tempfile.mkstemp()
-        f = os.fdopen(tmpfd_full, 'wb')
+        f = io.open(tmpfd_full, 'w', encoding='utf-8')
         f.write(xmlResults)
         f.close()
     except IOError:
@@ -231,9 +244,8 @@ def main():
     # and then move to specified dest location
     try:
         tmpfd, tmpfile = tempfile.mkstemp()
-        f = os.fdopen(tmpfd, 'wb')
+        os.close(tmpfd)
         ia_xml.writeCustomizedXML(tmpfile)
-        f.close()
     except IOError:
         module.fail_json(msg='Unable to create temporary file to output project details', **result)
 
@@ -256,6 +268,8 @@ def main():
     else:
         os.unlink(tmpfile)
 
+    iarest.recordMetrics()
+
     module.exit_json(**result)
 
 
@@ -104,6 +104,12 @@ options:
           - The replacement value for the I(attr) to use
         required: true
         type: str
+  collect_metrics:
+    description:
+      - Whether to collect (and return as I(metrics)) the count, latency and volume of the REST API calls made.
+    required: false
+    type: bool
+    default: false
   cert:
     description:
       - The path to a certificate file to use for SSL verification against the server
@@ -134,6 +140,10 @@ replacements:
   description: A numeric indication of the number of assets that were updated via mapping
   type: int
   returned: always
+metrics:
+  description: The count, latency percentiles and volume of the REST API calls made (by endpoint), along with paging and cache hit counts
+  returned: when collect_metrics is true
+  type: dict
 '''
 
 from ansible.module_utils.basic import AnsibleModule
@@ -151,6 +161,7 @@ def main():
         project=dict(type='str', required=True),
         src=dict(type='path', required=True),
         mappings=dict(type='list', required=False, default=[]),
+        collect_metrics=dict(type='bool', required=False, default=False),
         cert=dict(type='path', required=False),
         unsafe_writes=dict(type='bool', required=False, default=False)
     )
@@ -179,7 +190,8 @@ def main():
         password=module.params['password'],
         host=module.params['host'],
         port=module.params['port'],
-        cert=module.params['cert']
+        cert=module.params['cert'],
+        collect_metrics=module.params['collect_metrics']
     )
 
     mappings = module.params['mappings']
@@ -208,6 +220,8 @@ def main():
         iarest.create(xmlToSend)
         result['changed'] = True
 
+    iarest.recordMetrics()
+
     module.exit_json(**result)
 
 
@@ -83,6 +83,12 @@ options:
       - Any type IDs in the list will have their assets in completeAssetIDs.
     required: false
     type: list
+  collect_metrics:
+    description:
+      - Whether to collect (and return as I(metrics)) the count, latency and volume of the REST API calls made.
+    required: false
+    type: bool
+    default: false
   cert:
     description:
       - The path to a certificate file to use for SSL verification against the server
@@ -112,17 +118,36 @@ asset_count:
   description: A numeric indication of the number of assets that were extracted
   type: int
   returned: always
+bundle_size:
+  description: The size (in bytes) of the full set of OpenIGC assets retrieved for the bundle
+  type: int
+  returned: always
+bundle_checksum:
+  description: The SHA-1 checksum of the full set of OpenIGC assets retrieved for the bundle
+  type: str
+  returned: always
+metrics:
+  description: The count, latency percentiles and volume of the REST API calls made (by endpoint), along with paging and cache hit counts
+  returned: when collect_metrics is true
+  type: dict
 '''
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils._text import to_bytes, to_native
 from ansible.module_utils.igc_rest import RestIGC
-from ansible.module_utils.openigc_handler import OpenIGCHandler
+from ansible.module_utils.openigc_handler import OpenIGCStreamFilter
 import os
 import os.path
 import tempfile
 
 
+# Removes any of the (temporary) files that were created
+def removeFiles(filenames):
+    for filename in filenames:
+        if filename is not None and os.path.exists(filename):
+            os.unlink(filename)
+
+
 def main():
 
     module_args = dict(
@@ -134,6 +159,7 @@ def main():
         dest=dict(type='path', required=True),
         assets_to_keep=dict(type='list', required=True),
         complete_types=dict(type='list', required=False, default=[]),
+        collect_metrics=dict(type='bool', required=False, default=False),
         cert=dict(type='path', required=False),
         unsafe_writes=dict(type='bool', required=False, default=False)
     )
@@ -145,7 +171,9 @@ def main():
 
     result = dict(
         changed=False,
-        asset_count=0
+        asset_count=0,
+        bundle_size=0,
+        bundle_checksum=""
     )
 
     # if the user is working with this module in only check mode we do not
@@ -162,82 +190,51 @@ def main():
         password=module.params['password'],
         host=module.params['host'],
         port=module.params['port'],
-        cert=module.params['cert']
+        cert=module.params['cert'],
+        collect_metrics=module.params['collect_metrics']
     )
 
     complete_types = module.params['complete_types']
 
-    # Execute the retrieval
-    xmlResults = igcrest.getOpenIGCAssets(module.params['bundle_name'])
-
-    # Ensure search worked before proceeding
-    if not xmlResults:
-        module.fail_json(msg='Retrieval of OpenIGC assets failed', **result)
-
-    # Write temporary file with the full XML output to operate against
+    # Execute the retrieval, streaming the full XML output straight into a
+    # temporary file to operate against
+    tmpfile_full = None
     try:
         tmpfd_full, tmpfile_full = tempfile.mkstemp()
-        f = os.fdopen(tmpfd_full, 'wb')
-        f.write(xmlResults)
-        f.close()
+        os.close(tmpfd_full)
+        downloaded = igcrest.downloadOpenIGCAssets(module.params['bundle_name'], tmpfile_full, 'sha1')
     except IOError:
+        removeFiles([tmpfile_full])
         module.fail_json(msg='Unable to create temporary file to output OpenIGC assets', **result)
 
+    # Ensure retrieval worked before proceeding
+    if not downloaded or downloaded[0] == 0:
+        removeFiles([tmpfile_full])
+        module.fail_json(msg='Retrieval of OpenIGC assets failed', **result)
+
+    result['bundle_size'], result['bundle_checksum'] = downloaded
+
     assets_to_keep = module.params['assets_to_keep']
-    oigc_xml = OpenIGCHandler(module, result, tmpfile_full)
-
-    partial_assets = []
-    complete_assets = []
-    assets_to_drop = []
-
-    for rid in assets_to_keep:
-        e_asset = oigc_xml.getAssetById(rid)
-        asset_type = oigc_xml.getType(e_asset)
-        if asset_type in complete_types:
-            complete_assets.append(rid)
-        else:
-            partial_assets.append(rid)
-        a_ancestors = oigc_xml.getAncestralAssetRids(rid)
-        for ancenstor in a_ancestors:
-            e_ancestor = oigc_xml.getAssetById(ancenstor)
-            ancestor_type = oigc_xml.getType(e_ancestor)
-            if ancestor_type in complete_types and ancenstor not in complete_assets:
-                complete_assets.append(ancenstor)
-            elif ancenstor not in partial_assets:
-                partial_assets.append(ancenstor)
-        a_children = oigc_xml.getAssetChildrenRids(rid)
-        for child in a_children:
-            e_child = oigc_xml.getAssetById(child)
-            child_type = oigc_xml.getType(e_child)
-            if child_type in complete_types and child not in complete_assets:
-                complete_assets.append(child)
-            elif child not in partial_assets:
-                partial_assets.append(child)
-
-    for e_asset in oigc_xml.getAssets():
-        rid = oigc_xml.getRid(e_asset)
-        if rid not in partial_assets and rid not in complete_assets:
-            if rid is not None:
-                oigc_xml.dropAsset(e_asset)
-        else:
-            result['asset_count'] += 1
-
-    oigc_xml.setImportActionPartials(partial_assets)
-    oigc_xml.setImportActionCompletes(complete_assets)
 
-    # Remove the interim temporary file
-    os.unlink(tmpfile_full)
+    # Stream through the bundle rather than parsing it into memory: the first
+    # pass (on construction) indexes only the IDs, classes and references
+    oigc_xml = OpenIGCStreamFilter(module, result, tmpfile_full)
+    partial_assets, complete_assets = oigc_xml.getAssetsToKeep(assets_to_keep, complete_types)
 
-    # Write a new temporary file with the revised XML output,
-    # and then move to specified dest location
+    # Write a new temporary file with the revised XML output (as the second
+    # streaming pass), and then move to specified dest location
+    tmpfile = None
     try:
         tmpfd, tmpfile = tempfile.mkstemp()
-        f = os.fdopen(tmpfd, 'wb')
-        oigc_xml.writeCustomizedXML(tmpfile)
-        f.close()
+        os.close(tmpfd)
+        result['asset_count'] = oigc_xml.writeFilteredXML(tmpfile, partial_assets, complete_assets)
     except IOError:
+        removeFiles([tmpfile_full, tmpfile])
         module.fail_json(msg='Unable to create temporary file to output project details', **result)
 
+    # Remove the interim temporary file
+    os.unlink(tmpfile_full)
+
     # Checksumming to identify change...
     checksum_src = module.sha1(tmpfile)
     checksum_dest = None
@@ -257,6 +254,8 @@ def main():
     else:
         os.unlink(tmpfile)
 
+    igcrest.recordMetrics()
+
     module.exit_json(**result)
 
 
@@ -86,8 +86,23 @@ options:
   to_time:
     description:
       - The time (UNIX epoch style, in milliseconds) up to which to consider changes
+      - Defaults to the current time when I(since_last_run) finds a watermark.
     required: false
     type: int
+  state_file:
+    description:
+      - A file in which to keep a watermark of the latest C(modified_on) seen by this extract (by I(asset_type),
+        I(relationships), I(conditions), I(limit) and I(dev_glossary)), updated whenever the extract succeeds.
+    required: false
+    type: path
+  since_last_run:
+    description:
+      - Whether to extract only the assets changed since the watermark in the I(state_file) (ie. since the last
+        successful run of the same extract), rather than from I(from_time).
+      - If there is no watermark yet, I(from_time) is used (ie. by default every asset is extracted).
+    required: false
+    type: bool
+    default: false
   conditions:
     description:
       - A list of conditions to limit the assets for which to retrieve relationships
@@ -132,6 +147,51 @@ options:
     required: false
     type: int
     default: 100
+  workers:
+    description:
+      - The maximum number of truncated relationship lists (across all of the assets and I(relationships)) to
+        page through concurrently.
+    required: false
+    type: int
+    default: 4
+  shards:
+    description:
+      - The number of shards into which to split the extract, so that each can be run separately (eg. as a separate
+        task, or on a separate host) and the resulting files then combined using C(igc_merge_relationships).
+      - Assets are partitioned deterministically by a hash of their RID, so the same asset is always in the same shard.
+    required: false
+    type: int
+    default: 1
+  shard:
+    description:
+      - The shard to extract (from 0 up to, but not including, I(shards)).
+    required: false
+    type: int
+    default: 0
+  query_log_size:
+    description:
+      - The maximum number of the most recent queries (and updates) to return in the results.
+      - If negative, every query (and update) is returned.
+    required: false
+    type: int
+    default: 100
+  query_log:
+    description:
+      - A file into which to append every query (and update) made, as one JSON object per line.
+    required: false
+    type: path
+  trace_file:
+    description:
+      - A file into which to append a trace of the time spent in each phase of processing.
+      - The trace is in the Chrome Trace Event format, which can be opened by trace viewers like chrome://tracing or Perfetto.
+    required: false
+    type: path
+  collect_metrics:
+    description:
+      - Whether to collect (and return as I(metrics)) the count, latency and volume of the REST API calls made.
+    required: false
+    type: bool
+    default: false
   cert:
     description:
       - The path to a certificate file to use for SSL verification against the server.
@@ -179,13 +239,30 @@ EXAMPLES = '''
     limit:
       - database_table
     dest: /tmp/dbTablesOnly.json
+
+- name: retrieve all assigned_assets relationships for all terms, split across 4 hosts
+  igc_extract_relationships:
+    host: infosvr.vagrant.ibm.com
+    port: 9446
+    user: isadmin
+    password: isadmin
+    asset_type: term
+    relationships:
+      - assigned_assets
+    shards: 4
+    shard: "{{ groups['extractors'].index(inventory_hostname) }}"
+    dest: /tmp/all_{{ inventory_hostname }}.json
 '''
 
 RETURN = '''
 queries:
-  description: A list of JSON query criteria used to retrieve the assets for which to extract relationships
+  description: The most recent JSON query criteria used to retrieve the assets for which to extract relationships
   returned: always
   type: list
+query_summary:
+  description: The number of queries (and updates) made, by the shape of the query (its types, conditions and properties)
+  returned: always
+  type: dict
 asset_count:
   description: A numeric indication of the number of assets that were extracted
   type: int
@@ -194,15 +271,29 @@ relationship_count:
   description: A numeric indication of the number of relationships that were extracted
   type: int
   returned: always
+watermark:
+  description:
+    - The key of the extract's watermark in the I(state_file), its value before (C(previous)) and after (C(current)) this run,
+      and the I(from_time) and I(to_time) used
+  returned: when state_file is provided
+  type: dict
+metrics:
+  description: The count, latency percentiles and volume of the REST API calls made (by endpoint), along with paging and cache hit counts
+  returned: when collect_metrics is true
+  type: dict
 '''
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils._text import to_bytes, to_native
 from ansible.module_utils.igc_rest import RestIGC
+from ansible.module_utils.infosvr_trace import Tracer
+from ansible.module_utils.watermark_handler import WatermarkHandler
 import os
 import os.path
 import tempfile
 import json
+import time
+import zlib
 
 
 def main():
@@ -217,22 +308,33 @@ def main():
         dest=dict(type='path', required=True),
         from_time=dict(type='int', required=False, default=-1),
         to_time=dict(type='int', required=False),
+        state_file=dict(type='path', required=False),
+        since_last_run=dict(type='bool', required=False, default=False),
         conditions=dict(type='list', required=False, default=[]),
         limit=dict(type='list', required=False, default=[]),
         dev_glossary=dict(type='bool', required=False, default=False),
         batch=dict(type='int', required=False, default=100),
+        workers=dict(type='int', required=False, default=4),
+        shards=dict(type='int', required=False, default=1),
+        shard=dict(type='int', required=False, default=0),
+        query_log_size=dict(type='int', required=False, default=100),
+        query_log=dict(type='path', required=False),
+        collect_metrics=dict(type='bool', required=False, default=False),
+        trace_file=dict(type='path', required=False),
         cert=dict(type='path', required=False),
         unsafe_writes=dict(type='bool', required=False, default=False)
     )
 
     module = AnsibleModule(
         argument_spec=module_args,
+        required_if=[('since_last_run', True, ['state_file'])],
         supports_check_mode=True
     )
 
     result = dict(
         changed=False,
         queries=[],
+        query_summary={},
         asset_count=0,
         relationship_count=0
     )
@@ -243,6 +345,8 @@ def main():
     if module.check_mode:
         return result
 
+    tracer = Tracer(module.params['trace_file'], 'igc_extract_relationships')
+
     # Setup REST API connectivity via module_utils.igc_rest class
     igcrest = RestIGC(
         module,
@@ -251,7 +355,11 @@ def main():
         password=module.params['password'],
         host=module.params['host'],
         port=module.params['port'],
-        cert=module.params['cert']
+        cert=module.params['cert'],
+        query_log_size=module.params['query_log_size'],
+        query_log=module.params['query_log'],
+        collect_metrics=module.params['collect_metrics'],
+        tracer=tracer
     )
 
     relnprops = module.params['relationships']
@@ -261,6 +369,32 @@ def main():
     asset_type = module.params['asset_type']
     wfl_enabled = igcrest.isWorkflowEnabled()
 
+    shards = module.params['shards']
+    shard = module.params['shard']
+    if shards < 1 or shard < 0 or shard >= shards:
+        module.fail_json(msg='The shard must be from 0 up to (but not including) the number of shards: '
+                             + str(shard) + ' of ' + str(shards), **result)
+
+    watermarks = None
+    if module.params['state_file']:
+        watermarks = WatermarkHandler(module, result, module.params['state_file'])
+        criteria = {
+            "relationships": relnprops,
+            "conditions": module.params['conditions'],
+            "limit": limit,
+            "dev_glossary": dev_glossary
+        }
+        if shards > 1:
+            # (each shard is a separate extract, so keeps its own watermark)
+            criteria['shard'] = [shard, shards]
+        result['watermark'] = watermarks.track('igc_extract_relationships', asset_type, criteria)
+        if module.params['since_last_run']:
+            module.params['from_time'] = watermarks.getFromTime(result['watermark']['key'], module.params['from_time'])
+            if module.params['from_time'] != -1 and module.params['to_time'] is None:
+                module.params['to_time'] = int(time.time() * 1000)
+        result['watermark']['from_time'] = module.params['from_time']
+        result['watermark']['to_time'] = module.params['to_time']
+
     # Basic query
     reqJSON = {
         "properties": relnprops,
@@ -288,60 +422,85 @@ def main():
         })
     if dev_glossary and wfl_enabled and igcrest.isWorkflowType(asset_type):
         reqJSON['workflowMode'] = "draft"
+    # The watermark needs the modified_on of every asset, but it is not itself a relationship to extract
+    watermark_only = (watermarks is not None and 'modified_on' not in relnprops)
+    if watermark_only:
+        reqJSON['properties'] = relnprops + ['modified_on']
 
     # Execute the search
-    jsonResults = igcrest.search(reqJSON)
+    with tracer.span("search_assets", asset_type=asset_type):
+        jsonResults = igcrest.search(reqJSON, minify=minifyAsset,
+                                     keep=getShardFilter(shards, shard) if shards > 1 else None)
 
     # Ensure search worked before proceeding
     if jsonResults == '':
+        igcrest.recordMetrics()
         module.fail_json(msg='Initial IGC REST API search failed', **result)
 
     result['asset_count'] = len(jsonResults)
-
+    if watermarks is not None:
+        watermarks.observeAssets(result['watermark']['key'], jsonResults)
+
+    # Limit included relationships to only those types of interest, as each page of them is retrieved
+    # (by the concrete type of every relation -- the type declared for a relationship can be a supertype)
+    keepRelations = {}
+    for relnprop in relnprops:
+        keepRelations[relnprop] = getLimitFilter(limit) if len(limit) > 0 else None
+
+    # Gather up every relationship list that was truncated, so that they can all be paged through concurrently
+    truncated = []
+    singular = []
     for item in jsonResults:
-        minifyItem(item)
-        for itmCtx in item['_context']:
-            minifyItem(itmCtx)
+        if watermark_only:
+            item.pop('modified_on', None)
         for relnprop in relnprops:
+            keep = keepRelations[relnprop]
             # Not all relationships are lists, some are singular; but we will wrap for ease of processing below
-            bSingleRelation = False
             if 'items' in item[relnprop]:
-                item[relnprop] = igcrest.getAllPages(item[relnprop]['items'],
-                                                     item[relnprop]['paging'],
-                                                     (dev_glossary and wfl_enabled))
+                paging = item[relnprop]['paging']
+                relations = item[relnprop]['items']
+                if keep is not None:
+                    relations = [relation for relation in relations if keep(relation)]
+                item[relnprop] = relations
+                if 'next' in paging:
+                    truncated.append((item, relnprop, paging))
             elif '_id' in item[relnprop]:
-                item[relnprop] = [item[relnprop]]
-                bSingleRelation = True
+                item[relnprop] = [item[relnprop]] if keep is None or keep(item[relnprop]) else []
+                singular.append((item, relnprop))
             else:
                 item[relnprop] = []
-                bSingleRelation = True
-            aRemoveIndices = []
-            iIdx = 0
+                singular.append((item, relnprop))
+
+    # (each list is only ever extended by the one worker paging through it, so the order remains deterministic)
+    def page_relationships(entry):
+        item, relnprop, paging = entry
+        with tracer.span("page_relationships", "paging", property=relnprop):
+            return igcrest.getAllPages(item[relnprop], paging, (dev_glossary and wfl_enabled),
+                                       keep=keepRelations[relnprop])
+
+    igcrest.mapConcurrently(page_relationships, truncated, module.params['workers'])
+
+    for item in jsonResults:
+        for relnprop in relnprops:
             for relation in item[relnprop]:
-                # Limit included relationships to only those types of interest
-                if (len(limit) > 0) and not (relation['_type'] in limit):
-                    aRemoveIndices.append(iIdx)
-                else:
+                with tracer.span("resolve_context", "context", asset_type=relation['_type']):
                     relnCtx = igcrest.getContextForItem(relation, (dev_glossary and wfl_enabled), batch=batch)
-                    if relnCtx == '':
-                        module.fail_json(msg='Unable to retieve context for search result', **result)
-                    else:
-                        minifyItem(relation)
-                        for ctx in relnCtx:
-                            minifyItem(ctx)
-                        result['relationship_count'] += 1
-                        relation['_context'] = relnCtx
-                iIdx += 1
-            iIdx = 0
-            for removal in aRemoveIndices:
-                del item[relnprop][removal - iIdx]
-                iIdx += 1
-            # Unbundle single relationships back out of their arrays
-            if bSingleRelation:
-                if len(item[relnprop]) > 0:
-                    item[relnprop] = item[relnprop][0]
+                if relnCtx == '':
+                    igcrest.recordMetrics()
+                    module.fail_json(msg='Unable to retieve context for search result', **result)
                 else:
-                    item[relnprop] = {}
+                    minifyItem(relation)
+                    for ctx in relnCtx:
+                        minifyItem(ctx)
+                    result['relationship_count'] += 1
+                    relation['_context'] = relnCtx
+
+    # Unbundle single relationships back out of their arrays
+    for item, relnprop in singular:
+        if len(item[relnprop]) > 0:
+            item[relnprop] = item[relnprop][0]
+        else:
+            item[relnprop] = {}
 
     # Close the IGC REST API session
     igcrest.closeSession()
@@ -349,10 +508,11 @@ def main():
     # Write temporary file with the JSON output,
     # and then move to specified dest location
     try:
-        tmpfd, tmpfile = tempfile.mkstemp()
-        f = os.fdopen(tmpfd, 'wb')
-        json.dump(jsonResults, f)
-        f.close()
+        with tracer.span("write_output"):
+            tmpfd, tmpfile = tempfile.mkstemp()
+            f = os.fdopen(tmpfd, 'w')
+            json.dump(jsonResults, f)
+            f.close()
     except IOError:
         module.fail_json(msg='Unable to create temporary file to output relationship results', **result)
 
@@ -375,9 +535,33 @@ def main():
     else:
         os.unlink(tmpfile)
 
+    tracer.write()
+
+    if watermarks is not None:
+        watermarks.save()
+
     module.exit_json(**result)
 
 
+# Returns a function that is true only for relationships to one of the limited asset types
+def getLimitFilter(limit):
+    limit_types = set(limit)
+    return lambda relation: relation['_type'] in limit_types
+
+
+# Returns a function that is true only for the assets in the shard (by a
+# hash of their RID, which is stable across runs, hosts and Python versions)
+def getShardFilter(shards, shard):
+    return lambda asset: (zlib.crc32(to_bytes(asset['_id'])) & 0xffffffff) % shards == shard
+
+
+# (applied to each page of search results as it is retrieved)
+def minifyAsset(asset):
+    minifyItem(asset)
+    for ctx in asset['_context']:
+        minifyItem(ctx)
+
+
 def minifyItem(asset):
     if '_id' in asset:
         del asset['_id']
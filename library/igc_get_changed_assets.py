@@ -64,18 +64,45 @@ options:
     description:
       - The IGC REST asset type (eg. C(term)) for which to retrieve relationships.
       - (See "GET /ibm/iis/igc-rest/v1/types" in your environment for choices.)
-    required: true
+      - Either this or I(asset_types) is required.
+    required: false
     type: str
+  asset_types:
+    description:
+      - A list of IGC REST asset types for which to retrieve changes in a single invocation (over a single session,
+        searching up to I(workers) types concurrently), rather than only the one I(asset_type).
+      - Each entry is either the name of the asset type, or an object with the asset type's C(type) and optionally
+        its own C(from_time) and C(conditions) (which are in addition to any I(conditions) given for all types).
+    required: false
+    type: list
   from_time:
     description:
       - The time (UNIX epoch style, in milliseconds) from which to consider changes
-    required: true
+      - Required unless I(since_last_run) (or a C(from_time) is given for every entry in I(asset_types)), and with
+        I(since_last_run) it is only used if there is no watermark yet.
+    required: false
     type: int
   to_time:
     description:
       - The time (UNIX epoch style, in milliseconds) up to which to consider changes
-    required: true
+      - Required unless I(since_last_run), in which case it defaults to the current time.
+    required: false
     type: int
+  state_file:
+    description:
+      - A file in which to keep a watermark of the latest C(modified_on) seen by this export (by I(asset_type),
+        I(conditions) and I(change_paths)), updated whenever the export succeeds.
+      - Where changes along a path are detected regardless of the asset itself (eg. for an C(application)), the
+        C(modified_on) along those paths is included in the watermark as well (up to I(to_time)).
+    required: false
+    type: path
+  since_last_run:
+    description:
+      - Whether to consider only the changes since the watermark in the I(state_file) (ie. since the last
+        successful run of the same export), rather than from I(from_time).
+    required: false
+    type: bool
+    default: false
   conditions:
     description:
       - A list of other conditions by which to limit the assets retrieved
@@ -100,12 +127,68 @@ options:
           - The value to compare the I(property) to, based on the I(operator)
         required: true
         type: str
+  change_paths:
+    description:
+      - Additional relationship paths (from the I(asset_type), eg. C(database_tables.database_columns)) along which
+        a change to a related asset should also be considered a change to the asset itself.
+      - These extend any paths already checked for the I(asset_type) (eg. the schemas, tables and columns of a
+        database).
+    required: false
+    type: list
+    default: []
+  query_shape:
+    description:
+      - How to query for changes along nested relationship paths (see I(change_paths)).
+      - C(combined) makes a single search, OR'ing together a condition for every path.
+      - C(split) makes one narrower search per path instead (concurrently, up to I(workers) at a time), each
+        re-rooted where possible onto the related type (eg. "columns modified in the window", whose database
+        is then taken from their context); the assets found are then retrieved in a final search by their RIDs.
+      - C(split) avoids the very large joins a C(combined) search can require of the repository (eg. for
+        large databases), at the cost of more (but simpler) searches.
+    required: false
+    type: str
+    choices: [ "combined", "split" ]
+    default: combined
+  workers:
+    description:
+      - The maximum number of searches to run concurrently, across the I(asset_types) and (when the I(query_shape)
+        is C(split)) the paths of each.
+      - The workers are first shared out between the I(asset_types), and each type's share is then used for the
+        searches of its paths (eg. 8 workers across 2 types search up to 4 paths of each type at a time).
+      - Any value less than 1 searches one at a time.
+    required: false
+    type: int
+    default: 4
   batch:
     description:
       - The number of assets to retrieve per REST API call
     required: false
     type: int
     default: 100
+  query_log_size:
+    description:
+      - The maximum number of the most recent queries (and updates) to return in the results.
+      - If negative, every query (and update) is returned.
+    required: false
+    type: int
+    default: 100
+  query_log:
+    description:
+      - A file into which to append every query (and update) made, as one JSON object per line.
+    required: false
+    type: path
+  trace_file:
+    description:
+      - A file into which to append a trace of the time spent in each phase of processing.
+      - The trace is in the Chrome Trace Event format, which can be opened by trace viewers like chrome://tracing or Perfetto.
+    required: false
+    type: path
+  collect_metrics:
+    description:
+      - Whether to collect (and return as I(metrics)) the count, latency and volume of the REST API calls made.
+    required: false
+    type: bool
+    default: false
   cert:
     description:
       - The path to a certificate file to use for SSL verification against the server.
@@ -144,26 +227,261 @@ EXAMPLES = '''
     conditions:
       - { "property": "transformation_project.name", "operator": "=", "value": "dstage1" }
   register: dsjobs_in_dstage1_changed_in_last_48hrs
+
+- name: retrieve all changed DataStage assets in 'dstage1' project over the last 48-hours, in one invocation
+  igc_get_changed_assets:
+    host: infosvr.vagrant.ibm.com
+    port: 9446
+    user: isadmin
+    password: isadmin
+    asset_types:
+      - dsjob
+      - routine
+      - shared_container
+      - parameter_set
+      - type: table_definition
+        conditions:
+          - { "property": "data_source_type", "operator": "=", "value": "DB2" }
+    from_time: >
+              {{ ( (ansible_date_time.epoch | int) * 1000) - (48 * 3600 * 1000) ) | int }}
+    to_time: >
+              {{ ansible_date_time.epoch * 1000 | int }}
+    conditions:
+      - { "property": "transformation_project.name", "operator": "=", "value": "dstage1" }
+  register: datastage_in_dstage1_changed_in_last_48hrs
 '''
 
 RETURN = '''
 queries:
-  description: A list of JSON query criteria used to retrieve the assets for which to extract relationships
+  description: The most recent JSON query criteria used to retrieve the assets for which to extract relationships
   returned: always
   type: list
+query_summary:
+  description: The number of queries (and updates) made, by the shape of the query (its types, conditions and properties)
+  returned: always
+  type: dict
 asset_count:
   description: A numeric indication of the number of assets that were found based on the provided criteria
   type: int
   returned: always
 assets:
-  description: A list of JSON objects representing the assets retrieved based on the provided criteria
+  description: A list of JSON objects representing the assets retrieved based on the provided criteria (of every asset type, in the order of I(asset_types))
   type: list
   returned: always
+assets_by_type:
+  description: The same assets, as a list for each asset type
+  type: dict
+  returned: when asset_types is provided
+watermark:
+  description:
+    - The key of the export's watermark in the I(state_file), its value before (C(previous)) and after (C(current)) this run,
+      and the I(from_time) and I(to_time) used
+  returned: when state_file is provided (with asset_type)
+  type: dict
+watermarks:
+  description: The same details as I(watermark), along with the C(asset_type), for each of the I(asset_types)
+  returned: when state_file is provided (with asset_types)
+  type: list
+branches:
+  description:
+    - The searches made when the I(query_shape) is C(split) -- the asset type and path of each, the type it was re-rooted onto (if any)
+      and the number of candidate assets it found
+  returned: when query_shape is split
+  type: list
+metrics:
+  description: The count, latency percentiles and volume of the REST API calls made (by endpoint), along with paging and cache hit counts
+  returned: when collect_metrics is true
+  type: dict
 '''
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.igc_rest import RestIGC
-from ansible.module_utils.infosvr_types import get_properties, get_asset_extract_object
+from ansible.module_utils.infosvr_trace import Tracer
+from ansible.module_utils.watermark_handler import WatermarkHandler
+from ansible.module_utils.infosvr_types import get_properties, get_extract_properties, get_asset_extract_object, \
+    minify_for_extract, get_change_conditions, get_change_branches, get_change_self_conditions
+import copy
+import time
+
+# The maximum number of RIDs to retrieve in each search by RIDs (when the query shape is split)
+ID_QUERY_CHUNK = 1000
+
+
+# Finds the RIDs of the candidate assets changed along one branch: re-rooted
+# onto the related type where possible (taking the nearest asset of the type
+# from the context of each related asset found), otherwise searching the asset
+# type directly -- re-rooted candidates are not restricted by the user's
+# conditions, which are only applied when the candidates are retrieved
+def searchBranch(igcrest, reqJSON, asset_type, branch):
+    path_condition = branch['conditions'][0]
+    if branch['related_type'] is not None and path_condition['operator'] == "between":
+        related = igcrest.search({
+            "properties": [],
+            "types": [branch['related_type']],
+            "where": {
+                "conditions": [{
+                    "min": path_condition['min'],
+                    "max": path_condition['max'],
+                    "property": "modified_on",
+                    "operator": "between"
+                }],
+                "operator": "and"
+            },
+            "pageSize": reqJSON['pageSize']
+        })
+        if related != '':
+            rids = []
+            seen = set()
+            for item in related:
+                ctx_rids = [ctx['_id'] for ctx in item.get('_context', []) if ctx['_type'] == asset_type]
+                if len(ctx_rids) == 0:
+                    # (the related assets are not contained within the asset type, so cannot be re-rooted)
+                    rids = None
+                    break
+                # (the context runs from the root down, so the last is the asset that directly holds the related asset)
+                if ctx_rids[-1] not in seen:
+                    seen.add(ctx_rids[-1])
+                    rids.append(ctx_rids[-1])
+            if rids is not None:
+                return {"rids": rids, "rerooted": True}
+    query = copy.deepcopy(reqJSON)
+    query['properties'] = []
+    query['where']['conditions'] = branch['conditions'] + reqJSON['where']['conditions']
+    found = igcrest.search(query)
+    if found == '':
+        return None
+    return {"rids": [item['_id'] for item in found], "rerooted": False}
+
+
+# Searches for changes one branch (path) at a time, concurrently, and then
+# retrieves the union of the assets they found -- returning '' if any failed
+def searchChangesSplit(igcrest, module, reqJSON, search, branches):
+    asset_type = search['asset_type']
+    for branch in branches:
+        # (resolved up-front, so that the type definitions are only retrieved once)
+        branch['related_type'] = None
+        if branch['path'] is not None:
+            branch['related_type'] = igcrest.getRelatedType(asset_type, branch['path'])
+
+    def search_branch(branch):
+        with igcrest.tracer.span("search_branch", asset_type=asset_type, path=branch['path']):
+            return searchBranch(igcrest, reqJSON, asset_type, branch)
+
+    outcomes = igcrest.mapConcurrently(search_branch, branches, search['workers'])
+    candidates = []
+    seen = set()
+    search['branches'] = []
+    for branch, outcome in zip(branches, outcomes):
+        if outcome is None:
+            return ''
+        search['branches'].append({
+            "asset_type": asset_type,
+            "path": branch['path'],
+            "rerooted_type": branch['related_type'] if outcome['rerooted'] else None,
+            "candidate_count": len(outcome['rids'])
+        })
+        for rid in outcome['rids']:
+            if rid not in seen:
+                seen.add(rid)
+                candidates.append(rid)
+
+    # Retrieve the candidates that themselves meet every other condition (including
+    # the user's own, so that re-rooted candidates are intersected with those too)
+    self_conditions = get_change_self_conditions(
+        asset_type,
+        search['from_time'],
+        search['to_time'],
+        module.params['change_paths']
+    )
+
+    def search_ids(rids):
+        query = copy.deepcopy(reqJSON)
+        query['where']['conditions'] = self_conditions + reqJSON['where']['conditions'] + [{
+            "property": "_id",
+            "operator": "in",
+            "value": rids
+        }]
+        return igcrest.search(query, minify=minify_for_extract)
+
+    chunks = [candidates[i:i + ID_QUERY_CHUNK] for i in range(0, len(candidates), ID_QUERY_CHUNK)]
+    jsonResults = []
+    for found in igcrest.mapConcurrently(search_ids, chunks, search['workers']):
+        if found == '':
+            return ''
+        jsonResults += found
+    return jsonResults
+
+
+# Searches for the changes to a single asset type (in the shape requested),
+# returning '' if the search failed -- this may run concurrently with the
+# searches for other asset types, so must not itself fail the module
+def searchChanges(igcrest, module, search):
+    asset_type = search['asset_type']
+
+    # Basic query (retrieving only the properties needed to extract the assets, and to track their watermark)
+    if search['watermark'] is not None:
+        properties = get_properties(asset_type, module.params['change_paths'])
+    else:
+        properties = get_extract_properties(asset_type)
+    reqJSON = {
+        "properties": properties,
+        "types": search['types'],
+        "where": {
+            "conditions": list(search['conditions']),
+            "operator": "and"
+        },
+        "pageSize": module.params['batch']
+    }
+
+    branches = get_change_branches(
+        asset_type,
+        search['from_time'],
+        search['to_time'],
+        module.params['change_paths']
+    )
+    split = (module.params['query_shape'] == 'split' and any(b['path'] is not None for b in branches))
+
+    with igcrest.tracer.span("search_changes", asset_type=asset_type, shape=module.params['query_shape']):
+        if split:
+            return searchChangesSplit(igcrest, module, reqJSON, search, branches)
+        # Detect changes to the asset (and, for some types, to their underlying granular
+        # assets as well -- see asset_type_to_change_paths in module_utils.infosvr_types)
+        reqJSON['where']['conditions'] = get_change_conditions(
+            asset_type,
+            search['from_time'],
+            search['to_time'],
+            module.params['change_paths']
+        ) + reqJSON['where']['conditions']
+        return igcrest.search(reqJSON, minify=minify_for_extract)
+
+
+# Normalises the asset types requested (singly, or as a list of names or of
+# objects with their own from_time and conditions) into one search per type
+def getSearches(module):
+    if module.params['asset_type'] is not None:
+        requested = [{"type": module.params['asset_type']}]
+    else:
+        requested = []
+        for entry in module.params['asset_types']:
+            if not isinstance(entry, dict):
+                entry = {"type": entry}
+            if 'type' not in entry:
+                module.fail_json(msg='Every entry in asset_types must specify a type: ' + str(entry))
+            requested.append(entry)
+    searches = []
+    for entry in requested:
+        from_time = entry.get('from_time', module.params['from_time'])
+        if from_time is None and not module.params['since_last_run']:
+            module.fail_json(msg='A from_time is required (unless since_last_run) for asset type: ' + entry['type'])
+        searches.append({
+            "asset_type": entry['type'],
+            "types": [entry['type']],
+            "from_time": int(from_time) if from_time is not None else None,
+            "to_time": module.params['to_time'],
+            "conditions": module.params['conditions'] + entry.get('conditions', []),
+            "watermark": None
+        })
+    return searches
 
 
 def main():
@@ -173,22 +491,39 @@ def main():
         port=dict(type='str', required=True),
         user=dict(type='str', required=True),
         password=dict(type='str', required=True, no_log=True),
-        asset_type=dict(type='str', required=True),
-        from_time=dict(type='int', required=True),
-        to_time=dict(type='int', required=True),
+        asset_type=dict(type='str', required=False),
+        asset_types=dict(type='list', required=False),
+        from_time=dict(type='int', required=False),
+        to_time=dict(type='int', required=False),
+        state_file=dict(type='path', required=False),
+        since_last_run=dict(type='bool', required=False, default=False),
         conditions=dict(type='list', required=False, default=[]),
+        change_paths=dict(type='list', required=False, default=[]),
+        query_shape=dict(type='str', required=False, default='combined', choices=['combined', 'split']),
+        workers=dict(type='int', required=False, default=4),
+        query_log_size=dict(type='int', required=False, default=100),
+        query_log=dict(type='path', required=False),
+        collect_metrics=dict(type='bool', required=False, default=False),
+        trace_file=dict(type='path', required=False),
         cert=dict(type='path', required=False),
         batch=dict(type='int', required=False, default=100)
     )
 
     module = AnsibleModule(
         argument_spec=module_args,
+        mutually_exclusive=[['asset_type', 'asset_types']],
+        required_one_of=[['asset_type', 'asset_types']],
+        required_if=[
+            ('since_last_run', False, ['to_time']),
+            ('since_last_run', True, ['state_file'])
+        ],
         supports_check_mode=True
     )
 
     result = dict(
         changed=False,
         queries=[],
+        query_summary={},
         assets=[]
     )
 
@@ -198,6 +533,8 @@ def main():
     if module.check_mode:
         return result
 
+    tracer = Tracer(module.params['trace_file'], 'igc_get_changed_assets')
+
     # Setup REST API connectivity via module_utils.igc_rest class
     igcrest = RestIGC(
         module,
@@ -206,336 +543,101 @@ def main():
         password=module.params['password'],
         host=module.params['host'],
         port=module.params['port'],
-        cert=module.params['cert']
+        cert=module.params['cert'],
+        query_log_size=module.params['query_log_size'],
+        query_log=module.params['query_log'],
+        collect_metrics=module.params['collect_metrics'],
+        tracer=tracer
     )
 
-    conditions = module.params['conditions']
-    asset_type = module.params['asset_type']
-
-    # Basic query
-    reqJSON = {
-        "properties": get_properties(asset_type),
-        "types": [asset_type],
-        "where": {
-            "conditions": [],
-            "operator": "and"
-        },
-        "pageSize": module.params['batch']
-    }
-
-    # Handle extended data sources in special way (to catch any changes in their underlying
-    # granular assets as well) -- requires nested OR'd conditions to check for changes
-    if asset_type.startswith('$'):
-        a_types = igcrest.getTypesForOpenIGCBundle(asset_type)
-        if not a_types:
-            module.fail_json(msg='Unable to find specified OpenIGC bundle: ' + asset_type, **result)
-        reqJSON['types'] = a_types
-        reqJSON['where']['conditions'].append({"conditions": [], "operator": "or"})
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "modified_on",
-            "operator": "between"
-        })
-    elif asset_type == 'application':
-        reqJSON['where']['conditions'].append({"conditions": [], "operator": "or"})
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "object_types.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "object_types.methods.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "object_types.methods.input_parameters.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "object_types.methods.output_values.modified_on",
-            "operator": "between"
-        })
-    # Handle stored procedures in special way (to catch any changes in their underlying
-    # granular assets as well) -- requires nested OR'd conditions to check for changes
-    elif asset_type == 'stored_procedure_definition':
-        reqJSON['where']['conditions'].append({"conditions": [], "operator": "or"})
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "in_parameters.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "out_parameters.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "inout_parameters.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "result_columns.modified_on",
-            "operator": "between"
-        })
-    # Handle IA data rules in special way (to catch any changes in underlying execution runs)
-    # -- requires nested OR'd condition to check for changes
-    elif asset_type == 'data_rule' or asset_type == 'data_rule_set' or asset_type == 'metric':
-        reqJSON['where']['conditions'].append({"conditions": [], "operator": "or"})
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "property": "execution_history",
-            "operator": "isNull"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "execution_history.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "modified_on",
-            "operator": "between"
-        })
-    # Handle LDM objects in special way (to catch any changes in underlying objects)
-    # -- requires nested OR'd condition to check for changes
-    elif asset_type == 'logical_data_model':
-        reqJSON['where']['conditions'].append({"conditions": [], "operator": "or"})
-        reqJSON['where']['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "contains_logical_data_models.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "subject_areas.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "logical_entities.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "logical_domains.modified_on",
-            "operator": "between"
-        })
-    # Handle PDM objects in special way (to catch any changes in underlying objects)
-    # -- requires nested OR'd condition to check for changes
-    elif asset_type == 'physical_data_model':
-        reqJSON['where']['conditions'].append({"conditions": [], "operator": "or"})
-        reqJSON['where']['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "contains_physical_models.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "contains_design_tables.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "contains_design_views.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "contains_design_stored_procedures.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "physical_domains.modified_on",
-            "operator": "between"
-        })
-    # Handle Database objects in special way (to catch any changes in underlying objects)
-    # -- requires nested OR'd condition to check for changes
-    elif asset_type == 'database':
-        reqJSON['where']['conditions'].append({"conditions": [], "operator": "or"})
-        reqJSON['where']['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "database_schemas.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "database_schemas.stored_procedures.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "database_schemas.views.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "database_schemas.database_tables.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "database_schemas.database_tables.database_columns.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "database_schemas.views.database_columns.modified_on",
-            "operator": "between"
-        })
-    # Handle Schema objects in special way (to catch any changes in underlying objects)
-    # -- requires nested OR'd condition to check for changes
-    elif asset_type == 'database_schema':
-        reqJSON['where']['conditions'].append({"conditions": [], "operator": "or"})
-        reqJSON['where']['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "stored_procedures.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "views.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "database_tables.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "database_tables.database_columns.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "views.database_columns.modified_on",
-            "operator": "between"
-        })
-    # Handle data file objects in special way (to catch any changes in underlying objects)
-    # -- requires nested OR'd condition to check for changes
-    elif asset_type == 'data_file':
-        reqJSON['where']['conditions'].append({"conditions": [], "operator": "or"})
-        reqJSON['where']['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "data_file_records.modified_on",
-            "operator": "between"
-        })
-        reqJSON['where']['conditions'][0]['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "data_file_records.data_file_fields.modified_on",
-            "operator": "between"
-        })
-    # Skip delta detection on the assets named in this condition, as they have no 'modified_on' to query against
-    elif asset_type != 'label':
-        reqJSON['where']['conditions'].append({
-            "min": module.params['from_time'],
-            "max": module.params['to_time'],
-            "property": "modified_on",
-            "operator": "between"
-        })
-
-    # Extend basic query with any optional conditions (in the outer, AND'd portion)
-    if len(conditions) > 0:
-        reqJSON['where']['conditions'] += conditions
-
-    jsonResults = igcrest.search(reqJSON)
-
-    # Ensure search worked before proceeding
-    if jsonResults == '':
-        module.fail_json(msg='Initial IGC REST API search failed', **result)
-
-    result['asset_count'] = len(jsonResults)
+    searches = getSearches(module)
+    multi = module.params['asset_types'] is not None
+    # (anything less than one worker runs every search in turn)
+    workers = max(1, module.params['workers'])
+
+    watermarks = None
+    if module.params['state_file']:
+        watermarks = WatermarkHandler(module, result, module.params['state_file'])
+        if module.params['since_last_run'] and module.params['to_time'] is None:
+            module.params['to_time'] = int(time.time() * 1000)
+        for search in searches:
+            search['watermark'] = watermarks.track(
+                'igc_get_changed_assets',
+                search['asset_type'],
+                {"conditions": search['conditions'], "change_paths": module.params['change_paths']}
+            )
+            if module.params['since_last_run']:
+                search['from_time'] = watermarks.getFromTime(search['watermark']['key'], search['from_time'] or 0)
+            search['to_time'] = module.params['to_time']
+            search['watermark']['from_time'] = search['from_time']
+            search['watermark']['to_time'] = search['to_time']
+        if multi:
+            result['watermarks'] = []
+            for search in searches:
+                search['watermark']['asset_type'] = search['asset_type']
+                result['watermarks'].append(search['watermark'])
+        else:
+            result['watermark'] = searches[0]['watermark']
+
+    for search in searches:
+        # Handle extended data sources in special way (to catch any changes across all of the bundle's types)
+        if search['asset_type'].startswith('$'):
+            a_types = igcrest.getTypesForOpenIGCBundle(search['asset_type'])
+            if not a_types:
+                igcrest.recordMetrics()
+                module.fail_json(msg='Unable to find specified OpenIGC bundle: ' + search['asset_type'], **result)
+            search['types'] = a_types
+        # (the workers are shared out between the asset types, when their searches run concurrently)
+        search['workers'] = max(1, workers // min(workers, len(searches)))
+
+    # Search for the changes to every asset type concurrently, over the same session -- each
+    # split search then runs its own (inner) pool of the workers it was given, so that there
+    # are never more than (about) the number of workers requested searching at once
+    outcomes = igcrest.mapConcurrently(
+        lambda search: searchChanges(igcrest, module, search),
+        searches,
+        workers
+    )
 
-    # Translate the retrieved item details into exportable strings
-    for item in jsonResults:
-        result_obj = get_asset_extract_object(module.params['asset_type'], item)
-        if result_obj == "UNIMPLEMENTED":
-            module.fail_json(msg='Unable to convert asset_type "' + module.params['asset_type'] + '"', **result)
-        elif result_obj is not None:
-            result['assets'].append(result_obj)
+    result['asset_count'] = 0
+    if multi:
+        result['assets_by_type'] = {}
+    for search, jsonResults in zip(searches, outcomes):
+        asset_type = search['asset_type']
+
+        # Ensure search worked before proceeding
+        if jsonResults == '':
+            msg = 'Initial IGC REST API search failed'
+            if multi:
+                msg += ' for asset type: ' + asset_type
+            igcrest.recordMetrics()
+            module.fail_json(msg=msg, **result)
+
+        if 'branches' in search:
+            result.setdefault('branches', []).extend(search['branches'])
+        if watermarks is not None:
+            watermarks.observeAssets(search['watermark']['key'], jsonResults)
+
+        # Translate the retrieved item details into exportable strings
+        assets = []
+        with tracer.span("translate_assets", asset_type=asset_type, count=len(jsonResults)):
+            for item in jsonResults:
+                result_obj = get_asset_extract_object(asset_type, item)
+                if result_obj == "UNIMPLEMENTED":
+                    module.fail_json(msg='Unable to convert asset_type "' + asset_type + '"', **result)
+                elif result_obj is not None:
+                    assets.append(result_obj)
+        result['asset_count'] += len(jsonResults)
+        result['assets'] += assets
+        if multi:
+            result['assets_by_type'].setdefault(asset_type, []).extend(assets)
 
     # Close the IGC REST API session
     igcrest.closeSession()
+    tracer.write()
+
+    if watermarks is not None:
+        watermarks.save()
 
     module.exit_json(**result)
 
@@ -99,6 +99,12 @@ options:
           - The replacement value for the I(property) to use
         required: true
         type: str
+  collect_metrics:
+    description:
+      - Whether to collect (and return as I(metrics)) the count, latency and volume of the REST API calls made.
+    required: false
+    type: bool
+    default: false
   cert:
     description:
       - The path to a certificate file to use for SSL verification against the server.
@@ -131,6 +137,10 @@ untranslated_relationships:
   description: A list of the untranslated relationships (did not match provided relationship property)
   type: list
   returned: always
+metrics:
+  description: The count, latency percentiles and volume of the REST API calls made (by endpoint), along with paging and cache hit counts
+  returned: when collect_metrics is true
+  type: dict
 '''
 
 
@@ -138,11 +148,13 @@ from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils._text import to_bytes, to_native
 from ansible.module_utils.igc_rest import RestIGC
 from ansible.module_utils.infosvr_types import get_mapped_value
+from ansible.module_utils.six import PY3
 import tempfile
 import os
 import os.path
 import json
 import csv
+import io
 
 
 def main():
@@ -155,6 +167,7 @@ def main():
         src=dict(type='path', required=True),
         dest=dict(type='path', required=True),
         mappings=dict(type='list', required=False, default=[]),
+        collect_metrics=dict(type='bool', required=False, default=False),
         cert=dict(type='path', required=False),
         unsafe_writes=dict(type='bool', required=False, default=False)
     )
@@ -185,7 +198,8 @@ def main():
         password=module.params['password'],
         host=module.params['host'],
         port=module.params['port'],
-        cert=module.params['cert']
+        cert=module.params['cert'],
+        collect_metrics=module.params['collect_metrics']
     )
 
     mappings = module.params['mappings']
@@ -257,7 +271,8 @@ def main():
     # and then move to specified dest location
     try:
         tmpfd, tmpfile = tempfile.mkstemp()
-        f = os.fdopen(tmpfd, 'wb')
+        # (the csv module writes str: text without newline translation on Python 3, bytes on Python 2)
+        f = io.open(tmpfd, 'w', newline='', encoding='utf-8') if PY3 else os.fdopen(tmpfd, 'wb')
         f.write("+++ " + asset_name + " - begin +++\n")
         writer = csv.DictWriter(f, fieldnames=aHeader)
         writer.writeheader()
@@ -72,6 +72,34 @@ options:
       - If empty, every asset will be loaded as defined in the I(src) partials / completes.
     required: false
     type: list
+  chunk_size:
+    description:
+      - The (approximate) maximum number of assets to include in each upload request.
+      - Assets are uploaded in dependency order, so that ancestors are always loaded before their children.
+      - Any asset of one of the I(complete_types) is always uploaded together with all of its children.
+      - If 0, all assets are uploaded in a single request.
+    required: false
+    type: int
+    default: 0
+  workers:
+    description:
+      - The number of chunks to upload concurrently (only chunks without any dependencies between them are uploaded concurrently).
+    required: false
+    type: int
+    default: 1
+  return_payload:
+    description:
+      - Whether to return the XML that was used to load the assets (as I(uploaded_xml)).
+      - By default only the size and checksum of the XML are returned, as the XML itself can be very large.
+    required: false
+    type: bool
+    default: false
+  collect_metrics:
+    description:
+      - Whether to collect (and return as I(metrics)) the count, latency and volume of the REST API calls made.
+    required: false
+    type: bool
+    default: false
   cert:
     description:
       - The path to a certificate file to use for SSL verification against the server.
@@ -100,7 +128,25 @@ rids:
 uploaded_xml:
   description: the XML string that was used to load the assets
   type: string
+  returned: when return_payload is true
+uploaded_size:
+  description: The size (in bytes) of the XML that was used to load the assets (across all chunks)
+  type: int
+  returned: always
+uploaded_checksum:
+  description:
+    - The SHA-1 checksum of the XML that was used to load the assets.
+    - When uploaded in chunks, the SHA-1 checksum of the checksums of each chunk (in the order they were uploaded).
+  type: str
   returned: always
+chunks:
+  description: The number of assets, size, checksum, success and elapsed time (in seconds) of each chunk that was uploaded
+  type: list
+  returned: when chunk_size > 0
+metrics:
+  description: The count, latency percentiles and volume of the REST API calls made (by endpoint), along with paging and cache hit counts
+  returned: when collect_metrics is true
+  type: dict
 '''
 
 from ansible.module_utils.basic import AnsibleModule
@@ -109,6 +155,54 @@ from ansible.module_utils.igc_rest import RestIGC
 from ansible.module_utils.openigc_handler import OpenIGCHandler
 import os.path
 import json
+import time
+import threading
+import hashlib
+
+
+def uploadChunk(igcrest, oigc_xml, rids, complete_types, lock):
+    start = time.time()
+    # (the document is only ever serialized by one thread at a time)
+    with lock:
+        xmlToSend = oigc_xml.getChunkAsString(rids, complete_types)
+    asset_details = igcrest.uploadOpenIGCAssets(xmlToSend)
+    return {
+        "assets": len(rids),
+        "size": len(xmlToSend),
+        "checksum": hashlib.sha1(xmlToSend).hexdigest(),
+        "success": (asset_details is not None),
+        "elapsed": round(time.time() - start, 3),
+        "rids": asset_details
+    }
+
+
+# Uploads the assets one wave of chunks at a time (each wave depending only on
+# the waves before it), stopping at the first wave in which any chunk fails --
+# since each chunk is self-contained, re-running the load is safe
+def uploadInChunks(igcrest, module, result, oigc_xml, complete_types):
+    waves = oigc_xml.getUploadChunks(module.params['chunk_size'], complete_types)
+    lock = threading.Lock()
+    digest = hashlib.sha1()
+    for wave in waves:
+        outcomes = igcrest.mapConcurrently(
+            lambda rids: uploadChunk(igcrest, oigc_xml, rids, complete_types, lock),
+            wave,
+            module.params['workers']
+        )
+        failed = False
+        for outcome in outcomes:
+            asset_details = outcome.pop('rids')
+            result['chunks'].append(outcome)
+            result['uploaded_size'] += outcome['size']
+            digest.update(to_bytes(outcome['checksum']))
+            result['uploaded_checksum'] = digest.hexdigest()
+            if outcome['success']:
+                result['rids'].update(asset_details)
+                result['changed'] = True
+            else:
+                failed = True
+        if failed:
+            module.fail_json(msg='Failed to upload assets', **result)
 
 
 def main():
@@ -120,6 +214,10 @@ def main():
         password=dict(type='str', required=True, no_log=True),
         src=dict(type='path', required=True),
         complete_types=dict(type='list', required=False, default=[]),
+        chunk_size=dict(type='int', required=False, default=0),
+        workers=dict(type='int', required=False, default=1),
+        return_payload=dict(type='bool', required=False, default=False),
+        collect_metrics=dict(type='bool', required=False, default=False),
         cert=dict(type='path', required=False),
         unsafe_writes=dict(type='bool', required=False, default=False)
     )
@@ -132,7 +230,8 @@ def main():
     result = dict(
         changed=False,
         rids={},
-        uploaded_xml=""
+        uploaded_size=0,
+        uploaded_checksum=""
     )
 
     # if the user is working with this module in only check mode we do not
@@ -149,7 +248,8 @@ def main():
         password=module.params['password'],
         host=module.params['host'],
         port=module.params['port'],
-        cert=module.params['cert']
+        cert=module.params['cert'],
+        collect_metrics=module.params['collect_metrics']
     )
 
     src = module.params['src']
@@ -178,11 +278,22 @@ def main():
     oigc_xml.setImportActionPartials(partial_assets)
     oigc_xml.setImportActionCompletes(complete_assets)
 
-    xmlToSend = oigc_xml.getCustomizedXMLAsString()
-    if not xmlToSend:
-        module.fail_json(msg='Retrieval of modified asset XML failed', **result)
+    return_payload = module.params['return_payload']
+
+    if module.params['chunk_size'] > 0:
+        # (the full document is only serialized if it is to be returned)
+        if return_payload:
+            result['uploaded_xml'] = oigc_xml.getCustomizedXMLAsString()
+        result['chunks'] = []
+        uploadInChunks(igcrest, module, result, oigc_xml, complete_types)
     else:
-        result['uploaded_xml'] = xmlToSend
+        xmlToSend = oigc_xml.getCustomizedXMLAsString()
+        if not xmlToSend:
+            module.fail_json(msg='Retrieval of modified asset XML failed', **result)
+        result['uploaded_size'] = len(xmlToSend)
+        result['uploaded_checksum'] = hashlib.sha1(xmlToSend).hexdigest()
+        if return_payload:
+            result['uploaded_xml'] = xmlToSend
         asset_details = igcrest.uploadOpenIGCAssets(xmlToSend)
         if asset_details is not None:
             result['rids'] = asset_details
@@ -139,6 +139,30 @@ options:
     required: false
     type: int
     default: 100
+  query_log_size:
+    description:
+      - The maximum number of the most recent queries (and updates) to return in the results.
+      - If negative, every query (and update) is returned.
+    required: false
+    type: int
+    default: 100
+  query_log:
+    description:
+      - A file into which to append every query (and update) made, as one JSON object per line.
+    required: false
+    type: path
+  trace_file:
+    description:
+      - A file into which to append a trace of the time spent in each phase of processing.
+      - The trace is in the Chrome Trace Event format, which can be opened by trace viewers like chrome://tracing or Perfetto.
+    required: false
+    type: path
+  collect_metrics:
+    description:
+      - Whether to collect (and return as I(metrics)) the count, latency and volume of the REST API calls made.
+    required: false
+    type: bool
+    default: false
   cert:
     description:
       - The path to a certificate file to use for SSL verification against the server.
@@ -171,11 +195,15 @@ EXAMPLES = '''
 
 RETURN = '''
 queries:
-  description: A list of JSON query criteria used to retrieve assets (for mapping)
+  description: The most recent JSON query criteria used to retrieve assets (for mapping)
   returned: always
   type: list
+query_summary:
+  description: The number of queries (and updates) made, by the shape of the query (its types, conditions and properties)
+  returned: always
+  type: dict
 updates:
-  description: A list update requests that were made
+  description: The most recent update requests that were made
   type: list
   returned: always
 asset_update_count:
@@ -198,11 +226,16 @@ unmapped_relations:
   description: A list of the assets for which no mapped relationship could be found
   returned: always
   type: list
+metrics:
+  description: The count, latency percentiles and volume of the REST API calls made (by endpoint), along with paging and cache hit counts
+  returned: when collect_metrics is true
+  type: dict
 '''
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils._text import to_bytes
 from ansible.module_utils.igc_rest import RestIGC
+from ansible.module_utils.infosvr_trace import Tracer
 import os.path
 import json
 
@@ -220,6 +253,10 @@ def main():
         replace_type=dict(type='str', required=False, default=""),
         conditions=dict(type='list', required=False, default=[]),
         batch=dict(type='int', required=False, default=100),
+        query_log_size=dict(type='int', required=False, default=100),
+        query_log=dict(type='path', required=False),
+        collect_metrics=dict(type='bool', required=False, default=False),
+        trace_file=dict(type='path', required=False),
         cert=dict(type='path', required=False),
         unsafe_writes=dict(type='bool', required=False, default=False)
     )
@@ -232,6 +269,7 @@ def main():
     result = dict(
         changed=False,
         queries=[],
+        query_summary={},
         updates=[],
         asset_update_count=0,
         relationship_update_count=0,
@@ -246,6 +284,8 @@ def main():
     if module.check_mode:
         return result
 
+    tracer = Tracer(module.params['trace_file'], 'igc_load_relationships')
+
     # Setup REST API connectivity via module_utils.igc_rest class
     igcrest = RestIGC(
         module,
@@ -254,7 +294,11 @@ def main():
         password=module.params['password'],
         host=module.params['host'],
         port=module.params['port'],
-        cert=module.params['cert']
+        cert=module.params['cert'],
+        query_log_size=module.params['query_log_size'],
+        query_log=module.params['query_log'],
+        collect_metrics=module.params['collect_metrics'],
+        tracer=tracer
     )
 
     mappings = module.params['mappings']
@@ -268,14 +312,16 @@ def main():
     if not src_exists:
         module.fail_json(rc=257, msg='Src %s does not exist !' % src)
 
-    f = open(to_bytes(src), 'rb')
-    allAssets = json.load(f)
-    f.close()
+    with tracer.span("read_source"):
+        f = open(to_bytes(src), 'rb')
+        allAssets = json.load(f)
+        f.close()
 
     wfl_enabled = igcrest.isWorkflowEnabled()
 
     for asset in allAssets:
-        mappedItem = igcrest.getMappedItem(asset, mappings, wfl_enabled, batch=batch)
+        with tracer.span("map_asset", "mapping"):
+            mappedItem = igcrest.getMappedItem(asset, mappings, wfl_enabled, batch=batch)
         if mappedItem == "":
             result['unmapped_assets'].append(asset)
             continue
@@ -286,18 +332,20 @@ def main():
                 aRelns = asset[relnprop]
                 aMappedRelnRIDs = []
                 if isinstance(aRelns, list):
-                    for reln in aRelns:
-                        getMappedRelation(igcrest, reln, mappings, wfl_enabled, batch, result, aMappedRelnRIDs)
+                    with tracer.span("map_relationships", "mapping", property=relnprop, count=len(aRelns)):
+                        for reln in aRelns:
+                            getMappedRelation(igcrest, reln, mappings, wfl_enabled, batch, result, aMappedRelnRIDs)
                     if len(aMappedRelnRIDs) > 0:
-                        update_rc, update_msg = igcrest.addRelationshipsToAsset(
-                            mappedItem,
-                            aMappedRelnRIDs,
-                            relnprop,
-                            module.params['mode'],
-                            replace_type=module.params['replace_type'],
-                            conditions=module.params['conditions'],
-                            batch=batch
-                        )
+                        with tracer.span("update_relationships", "update", property=relnprop, count=len(aMappedRelnRIDs)):
+                            update_rc, update_msg = igcrest.addRelationshipsToAsset(
+                                mappedItem,
+                                aMappedRelnRIDs,
+                                relnprop,
+                                module.params['mode'],
+                                replace_type=module.params['replace_type'],
+                                conditions=module.params['conditions'],
+                                batch=batch
+                            )
                         if update_rc != 200:
                             result['unupdated_assets'].append(mappedItem)
                         else:
@@ -305,13 +353,15 @@ def main():
                             result['asset_update_count'] += 1
                             result['relationship_update_count'] += len(aMappedRelnRIDs)
                 elif isinstance(aRelns, dict):
-                    getMappedRelation(igcrest, aRelns, mappings, wfl_enabled, batch, result, aMappedRelnRIDs)
+                    with tracer.span("map_relationships", "mapping", property=relnprop, count=1):
+                        getMappedRelation(igcrest, aRelns, mappings, wfl_enabled, batch, result, aMappedRelnRIDs)
                     if len(aMappedRelnRIDs) == 1:
-                        update_rc, update_msg = igcrest.replaceSingleRelationship(
-                            mappedItem,
-                            aMappedRelnRIDs[0],
-                            relnprop
-                        )
+                        with tracer.span("update_relationships", "update", property=relnprop, count=1):
+                            update_rc, update_msg = igcrest.replaceSingleRelationship(
+                                mappedItem,
+                                aMappedRelnRIDs[0],
+                                relnprop
+                            )
                         if update_rc != 200:
                             result['unupdated_assets'].append(mappedItem)
                         else:
@@ -321,6 +371,7 @@ def main():
 
     # Close the IGC REST API session
     igcrest.closeSession()
+    tracer.write()
 
     module.exit_json(**result)
 
@@ -107,7 +107,7 @@ merged_relationship_count:
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils._text import to_bytes, to_native
-from ansible.module_utils.infosvr_types import get_mapped_identity
+from ansible.module_utils.infosvr_types import IdentityMapper, get_identity_as_json
 import os
 import os.path
 import tempfile
@@ -144,6 +144,7 @@ def main():
     dest = module.params['dest']
     mappings = module.params['mappings']
 
+    identities = IdentityMapper(mappings)
     mergedAssets = {}
     relnsForId = {}
 
@@ -160,10 +161,10 @@ def main():
         f.close()
 
         for asset in allAssetsFromFile:
-            mapped_asset = get_mapped_identity(asset, mappings)
-            asset_id = json.dumps(mapped_asset)
+            # Identities are hashable tuples, so can be used directly as keys
+            asset_id = identities.getIdentity(asset)
             if asset_id not in mergedAssets:
-                mergedAssets[asset_id] = mapped_asset
+                mergedAssets[asset_id] = get_identity_as_json(asset_id)
                 result['merged_asset_count'] += 1
             for prop in asset:
                 bRelation = isinstance(asset[prop], list)
@@ -174,13 +175,12 @@ def main():
                         if prop not in mergedAssets[asset_id]:
                             mergedAssets[asset_id][prop] = []
                         if prop not in relnsForId[asset_id]:
-                            relnsForId[asset_id][prop] = []
+                            relnsForId[asset_id][prop] = set()
                         for reln in asset[prop]:
-                            mapped_reln = get_mapped_identity(reln, mappings)
-                            reln_id = json.dumps(mapped_reln)
+                            reln_id = identities.getIdentity(reln)
                             if reln_id not in relnsForId[asset_id][prop]:
-                                mergedAssets[asset_id][prop].append(mapped_reln)
-                                relnsForId[asset_id][prop].append(reln_id)
+                                mergedAssets[asset_id][prop].append(identities.getJson(reln_id))
+                                relnsForId[asset_id][prop].add(reln_id)
                                 result['merged_relationship_count'] += 1
                     else:
                         mergedAssets[asset_id][prop] = asset[prop]
@@ -194,7 +194,7 @@ def main():
     # and then move to specified dest location
     try:
         tmpfd, tmpfile = tempfile.mkstemp()
-        f = os.fdopen(tmpfd, 'wb')
+        f = os.fdopen(tmpfd, 'w')
         json.dump(consolidatedAssets, f)
         f.close()
     except IOError:
@@ -104,6 +104,24 @@ options:
     required: false
     type: str
     choices: [ "AND", "OR" ]
+  query_log_size:
+    description:
+      - The maximum number of the most recent queries (and updates) to return in the results.
+      - If negative, every query (and update) is returned.
+    required: false
+    type: int
+    default: 100
+  query_log:
+    description:
+      - A file into which to append every query (and update) made, as one JSON object per line.
+    required: false
+    type: path
+  collect_metrics:
+    description:
+      - Whether to collect (and return as I(metrics)) the count, latency and volume of the REST API calls made.
+    required: false
+    type: bool
+    default: false
   cert:
     description:
       - The path to a certificate file to use for SSL verification against the server.
@@ -142,9 +160,13 @@ EXAMPLES = '''
 RETURN = '''
 queries:
   description:
-    - The JSON queries used to retrieve the assets.
+    - The most recent JSON queries used to retrieve the assets.
   returned: always
   type: list
+query_summary:
+  description: The number of queries (and updates) made, by the shape of the query (its types, conditions and properties)
+  returned: always
+  type: dict
 asset_count:
   description:
     - A numeric indication of the number of assets that were found based on the provided criteria.
@@ -156,6 +178,10 @@ assets:
     - Note that if I(extract_all) is C(False), this will only contain the first page (up to I(batch)) of results.
   type: list
   returned: always
+metrics:
+  description: The count, latency percentiles and volume of the REST API calls made (by endpoint), along with paging and cache hit counts
+  returned: when collect_metrics is true
+  type: dict
 '''
 
 from ansible.module_utils.basic import AnsibleModule
@@ -173,6 +199,9 @@ def main():
         properties=dict(type='list', required=False, default=['name']),
         conditions=dict(type='list', required=False, default=[]),
         condition_join=dict(type='str', required=False, default='AND'),
+        query_log_size=dict(type='int', required=False, default=100),
+        query_log=dict(type='path', required=False),
+        collect_metrics=dict(type='bool', required=False, default=False),
         cert=dict(type='path', required=False),
         batch=dict(type='int', required=False, default=100),
         extract_all=dict(type='bool', required=False, default=False)
@@ -186,6 +215,7 @@ def main():
     result = dict(
         changed=False,
         queries=[],
+        query_summary={},
         asset_count=0,
         assets=[]
     )
@@ -204,7 +234,10 @@ def main():
         password=module.params['password'],
         host=module.params['host'],
         port=module.params['port'],
-        cert=module.params['cert']
+        cert=module.params['cert'],
+        query_log_size=module.params['query_log_size'],
+        query_log=module.params['query_log'],
+        collect_metrics=module.params['collect_metrics']
     )
 
     conditions = module.params['conditions']
@@ -229,6 +262,7 @@ def main():
 
     # Ensure search worked before proceeding
     if jsonResults == '':
+        igcrest.recordMetrics()
         module.fail_json(msg='IGC query failed', **result)
 
     if extract_all:
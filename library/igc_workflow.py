@@ -124,6 +124,69 @@ options:
     required: false
     type: str
     choices: [ "NEW", "SAME", "SAME_OR_NEW", "DIFFERENT" ]
+  batch_compare:
+    description:
+      - Retrieve the full development and published assets to compare (for I(compared_to_published)) in batches.
+      - Each batch of I(batch) assets is retrieved with a single query per side, rather than individually.
+    required: false
+    type: bool
+    default: false
+  chunk_size:
+    description:
+      - The maximum number of assets to include in each workflow action request.
+      - Any chunk that is rejected (for some of the assets within it) or times out (including a gateway timeout or a
+        dropped connection) is retried as progressively smaller chunks, down to I(min_chunk_size); other failures
+        (eg. authentication problems) are not retried.
+      - If 0, all assets in a given state are actioned in a single request (which is not retried).
+    required: false
+    type: int
+    default: 0
+  min_chunk_size:
+    description:
+      - The smallest chunk into which a rejected chunk is split when retrying (see I(chunk_size)).
+    required: false
+    type: int
+    default: 1
+  workers:
+    description:
+      - The number of chunks of workflow actions to send concurrently.
+    required: false
+    type: int
+    default: 1
+  fingerprint_cache:
+    description:
+      - A file in which to cache the content fingerprints of published assets (used with I(compared_to_published)).
+      - Published assets that have not been modified since their fingerprint was cached are not retrieved again.
+      - The context of each published asset (eg. the names of its parent categories) is also checked, so relationships
+        to its context (eg. a term's C(parent_category)) do not prevent caching; but fingerprints are not cached for
+        assets with any other relationship to business metadata (eg. synonyms, or a category's terms), as those
+        related assets can change without the asset itself being modified.
+    required: false
+    type: path
+  query_log_size:
+    description:
+      - The maximum number of the most recent queries (and updates) to return in the results.
+      - If negative, every query (and update) is returned.
+    required: false
+    type: int
+    default: 100
+  query_log:
+    description:
+      - A file into which to append every query (and update) made, as one JSON object per line.
+    required: false
+    type: path
+  trace_file:
+    description:
+      - A file into which to append a trace of the time spent in each phase of processing.
+      - The trace is in the Chrome Trace Event format, which can be opened by trace viewers like chrome://tracing or Perfetto.
+    required: false
+    type: path
+  collect_metrics:
+    description:
+      - Whether to collect (and return as I(metrics)) the count, latency and volume of the REST API calls made.
+    required: false
+    type: bool
+    default: false
   cert:
     description:
       - The path to a certificate file to use for SSL verification against the server.
@@ -158,9 +221,13 @@ EXAMPLES = '''
 RETURN = '''
 queries:
   description:
-    - The JSON queries used to retrieve the assets.
+    - The most recent JSON queries used to retrieve the assets.
   returned: always
   type: list
+query_summary:
+  description: The number of queries (and updates) made, by the shape of the query (its types, conditions and properties)
+  returned: always
+  type: dict
 asset_count:
   description:
     - A numeric indication of the number of assets that were acted upon using the provided criteria.
@@ -181,16 +248,35 @@ workflow_failed:
     - A list of JSON objects providing any failed actions.
   type: list
   returned: always
+workflow_retried:
+  description:
+    - A list of JSON objects providing any chunks of actions that failed and were retried as smaller chunks.
+  type: list
+  returned: always
 workflow_enabled:
   description:
     - An indication of whether the workflow is even enabled in the environment or not.
   type: bool
   returned: always
+fingerprints_reused:
+  description:
+    - A numeric indication of the number of published assets whose cached fingerprint was reused.
+  type: int
+  returned: always
+metrics:
+  description: The count, latency percentiles and volume of the REST API calls made (by endpoint), along with paging and cache hit counts
+  returned: when collect_metrics is true
+  type: dict
 '''
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils._text import to_bytes, to_native
 from ansible.module_utils.igc_rest import RestIGC
-import six
+from ansible.module_utils.infosvr_trace import Tracer
+import os
+import os.path
+import tempfile
+import hashlib
 import json
 
 
@@ -208,8 +294,18 @@ def main():
         conditions=dict(type='list', required=False, default=[]),
         condition_join=dict(type='str', required=False, default='AND'),
         compared_to_published=dict(type='str', required=False, default=''),
+        batch_compare=dict(type='bool', required=False, default=False),
+        chunk_size=dict(type='int', required=False, default=0),
+        min_chunk_size=dict(type='int', required=False, default=1),
+        workers=dict(type='int', required=False, default=1),
+        fingerprint_cache=dict(type='path', required=False),
+        query_log_size=dict(type='int', required=False, default=100),
+        query_log=dict(type='path', required=False),
+        collect_metrics=dict(type='bool', required=False, default=False),
+        trace_file=dict(type='path', required=False),
         cert=dict(type='path', required=False),
-        batch=dict(type='int', required=False, default=100)
+        batch=dict(type='int', required=False, default=100),
+        unsafe_writes=dict(type='bool', required=False, default=False)
     )
 
     module = AnsibleModule(
@@ -220,11 +316,14 @@ def main():
     result = dict(
         changed=False,
         queries=[],
+        query_summary={},
         asset_count=0,
         assets=[],
         workflow_actions=[],
         workflow_failed=[],
-        workflow_enabled=False
+        workflow_retried=[],
+        workflow_enabled=False,
+        fingerprints_reused=0
     )
 
     # if the user is working with this module in only check mode we do not
@@ -233,6 +332,8 @@ def main():
     if module.check_mode:
         return result
 
+    tracer = Tracer(module.params['trace_file'], 'igc_workflow')
+
     # Setup REST API connectivity via module_utils.igc_rest class
     igcrest = RestIGC(
         module,
@@ -241,7 +342,11 @@ def main():
         password=module.params['password'],
         host=module.params['host'],
         port=module.params['port'],
-        cert=module.params['cert']
+        cert=module.params['cert'],
+        query_log_size=module.params['query_log_size'],
+        query_log=module.params['query_log'],
+        collect_metrics=module.params['collect_metrics'],
+        tracer=tracer
     )
 
     conditions = module.params['conditions']
@@ -250,6 +355,13 @@ def main():
     action = module.params['action']
     comment = module.params['comment']
     compared_to_published = module.params['compared_to_published']
+    batch_compare = module.params['batch_compare']
+    chunking = {
+        "chunk_size": module.params['chunk_size'],
+        "min_chunk_size": module.params['min_chunk_size'],
+        "workers": module.params['workers']
+    }
+    fingerprint_cache = module.params['fingerprint_cache']
     batch = module.params['batch']
 
     # First check whether workflow is even enabled
@@ -258,6 +370,7 @@ def main():
         result['workflow_enabled'] = True
     else:
         igcrest.closeSession()
+        tracer.write()
         module.exit_json(**result)
 
     incomparable_keys = [
@@ -297,10 +410,12 @@ def main():
         reqJSON['where']['conditions'].append({"conditions": conditions,
                                                "operator": module.params['condition_join'].lower()})
 
-    jsonResults = igcrest.search(reqJSON)
+    with tracer.span("search_assets", asset_type=asset_type):
+        jsonResults = igcrest.search(reqJSON)
 
     # Ensure search worked before proceeding
     if jsonResults == '':
+        igcrest.recordMetrics()
         module.fail_json(msg='IGC query failed', **result)
 
     result['asset_count'] = len(jsonResults)
@@ -316,21 +431,46 @@ def main():
     same_assets = []
     changed_assets = []
 
+    # Only published fingerprints that are still current (ie. the published
+    # asset has not been modified since) are retained from the cache
+    fingerprints = None
+    if compared_to_published != '' and fingerprint_cache:
+        fingerprints = loadPublishedFingerprints(igcrest, module, fingerprint_cache, asset_type, batch)
+
     for asset in jsonResults:
         # For some reason 'workflow_current_state' is an array
         # (but should only ever have one entry, so always take first?)
         current_state = asset['workflow_current_state'][0]
         assets_by_state[current_state].append(asset['_id'])
-        if compared_to_published != '':
-            calculateAssetDelta(igcrest,
-                                module,
-                                result,
-                                incomparable_keys,
-                                asset,
-                                batch,
-                                new_assets,
-                                same_assets,
-                                changed_assets)
+        if compared_to_published != '' and not batch_compare:
+            with tracer.span("compare_asset", "compare"):
+                calculateAssetDelta(igcrest,
+                                    module,
+                                    result,
+                                    incomparable_keys,
+                                    asset,
+                                    batch,
+                                    new_assets,
+                                    same_assets,
+                                    changed_assets,
+                                    fingerprints)
+
+    if compared_to_published != '' and batch_compare:
+        with tracer.span("compare_assets", "compare", count=len(jsonResults)):
+            calculateAssetDeltas(igcrest,
+                                 module,
+                                 result,
+                                 incomparable_keys,
+                                 jsonResults,
+                                 asset_type,
+                                 batch,
+                                 new_assets,
+                                 same_assets,
+                                 changed_assets,
+                                 fingerprints)
+
+    if fingerprints is not None:
+        savePublishedFingerprints(module, result, fingerprint_cache, asset_type, fingerprints)
 
     # Easy case: we're only moving from a particular state
     if from_state != 'ALL':
@@ -348,7 +488,8 @@ def main():
                         from_state,
                         action_to_take,
                         action,
-                        comment)
+                        comment,
+                        chunking)
     # More complicated case: we want to move from all states
     else:
         # Need to iterate state-by-state...
@@ -366,7 +507,8 @@ def main():
                             'DRAFT',
                             action_to_take,
                             action,
-                            comment)
+                            comment,
+                            chunking)
         waiting_assets = assets_by_state['WAITING_APPROVAL']
         if len(waiting_assets) > 0:
             action_to_take = getNextAction(action, 'WAITING_APPROVAL')
@@ -381,7 +523,8 @@ def main():
                             'WAITING_APPROVAL',
                             action_to_take,
                             action,
-                            comment)
+                            comment,
+                            chunking)
         approved_assets = assets_by_state['APPROVED']
         if len(approved_assets) > 0:
             action_to_take = getNextAction(action, 'APPROVED')
@@ -396,10 +539,12 @@ def main():
                             'APPROVED',
                             action_to_take,
                             action,
-                            comment)
+                            comment,
+                            chunking)
 
     # Close the IGC REST API session
     igcrest.closeSession()
+    tracer.write()
 
     module.exit_json(**result)
 
@@ -442,7 +587,8 @@ def moveToNextState(igcrest,
                     current_state,
                     action_to_take,
                     final_action,
-                    comment):
+                    comment,
+                    chunking):
     workflow_actions_to_states = {
         "request": "WAITING_APPROVAL",
         "approve": "APPROVED",
@@ -451,90 +597,169 @@ def moveToNextState(igcrest,
         "publish": None
     }
     new_state = workflow_actions_to_states[action_to_take]
-    if current_state != new_state:
-        if igcrest.takeWorkflowAction(assets_to_act_upon, action_to_take, comment):
-            result['workflow_actions'].append({"items": assets_to_act_upon,
-                                               "action": action_to_take})
-            result['changed'] = True
-        else:
-            result['workflow_failed'].append({"items": assets_to_act_upon,
-                                              "action": action_to_take})
+    if current_state != new_state and len(assets_to_act_upon) > 0:
+        assets_moved = []
+        with igcrest.tracer.span("workflow_action", "workflow", action=action_to_take, count=len(assets_to_act_upon)):
+            outcomes = igcrest.takeWorkflowActionInChunks(assets_to_act_upon,
+                                                          action_to_take,
+                                                          comment,
+                                                          chunking['chunk_size'],
+                                                          chunking['workers'],
+                                                          chunking['min_chunk_size'])
+        for outcome in outcomes:
+            action_result = {"items": outcome['items'],
+                             "action": outcome['action'],
+                             "elapsed": outcome['elapsed']}
+            if outcome['success']:
+                result['workflow_actions'].append(action_result)
+                result['changed'] = True
+                assets_moved += outcome['items']
+            elif outcome['retried']:
+                result['workflow_retried'].append(action_result)
+            else:
+                result['workflow_failed'].append(action_result)
+        # Only the assets that were successfully moved can progress further
         if new_state and action_to_take != final_action:
             next_action = getNextAction(final_action,
                                         new_state)
             moveToNextState(igcrest,
                             result,
-                            assets_to_act_upon,
+                            assets_moved,
                             new_state,
                             next_action,
                             final_action,
-                            comment)
+                            comment,
+                            chunking)
+
+
+# Reduces an asset to a canonical form that can be hashed:
+# - keys that are never comparable (and RIDs / URLs of business metadata,
+#   which always differ between development and published) are removed
+# - relationships to any other (non-business metadata) asset are reduced
+#   to the RID of the related asset
+# - relationship paging details are dropped (only the items are kept)
+# - lists are sorted, as their order is not relevant to the comparison
+def _canonicalize(igcrest, value, rm_keys):
+    if isinstance(value, dict):
+        if '_type' in value and '_id' in value and not igcrest.isWorkflowType(value['_type']):
+            return value['_id']
+        elif 'items' in value and 'paging' in value:
+            return _canonicalize(igcrest, value['items'], rm_keys)
+        canonical = {}
+        for key in value:
+            if key not in rm_keys and key not in ['_id', '_url']:
+                canonical[key] = _canonicalize(igcrest, value[key], rm_keys)
+        return canonical
+    elif isinstance(value, list):
+        canonical = [_canonicalize(igcrest, item, rm_keys) for item in value]
+        return sorted(canonical, key=lambda x: json.dumps(x, sort_keys=True))
+    else:
+        return value
 
 
-def _sameDict(igcrest, module, result, d1, d2):
-    same = (list(d1.keys()).sort() == list(d2.keys()).sort())
-    if same:
-        # If it's an IGC type and not business metadata, we can simply
-        # directly compare the RIDs to test for equality
-        if '_type' in d1 and not igcrest.isWorkflowType(d1['_type']):
-            same = (d1['_id'] == d2['_id'])
-        else:
-            for prop in d1:
-                if prop not in ['_id', '_url']:
-                    d1_val = d1[prop]
-                    d2_val = d2[prop]
-                    # If a simple type, just directly compare for equality
-                    if isinstance(d1_val, (six.string_types, bool, int, long, float)):
-                        same = (d1_val == d2_val)
-                    elif isinstance(d1_val, list):
-                        same = _sameList(igcrest, module, result, d1_val, d2_val)
-                    elif isinstance(d1_val, dict):
-                        same = _sameDict(igcrest, module, result, d1_val, d2_val)
-                # Short-circuit the checks if we found a difference
-                if not same:
-                    break
-    return same
+def getAssetFingerprint(igcrest, full_asset, rm_keys):
+    canonical = _canonicalize(igcrest, full_asset, rm_keys)
+    serialized = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(serialized.encode('utf-8')).hexdigest()
 
 
-# Assumptions:
-# - order shouldn't be directly relevant to lists -- so we will
-#   sort them prior to comparison
-def _sameList(igcrest, module, result, l1, l2):
-    same = (len(l1) == len(l2))
-    if same and len(l1) > 0:
-        sorted_list_l1 = l1
-        sorted_list_l2 = l2
-        # Check the types in the list based on the first entry...
-        if isinstance(l1[0], (six.string_types, bool, int, long, float)):
-            sorted_list_l1 = sorted(l1)
-            sorted_list_l2 = sorted(l2)
-        if isinstance(l1[0], list):
-            module.fail_json(msg="Double-nested list: " + json.dumps(l1), **result)
-        if isinstance(l1[0], dict):
-            if '_type' not in l1[0] or '_name' not in l1[0]:
-                if 'subject' in l1[0]:
-                    # Sort the notes by concatenation of subject and _id
-                    sorted_list_l1 = sorted(l1, key=lambda x: (x['subject'] + "::" + x['_id']))
-                    sorted_list_l2 = sorted(l2, key=lambda x: (x['subject'] + "::" + x['_id']))
-                else:
-                    module.fail_json(msg="Non-note dict without _type or _name: " + json.dumps(l1), **result)
-            else:
-                # Sort the sub-objects by concatenation of _type, _name and _id
-                sorted_list_l1 = sorted(l1, key=lambda x: (x['_type'] + "::" + x['_name'] + "::" + x['_id']))
-                sorted_list_l2 = sorted(l2, key=lambda x: (x['_type'] + "::" + x['_name'] + "::" + x['_id']))
-        for idx, l1_val in enumerate(sorted_list_l1):
-            l2_val = sorted_list_l2[idx]
-            # If a simple type, just directly compare for equality
-            if isinstance(l1_val, (six.string_types, bool, int, long, float)):
-                same = (l1_val == l2_val)
-            elif isinstance(l1_val, list):
-                same = _sameList(igcrest, module, result, l1_val, l2_val)
-            elif isinstance(l1_val, dict):
-                same = _sameDict(igcrest, module, result, l1_val, l2_val)
-            # Short-circuit the checks if we found a difference
-            if not same:
-                break
-    return same
+# Retrieves the cached published fingerprints for the asset type, retaining
+# only those whose published asset (and its context) has not been modified
+# since they were cached (the current keys are kept to record new fingerprints)
+def loadPublishedFingerprints(igcrest, module, filename, asset_type, batch):
+    qModified = {
+        "properties": ["modified_on"],
+        "types": [asset_type],
+        "pageSize": batch
+    }
+    published = igcrest.search(qModified)
+    if published == '':
+        module.warn("Unable to retrieve modification details of published assets -- not using fingerprint cache")
+        published = []
+    fingerprints = {
+        "modified": {},
+        "cached": {}
+    }
+    for asset in published:
+        fingerprints['modified'][asset['_id']] = _getFingerprintCacheKey(asset)
+    cached = {}
+    if os.path.isfile(filename):
+        try:
+            f = open(to_bytes(filename), 'rb')
+            cached = json.load(f).get(asset_type, {})
+            f.close()
+        except ValueError:
+            module.warn("Ignoring unreadable fingerprint cache: " + filename)
+    for rid in cached:
+        if rid in fingerprints['modified'] and cached[rid].get('key') == fingerprints['modified'][rid]:
+            fingerprints['cached'][rid] = cached[rid]
+    return fingerprints
+
+
+def savePublishedFingerprints(module, result, filename, asset_type, fingerprints):
+    all_cached = {}
+    b_filename = to_bytes(filename, errors='surrogate_or_strict')
+    if os.path.isfile(b_filename):
+        try:
+            f = open(b_filename, 'rb')
+            all_cached = json.load(f)
+            f.close()
+        except ValueError:
+            all_cached = {}
+    all_cached[asset_type] = fingerprints['cached']
+    try:
+        tmpfd, tmpfile = tempfile.mkstemp()
+        f = os.fdopen(tmpfd, 'w')
+        json.dump(all_cached, f)
+        f.close()
+    except IOError:
+        module.fail_json(msg='Unable to create temporary file to output fingerprints', **result)
+    module.atomic_move(tmpfile,
+                       to_native(os.path.realpath(b_filename), errors='surrogate_or_strict'),
+                       unsafe_writes=module.params['unsafe_writes'])
+
+
+def _getCachedFingerprint(result, pub_rid, fingerprints):
+    if fingerprints is not None and pub_rid in fingerprints['cached']:
+        result['fingerprints_reused'] += 1
+        return fingerprints['cached'][pub_rid]['fingerprint']
+    return None
+
+
+# A published asset's fingerprint remains valid while neither the asset nor
+# its context (eg. the names of its parent categories, which are part of its
+# fingerprint but can be renamed without the asset itself being modified) change
+def _getFingerprintCacheKey(asset):
+    context = json.dumps(asset.get('_context', []), sort_keys=True, separators=(',', ':'))
+    return str(asset['modified_on']) + ":" + hashlib.sha1(context.encode('utf-8')).hexdigest()
+
+
+# Returns True if the asset relates to any other workflow (business metadata)
+# asset outside of its context, whose content is then part of its fingerprint
+# -- and can change without the asset's own cache key changing (relations to
+# its context, eg. its parent_category, are already covered by the cache key)
+def _hasWorkflowRelations(igcrest, value, context_rids=None):
+    if context_rids is None:
+        context_rids = set(ctx.get('_id') for ctx in value.get('_context', []))
+        return any(_hasWorkflowRelations(igcrest, value[key], context_rids) for key in value if key != '_context')
+    if isinstance(value, dict):
+        if '_type' in value and '_id' in value and igcrest.isWorkflowType(value['_type']):
+            return value['_id'] not in context_rids
+        return any(_hasWorkflowRelations(igcrest, value[key], context_rids) for key in value)
+    elif isinstance(value, list):
+        return any(_hasWorkflowRelations(igcrest, item, context_rids) for item in value)
+    return False
+
+
+# (only fingerprints that depend on nothing but the published asset and its
+# context can be reused while its cache key is unchanged, so only those are cached)
+def _cacheFingerprint(igcrest, pub_rid, full_pub_asset, fingerprint, fingerprints):
+    if fingerprints is not None and pub_rid in fingerprints['modified'] \
+            and not _hasWorkflowRelations(igcrest, full_pub_asset):
+        fingerprints['cached'][pub_rid] = {
+            "key": fingerprints['modified'][pub_rid],
+            "fingerprint": fingerprint
+        }
 
 
 # Assumptions:
@@ -547,36 +772,73 @@ def calculateAssetDelta(igcrest,
                         batch,
                         a_new,
                         a_same,
-                        a_changed):
+                        a_changed,
+                        fingerprints=None):
 
     pub_asset = igcrest.getMappedItem(dev_asset, [], False, batch)
     if pub_asset == "":
         a_new.append(dev_asset['_id'])
     else:
         full_dev_asset = igcrest.getFullAsset(dev_asset, True, batch)
-        full_pub_asset = igcrest.getFullAsset(pub_asset, False, batch)
-
-        # Remove any attributes that will never be comparable
-        for attr in rm_keys:
-            if attr in pub_asset:
-                del pub_asset[attr]
-            if attr in dev_asset:
-                del dev_asset[attr]
-
-        # Initial check: set of sorted keys is identical between the two
-        # ... and if we pass this point, we know the keys are identical so
-        # we only ever need to loop over one set of keys (not both)
-        bSame = _sameDict(igcrest,
-                          module,
-                          result,
-                          full_dev_asset,
-                          full_pub_asset)
-
-        if bSame:
+        dev_fingerprint = getAssetFingerprint(igcrest, full_dev_asset, rm_keys)
+        pub_fingerprint = _getCachedFingerprint(result, pub_asset['_id'], fingerprints)
+        if pub_fingerprint is None:
+            full_pub_asset = igcrest.getFullAsset(pub_asset, False, batch)
+            pub_fingerprint = getAssetFingerprint(igcrest, full_pub_asset, rm_keys)
+            _cacheFingerprint(igcrest, pub_asset['_id'], full_pub_asset, pub_fingerprint, fingerprints)
+        if dev_fingerprint == pub_fingerprint:
             a_same.append(dev_asset['_id'])
         else:
             a_changed.append(dev_asset['_id'])
 
 
+# Batched equivalent of calculateAssetDelta: published counterparts are all
+# mapped from a single cache of the published assets, and the full dev and
+# published assets are then retrieved a batch at a time
+def calculateAssetDeltas(igcrest,
+                         module,
+                         result,
+                         rm_keys,
+                         dev_assets,
+                         asset_type,
+                         batch,
+                         a_new,
+                         a_same,
+                         a_changed,
+                         fingerprints=None):
+
+    pairs = []
+    for dev_asset in dev_assets:
+        # A limit of 0 caches all published assets of the type on first use
+        pub_asset = igcrest.getMappedItem(dev_asset, [], False, batch, limit=0)
+        if pub_asset == "":
+            a_new.append(dev_asset['_id'])
+        else:
+            pairs.append((dev_asset['_id'], pub_asset['_id']))
+
+    for idx in range(0, len(pairs), batch):
+        chunk = pairs[idx:idx + batch]
+        pub_fingerprints = {}
+        for dev_rid, pub_rid in chunk:
+            cached = _getCachedFingerprint(result, pub_rid, fingerprints)
+            if cached is not None:
+                pub_fingerprints[pub_rid] = cached
+        full_dev_assets = igcrest.getFullAssets(asset_type, [dev_rid for dev_rid, pub_rid in chunk], True, batch)
+        pub_rids_to_get = [pub_rid for dev_rid, pub_rid in chunk if pub_rid not in pub_fingerprints]
+        full_pub_assets = {}
+        if len(pub_rids_to_get) > 0:
+            full_pub_assets = igcrest.getFullAssets(asset_type, pub_rids_to_get, False, batch)
+        for pub_rid in full_pub_assets:
+            pub_fingerprints[pub_rid] = getAssetFingerprint(igcrest, full_pub_assets[pub_rid], rm_keys)
+            _cacheFingerprint(igcrest, pub_rid, full_pub_assets[pub_rid], pub_fingerprints[pub_rid], fingerprints)
+        for dev_rid, pub_rid in chunk:
+            if dev_rid not in full_dev_assets or pub_rid not in pub_fingerprints:
+                module.warn("Unable to compare development asset to published: " + dev_rid)
+            elif getAssetFingerprint(igcrest, full_dev_assets[dev_rid], rm_keys) == pub_fingerprints[pub_rid]:
+                a_same.append(dev_rid)
+            else:
+                a_changed.append(dev_rid)
+
+
 if __name__ == '__main__':
     main()
@@ -91,111 +91,148 @@ class IAHandler(object):
         self.root.set("name", new_name)
         self.result['replacements'] += 1
 
-    def _replaceFolder(self, elements, from_value, to_value):
-        for element in elements:
-            a_new_folders = []
-            a_org_folders = element.get("folder").split(",")
-            for folder in a_org_folders:
-                # TODO: this is likely to be error-prone replacement (not specific enough)
-                # should only replace complete words between '/'s or at beginning or end
-                if from_value in folder:
-                    a_new_folders.append(folder.replace(from_value, to_value))
-                else:
-                    a_new_folders.append(folder)
-            element.set("folder", ",".join(a_new_folders))
-
-    def _replaceAttr(self, elements, attr_name, from_value, to_value):
-        for element in elements:
-            value = element.get(attr_name)
-            if value == from_value:
-                element.set(attr_name, to_value)
-
-    def _replaceText(self, elements, from_value, to_value):
-        for element in elements:
-            value = element.text
-            if from_value in value:
-                # TODO: this is likely to be error-prone replacement (not specific enough)
-                # should only replace complete words
-                element.text = value.replace(from_value, to_value)
-
-    def _replaceQualifiedName(self, elements, from_value, to_value):
-        for element in elements:
-            value = element.text
-            if from_value in value:
-                # TODO: this is likely to be error-prone replacement (not specific enough)
-                # should only replace complete words (between '.'s or at beginning / end)
-                element.text = value.replace(from_value, to_value)
-
-    def _replaceQualifiedNameInAttr(self, elements, attr_name, from_value, to_value):
-        for element in elements:
-            value = element.get(attr_name)
-            if from_value in value:
-                # TODO: this is likely to be error-prone replacement (not specific enough)
-                # should only replace complete words (between '.'s or at beginning / end)
-                element.set(attr_name, value.replace(from_value, to_value))
-
-    def _propagateMapping(self, data_type, attribute, from_value, to_value):
-        # based on any @name changes to [Table, VirtualTable]:
-        # if attribute == 'name' and (data_type == 'Table' or data_type == 'VirtualTable'):
-            # TODO -- not yet implemented
-            # - @baseTable in DataSource/Schema/VirtualTable
-            # - //ExecutableRule/BoundExpression
-            # - @value in //ExecutableRule/OutputDefinition/OutputColumn
-            # - @name in //ExecutableRule/Bindings/Binding/Column
-            # - @leftKey, @rightKey in //ExecutableRule/JoinConditions/JoinCondition
-            # - @name in //RuleSetDefinition/Variables/Binding/Column
+    def _getPropagationKind(self, data_type, attribute):
         # based on any @host, @name changes to any of [DataSource, Schema]
         if (attribute == 'name' or attribute == 'host') and (data_type == 'DataSource' or data_type == 'Schema'):
-            # - //ExecutableRule/BoundExpression
-            self._replaceQualifiedName(self.root.xpath(".//ExecutableRule/BoundExpression"), from_value, to_value)
-            # - @value in //ExecutableRule/OutputDefinition/OutputColumn
-            output_cols = self.root.xpath(".//ExecutableRule/OutputDefinition/OutputColumn")
-            self._replaceQualifiedNameInAttr(output_cols, "value", from_value, to_value)
-            # - @name in //ExecutableRule/Bindings/Binding/Column
-            binding_cols = self.root.xpath(".//ExecutableRule/Bindings/Binding/Column")
-            self._replaceQualifiedNameInAttr(binding_cols, "name", from_value, to_value)
-            # - @leftKey, @rightKey in //ExecutableRule/JoinConditions/JoinCondition
-            join_conds = self.root.xpath(".//ExecutableRule/JoinConditions/JoinCondition")
-            self._replaceQualifiedNameInAttr(join_conds, "leftKey", from_value, to_value)
-            self._replaceQualifiedNameInAttr(join_conds, "rightKey", from_value, to_value)
-            # - @name in //RuleSetDefinition/Variables/Binding/Column
-            rs_bindings = self.root.xpath(".//RuleSetDefinition/Variables/Binding/Column")
-            self._replaceQualifiedNameInAttr(rs_bindings, "name", from_value, to_value)
+            return 'qualified'
         # based on any @name changes to //Folder/...
         elif data_type == 'Folder' and attribute == 'name':
-            # - @folder in //DataRuleDefinition, //RuleSetDefinition, //ExecutableRule
-            self._replaceFolder(self.root.xpath(".//DataRuleDefinition", namespaces=ns), from_value, to_value)
-            self._replaceFolder(self.root.xpath(".//RuleSetDefinition", namespaces=ns), from_value, to_value)
-            self._replaceFolder(self.root.xpath(".//ExecutableRule", namespaces=ns), from_value, to_value)
+            return 'folder'
         # based on any @name changes to //ExecutableRule
         elif data_type == 'ExecutableRule' and attribute == 'name':
-            # - //Metric/expression
-            m_expressions = self.root.xpath(".//Metric/expression", namespaces=ns)
-            self._replaceText(m_expressions, from_value, to_value)
-            # - @ruleName in //RuleSetExecutionResult/RuleExecutionResult
-            rs_exec = self.root.xpath(".//RuleSetExecutionResult/RuleExecutionResult", namespaces=ns)
-            self._replaceAttr(rs_exec, "ruleName", from_value, to_value)
+            return 'rule'
         # based on any @name changes to //DataRuleDefinition, //RuleSetDefinition?
         elif attribute == 'name' and (data_type == 'DataRuleDefinition' or data_type == 'RuleSetDefinition'):
+            return 'definition'
+        # based on any @name changes to [Table, VirtualTable]:
+        # TODO -- not yet implemented
+        # - @baseTable in DataSource/Schema/VirtualTable
+        # - //ExecutableRule/BoundExpression
+        # - @value in //ExecutableRule/OutputDefinition/OutputColumn
+        # - @name in //ExecutableRule/Bindings/Binding/Column
+        # - @leftKey, @rightKey in //ExecutableRule/JoinConditions/JoinCondition
+        # - @name in //RuleSetDefinition/Variables/Binding/Column
+        return None
+
+    def _propagateMappings(self, propagations):
+        # TODO: the substring replacements are likely to be error-prone (not specific enough)
+        # should only replace complete words (between '.'s, '/'s or at beginning / end)
+        qualified = _get_substring_replacer(propagations['qualified'])
+        folder = _get_substring_replacer(propagations['folder'])
+        rule_text = _get_substring_replacer(propagations['rule'])
+        rule_names = _get_exact_replacements(propagations['rule'])
+        definition_names = _get_exact_replacements(propagations['definition'])
+        if qualified is None and folder is None and rule_text is None and len(definition_names) == 0:
+            return
+        for element in self.root.iter(etree.Element):
+            tag = element.tag
+            if qualified is not None:
+                # - //ExecutableRule/BoundExpression
+                if tag == 'BoundExpression' and _has_ancestors(element, ['ExecutableRule']):
+                    _replace_text(element, qualified)
+                # - @value in //ExecutableRule/OutputDefinition/OutputColumn
+                elif tag == 'OutputColumn' and _has_ancestors(element, ['OutputDefinition', 'ExecutableRule']):
+                    _replace_attr(element, 'value', qualified)
+                # - @name in //ExecutableRule/Bindings/Binding/Column
+                # - @name in //RuleSetDefinition/Variables/Binding/Column
+                elif tag == 'Column' and (_has_ancestors(element, ['Binding', 'Bindings', 'ExecutableRule'])
+                                          or _has_ancestors(element, ['Binding', 'Variables', 'RuleSetDefinition'])):
+                    _replace_attr(element, 'name', qualified)
+                # - @leftKey, @rightKey in //ExecutableRule/JoinConditions/JoinCondition
+                elif tag == 'JoinCondition' and _has_ancestors(element, ['JoinConditions', 'ExecutableRule']):
+                    _replace_attr(element, 'leftKey', qualified)
+                    _replace_attr(element, 'rightKey', qualified)
+            # - @folder in //DataRuleDefinition, //RuleSetDefinition, //ExecutableRule
+            if folder is not None and tag in ('DataRuleDefinition', 'RuleSetDefinition', 'ExecutableRule'):
+                value = element.get('folder')
+                if value is not None:
+                    element.set('folder', ",".join([folder(f) for f in value.split(",")]))
+            if rule_text is not None:
+                # - //Metric/expression
+                if tag == 'expression' and _has_ancestors(element, ['Metric']):
+                    _replace_text(element, rule_text)
+                # - @ruleName in //RuleSetExecutionResult/RuleExecutionResult
+                elif tag == 'RuleExecutionResult' and _has_ancestors(element, ['RuleSetExecutionResult']):
+                    _replace_attr(element, 'ruleName', rule_names.get)
             # - @ruleName in //RuleSetDefinition/RuleDefinitionReference
-            rule_refs = self.root.xpath(".//RuleSetDefinition/RuleDefinitionReference")
-            self._replaceAttr(rule_refs, "ruleName", from_value, to_value)
+            if tag == 'RuleDefinitionReference' and len(definition_names) > 0 \
+                    and _has_ancestors(element, ['RuleSetDefinition']):
+                _replace_attr(element, 'ruleName', definition_names.get)
 
+    # Applies every mapping to its elements, and then propagates all of the
+    # resulting changes to the rest of the document in a single traversal
     def applyMappings(self, mappings):
+        propagations = {'qualified': [], 'folder': [], 'rule': [], 'definition': []}
         for mapping in mappings:
             s_element = mapping['type']
             s_attr = mapping['attr']
             mapRE = re.compile(mapping['from'])
+            kind = self._getPropagationKind(s_element, s_attr)
             elements = self.root.xpath(".//" + s_element, namespaces=ns)
             for element in elements:
                 from_value = element.get(s_attr)
+                if from_value is None:
+                    continue
                 new_value = mapRE.sub(mapping['to'], from_value)
                 element.set(s_attr, new_value)
                 self.result['replacements'] += 1
-                self._propagateMapping(s_element, s_attr, from_value, new_value)
+                if kind is not None and new_value != from_value:
+                    propagations[kind].append((from_value, new_value))
+        self._propagateMappings(propagations)
 
     def writeCustomizedXML(self, filename):
         return self.tree.write(filename, encoding='UTF-8', xml_declaration=True)
 
     def getCustomizedXMLAsString(self):
         return etree.tostring(self.root, encoding='UTF-8', xml_declaration=True)
+
+
+# Returns True if the element's closest ancestors have the tags provided (parent first)
+def _has_ancestors(element, tags):
+    for tag in tags:
+        element = element.getparent()
+        if element is None or element.tag != tag:
+            return False
+    return True
+
+
+# Resolves a sequence of (from, to) replacements into a single lookup, where
+# each is taken through any later replacements of the value it was replaced by
+# (eg. A to B and then B to C resolves A to C) -- working backwards, so that
+# each step of a chain is a single lookup of what follows it
+def _resolve_replacements(replacements):
+    resolved = {}
+    for from_value, to_value in reversed(replacements):
+        resolved[from_value] = resolved.get(to_value, to_value)
+    return resolved
+
+
+def _get_exact_replacements(replacements):
+    return _resolve_replacements(replacements)
+
+
+# Returns a function replacing every occurrence of any of the from values (the
+# longest first, where they overlap) within a value in one pass, or None if
+# there is nothing to replace -- unlike replacing each in turn, a from value is
+# never replaced within another (eg. SRCB within SCHSRCB), nor within the value
+# that replaced another
+def _get_substring_replacer(replacements):
+    resolved = _resolve_replacements(replacements)
+    resolved.pop('', None)
+    if len(resolved) == 0:
+        return None
+    pattern = re.compile("|".join([re.escape(f) for f in sorted(resolved, key=len, reverse=True)]))
+    return lambda value: pattern.sub(lambda m: resolved[m.group(0)], value)
+
+
+def _replace_text(element, replacer):
+    if element.text is not None:
+        element.text = replacer(element.text)
+
+
+def _replace_attr(element, attr_name, replacer):
+    value = element.get(attr_name)
+    if value is not None:
+        new_value = replacer(value)
+        if new_value is not None:
+            element.set(attr_name, new_value)
@@ -22,10 +22,12 @@ __metaclass__ = type
 
 import requests
 import logging
+from ansible.module_utils.infosvr_metrics import RequestMetrics
+from ansible.module_utils.infosvr_recorder import get_recorder
 
 
 class RestIA(object):
-    def __init__(self, module, result, username, password, host, port, cert):
+    def __init__(self, module, result, username, password, host, port, cert, collect_metrics=False):
         self.module = module
         self.result = result
         self.username = username
@@ -39,6 +41,10 @@ class RestIA(object):
         self.baseURL = "https://" + host + ":" + port
         logging.getLogger("requests").setLevel(logging.ERROR)
         logging.getLogger("urllib3").setLevel(logging.ERROR)
+        self.metrics = None
+        if collect_metrics:
+            self.metrics = RequestMetrics(self.session, self.baseURL)
+        self.recorder = get_recorder(module, self.session, self.baseURL, "ia")
 
     '''
     common code for setting up interactivity with IA REST API
@@ -52,6 +58,11 @@ class RestIA(object):
 #            auth=(self.username, self.password)
 #        )
 
+    # Summarises the metrics collected so far (if any) into the result
+    def recordMetrics(self):
+        if self.metrics is not None:
+            self.result['metrics'] = self.metrics.getSummary()
+
     def _makeRequest(self, method, url, params=None, payload=None):
         if payload:
             headers = {'Content-Type': 'application/xml'}
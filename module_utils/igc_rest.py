@@ -24,11 +24,23 @@ import requests
 import json
 import logging
 import copy
+import time
+import hashlib
+import threading
+from collections import deque
+from multiprocessing.pool import ThreadPool
 from ansible.module_utils.infosvr_types import get_mapped_value
+from ansible.module_utils.infosvr_metrics import RequestMetrics
+from ansible.module_utils.infosvr_trace import Tracer
+from ansible.module_utils.infosvr_recorder import get_recorder
+
+# Responses to a workflow action that reject (some of) the assets in the request, or that time out
+# (eg. at a proxy) before a large request completes, rather than rejecting the request itself
+RETRYABLE_WORKFLOW_STATUSES = [400, 409, 500, 502, 503, 504]
 
 
 class RestIGC(object):
-    def __init__(self, module, result, username, password, host, port, cert):
+    def __init__(self, module, result, username, password, host, port, cert, query_log_size=100, query_log=None, collect_metrics=False, tracer=None):
         self.module = module
         self.result = result
         self.username = username
@@ -50,6 +62,23 @@ class RestIGC(object):
         self.ctxCacheByIdentityDev = {}
         self.propertyMapCache = {}
         self.assetTypeNameCache = {}
+        self.relatedTypeCache = {}
+        # requests' default connection pool size per host
+        self.connectionPoolSize = 10
+        # Only the most recent queries and updates are kept in the result (any
+        # negative size keeps them all), with a full trace optionally written
+        # to a file instead
+        self.queryLogSize = query_log_size
+        self.queryLogs = {}
+        self.queryLog = query_log
+        self.queryLogFile = None
+        self.queryLogLock = threading.Lock()
+        self.metrics = None
+        if collect_metrics:
+            self.metrics = RequestMetrics(self.session, self.baseURL)
+        # (a Tracer without any file is a no-op)
+        self.tracer = tracer if tracer is not None else Tracer()
+        self.recorder = get_recorder(module, self.session, self.baseURL, "igc")
 
     '''
     common code for setting up interactivity with IGC REST API
@@ -76,17 +105,54 @@ class RestIGC(object):
             self.baseURL + "/ibm/iis/igc-rest/v1/logout",
             auth=(self.username, self.password)
         )
+        if self.queryLogFile is not None:
+            self.queryLogFile.close()
+            self.queryLogFile = None
+        self.recordMetrics()
+
+    # Summarises the metrics collected so far (if any) into the result, along
+    # with the most recent queries and updates
+    def recordMetrics(self):
+        with self.queryLogLock:
+            for key, logged in self.queryLogs.items():
+                self.result[key] = list(logged)
+        if self.metrics is not None:
+            self.result['metrics'] = self.metrics.getSummary()
+
+    def _recordCacheLookup(self, cache_name, hit):
+        if self.metrics is not None:
+            self.metrics.recordCacheLookup(cache_name, hit)
+
+    # Records the query (or update) into the bounded log for the result's key
+    # (written into the result by recordMetrics), counting it against its
+    # shape in the result's query_summary
+    def _logQuery(self, key, entry, shape):
+        with self.queryLogLock:
+            summary = self.result.setdefault('query_summary', {})
+            summary[shape] = summary.get(shape, 0) + 1
+            logged = self.queryLogs.get(key)
+            if logged is None:
+                logged = deque(maxlen=self.queryLogSize if self.queryLogSize >= 0 else None)
+                self.queryLogs[key] = logged
+            logged.append(entry)
+            if self.queryLog:
+                if self.queryLogFile is None:
+                    self.queryLogFile = open(self.queryLog, 'a')
+                self.queryLogFile.write(json.dumps({key: entry}) + "\n")
 
     def getNextPage(self, paging, workflow=False):
         if 'next' in paging:
             nextPage = paging['next']
             if workflow and 'workflowMode=draft' not in nextPage:
                 nextPage += "&workflowMode=draft"
-            r = self.session.request(
-                "GET",
-                nextPage,
-                auth=(self.username, self.password)
-            )
+            if self.metrics is not None:
+                self.metrics.incrementCounter("pages")
+            with self.tracer.span("page", "rest"):
+                r = self.session.request(
+                    "GET",
+                    nextPage,
+                    auth=(self.username, self.password)
+                )
             if r.status_code == 200:
                 return r.json()
             else:
@@ -95,39 +161,57 @@ class RestIGC(object):
         else:
             return {'items': []}
 
-    def getAllPages(self, items, paging, workflow=False):
-        results = self.getNextPage(paging, workflow)
-        if len(results['items']) > 0:
-            return self.getAllPages(items + results['items'], results['paging'], workflow)
-        else:
-            return items
+    # Extends the items with every subsequent page of results (iteratively and
+    # in-place, as there can be very many pages), keeping only the items for
+    # which any keep function is true and applying any minify function to each
+    # as its page is parsed -- so that only what is needed is held
+    def getAllPages(self, items, paging, workflow=False, minify=None, keep=None):
+        while True:
+            results = self.getNextPage(paging, workflow)
+            if len(results['items']) == 0:
+                return items
+            page = results['items']
+            if keep is not None:
+                page = [item for item in page if keep(item)]
+            if minify is not None:
+                for item in page:
+                    minify(item)
+            items.extend(page)
+            paging = results['paging']
 
     def update(self, rid, value):
-        self.result['updates'].append({"rid": rid, "value": value})
-        r = self.session.request(
-            "PUT",
-            self.baseURL + "/ibm/iis/igc-rest/v1/assets/" + rid,
-            json=value,
-            auth=(self.username, self.password)
-        )
+        self._logQuery('updates', {"rid": rid, "value": value}, get_update_shape(value))
+        with self.tracer.span("put", "rest"):
+            r = self.session.request(
+                "PUT",
+                self.baseURL + "/ibm/iis/igc-rest/v1/assets/" + rid,
+                json=value,
+                auth=(self.username, self.password)
+            )
         if r.status_code == 200:
             return r.status_code, r.json()
         else:
             return r.status_code, ""
 
-    def search(self, query, get_all=True):
-        self.result['queries'].append(query)
-        r = self.session.request(
-            "POST",
-            self.baseURL + "/ibm/iis/igc-rest/v1/search",
-            json=query,
-            auth=(self.username, self.password)
-        )
+    def search(self, query, get_all=True, minify=None, keep=None):
+        self._logQuery('queries', query, get_query_shape(query))
+        with self.tracer.span("search", "rest", types=query.get('types', [])):
+            r = self.session.request(
+                "POST",
+                self.baseURL + "/ibm/iis/igc-rest/v1/search",
+                json=query,
+                auth=(self.username, self.password)
+            )
         if r.status_code == 200:
             first_results = r.json()
+            if keep is not None:
+                first_results['items'] = [item for item in first_results['items'] if keep(item)]
+            if minify is not None:
+                for item in first_results['items']:
+                    minify(item)
             if get_all:
                 wfl = ('workflowMode' in query)
-                return self.getAllPages(first_results['items'], first_results['paging'], wfl)
+                return self.getAllPages(first_results['items'], first_results['paging'], wfl, minify, keep)
             else:
                 return first_results
         else:
@@ -148,8 +232,10 @@ class RestIGC(object):
         url = "/ibm/iis/igc-rest/v1/types/" + asset_type
         url += "?showEditProperties=true"
         if asset_type in self.propertyMapCache and asset_type in self.assetTypeNameCache:
+            self._recordCacheLookup("types", True)
             return self.assetTypeNameCache[asset_type], self.propertyMapCache[asset_type]
         else:
+            self._recordCacheLookup("types", False)
             r = self.session.request(
                 "GET",
                 self.baseURL + url,
@@ -169,16 +255,65 @@ class RestIGC(object):
             else:
                 return asset_type, {}
 
-    def getOpenIGCAssets(self, bundle_name):
-        url = "/ibm/iis/igc-rest/v1/bundles/assets?family=" + bundle_name
+    # Returns the asset type at the end of the (dotted) relationship path from
+    # the asset type, or None if the path is not made up only of relationships
+    def getRelatedType(self, asset_type, path):
+        for prop in path.split("."):
+            asset_type = self._getRelatedTypes(asset_type).get(prop)
+            if asset_type is None:
+                return None
+        return asset_type
+
+    def _getRelatedTypes(self, asset_type):
+        if asset_type in self.relatedTypeCache:
+            self._recordCacheLookup("types", True)
+            return self.relatedTypeCache[asset_type]
+        self._recordCacheLookup("types", False)
         r = self.session.request(
             "GET",
-            self.baseURL + url,
+            self.baseURL + "/ibm/iis/igc-rest/v1/types/" + asset_type + "?showViewProperties=true",
             auth=(self.username, self.password)
         )
+        relatedTypes = {}
         if r.status_code == 200:
-            return r.text
-        else:
+            for prop in r.json().get('viewInfo', {}).get('properties', []):
+                if 'type' in prop and 'maxNumber' in prop and '_url' in prop['type']:
+                    relatedTypes[prop['name']] = prop['type']['_id']
+        self.relatedTypeCache[asset_type] = relatedTypes
+        return relatedTypes
+
+    # Streams the assets of an OpenIGC bundle straight into the specified file
+    # (without ever holding the whole XML payload in memory), optionally
+    # hashing the content as it is written -- returns a tuple of the number of
+    # bytes written and the hex digest (or None), or None if retrieval failed
+    # (in which case the file may hold only part of the bundle)
+    def downloadOpenIGCAssets(self, bundle_name, filename, hash_algorithm=None, chunk_size=1048576):
+        url = "/ibm/iis/igc-rest/v1/bundles/assets?family=" + bundle_name
+        try:
+            r = self.session.request(
+                "GET",
+                self.baseURL + url,
+                stream=True,
+                auth=(self.username, self.password)
+            )
+            try:
+                if r.status_code != 200:
+                    return None
+                digest = hashlib.new(hash_algorithm) if hash_algorithm else None
+                size = 0
+                with open(filename, 'wb') as f:
+                    for chunk in r.iter_content(chunk_size=chunk_size):
+                        if chunk:
+                            f.write(chunk)
+                            size += len(chunk)
+                            if digest is not None:
+                                digest.update(chunk)
+                return size, (digest.hexdigest() if digest is not None else None)
+            finally:
+                r.close()
+        except requests.exceptions.RequestException as e:
+            # (caught here, as otherwise these would be indistinguishable from a failure to write the file)
+            self.module.warn("Unable to retrieve OpenIGC assets -- " + str(e))
             return None
 
     def getTypesForOpenIGCBundle(self, bundle_id):
@@ -215,6 +350,9 @@ class RestIGC(object):
             return None
 
     def takeWorkflowAction(self, rids, action, comment=''):
+        return (self._postWorkflowAction(rids, action, comment) == 200)
+
+    def _postWorkflowAction(self, rids, action, comment):
         payload = {
             "ids": rids,
             "comment": comment
@@ -225,7 +363,72 @@ class RestIGC(object):
             json=payload,
             auth=(self.username, self.password)
         )
-        return (r.status_code == 200)
+        return r.status_code
+
+    # Takes the workflow action in chunks of (at most) chunk_size assets, using
+    # up to the specified number of concurrent workers -- returns an outcome
+    # (success and elapsed time) for every chunk that was attempted
+    def takeWorkflowActionInChunks(self, rids, action, comment='', chunk_size=0, workers=1, min_chunk_size=1):
+        if chunk_size <= 0:
+            # (without chunking, all of the assets are actioned in a single request that is never retried)
+            chunks = [rids] if len(rids) > 0 else []
+            min_chunk_size = max(len(rids), 1)
+        else:
+            chunks = [rids[idx:idx + chunk_size] for idx in range(0, len(rids), chunk_size)]
+        outcomes = self.mapConcurrently(
+            lambda chunk: self._takeWorkflowActionWithRetry(chunk, action, comment, max(min_chunk_size, 1)),
+            chunks,
+            workers
+        )
+        return [outcome for chunk_outcomes in outcomes for outcome in chunk_outcomes]
+
+    # Any chunk that is rejected (for some of the assets within it) or times out
+    # is retried as two smaller chunks, until the assets that cannot be actioned
+    # have been isolated or the chunks reach the minimum size -- other failures
+    # (eg. an unknown action, or an authentication problem) would fail for every
+    # asset, so are not retried
+    def _takeWorkflowActionWithRetry(self, rids, action, comment, min_chunk_size):
+        start = time.time()
+        retryable = False
+        try:
+            status = self._postWorkflowAction(rids, action, comment)
+            retryable = status in RETRYABLE_WORKFLOW_STATUSES
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+            status = None
+            retryable = True
+        except requests.exceptions.RequestException:
+            status = None
+        success = (status == 200)
+        retry = (not success and retryable and len(rids) > min_chunk_size)
+        outcomes = [{
+            "items": rids,
+            "action": action,
+            "success": success,
+            "retried": retry,
+            "elapsed": round(time.time() - start, 3)
+        }]
+        if retry:
+            half = len(rids) // 2
+            outcomes += self._takeWorkflowActionWithRetry(rids[:half], action, comment, min_chunk_size)
+            outcomes += self._takeWorkflowActionWithRetry(rids[half:], action, comment, min_chunk_size)
+        return outcomes
+
+    # Applies func to each of the items, using up to the specified number of
+    # concurrent workers (results are returned in the same order as the items)
+    def mapConcurrently(self, func, items, workers=1):
+        if workers <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        workers = min(workers, len(items))
+        if workers > self.connectionPoolSize:
+            adapter = requests.adapters.HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+            self.session.mount("https://", adapter)
+            self.connectionPoolSize = workers
+        pool = ThreadPool(workers)
+        try:
+            return pool.map(func, items)
+        finally:
+            pool.close()
+            pool.join()
 
     def _cacheContexts(self, into_cache, asset_type, workflow, batch=100):
         q = {
@@ -259,12 +462,14 @@ class RestIGC(object):
         if cache and asset_type in self.ctxCacheByRID:
             if rid in self.ctxCacheByRID[asset_type]:
                 assetWithCtx = self.ctxCacheByRID[asset_type][rid]
+            self._recordCacheLookup("contexts", True)
             return assetWithCtx
         # Otherwise increase the counters that will trigger caching
         elif asset_type not in self.ctxForTypeCounters:
             self.ctxForTypeCounters[asset_type] = 1
         else:
             self.ctxForTypeCounters[asset_type] += 1
+        self._recordCacheLookup("contexts", False)
         # If we want to cache, wait until we're above the limit
         if cache and self.ctxForTypeCounters[asset_type] > limit:
             self._cacheContexts(self.ctxCacheByRID, asset_type, workflow, batch)
@@ -361,12 +566,14 @@ class RestIGC(object):
         if cache and asset_type in self.ctxCacheByIdentity:
             if identity in self.ctxCacheByIdentity[asset_type]:
                 mappedAsset = self.ctxCacheByIdentity[asset_type][identity]
+            self._recordCacheLookup("identities", True)
             return mappedAsset
         # Otherwise increase the counters that will trigger caching
         elif asset_type not in self.ctxForTypeCounters:
             self.ctxForTypeCounters[asset_type] = 1
         else:
             self.ctxForTypeCounters[asset_type] += 1
+        self._recordCacheLookup("identities", False)
         # If we want to cache, wait until we're above the limit
         if cache and self.ctxForTypeCounters[asset_type] > limit:
             self._cacheAssets(self.ctxCacheByIdentity, asset_type, workflow, batch)
@@ -390,12 +597,14 @@ class RestIGC(object):
         if cache and asset_type in self.ctxCacheByIdentityDev:
             if identity in self.ctxCacheByIdentityDev[asset_type]:
                 mappedAsset = self.ctxCacheByIdentityDev[asset_type][identity]
+            self._recordCacheLookup("identities", True)
             return mappedAsset
         # Otherwise increase the counters that will trigger caching
         elif asset_type not in self.ctxForTypeCounters:
             self.ctxForTypeCounters[asset_type] = 1
         else:
             self.ctxForTypeCounters[asset_type] += 1
+        self._recordCacheLookup("identities", False)
         # If we want to cache, wait until we're above the limit
         if cache and self.ctxForTypeCounters[asset_type] > limit:
             self._cacheAssets(self.ctxCacheByIdentityDev, asset_type, workflow, batch)
@@ -527,7 +736,8 @@ class RestIGC(object):
     #   not any benefit to trying to cache this (will be potential unnecessary work)
     def _getAllRelationshipsForAsset(self, assetObj, workflow=False):
         for prop in assetObj:
-            if isinstance(assetObj[prop], dict) and 'paging' in assetObj[prop]:
+            # Only relationships that were truncated need any further paging
+            if isinstance(assetObj[prop], dict) and 'next' in assetObj[prop].get('paging', {}):
                 # The pass-through of workflow here should be fine, it is
                 # just ignored if the type of asset does not participate in
                 # the workflow
@@ -543,12 +753,14 @@ class RestIGC(object):
         if cache and asset_rid in self.fullCacheByRID:
             fullAsset = self.fullCacheByRID[asset_rid]
             self._getAllRelationshipsForAsset(fullAsset, workflow)
+            self._recordCacheLookup("full_assets", True)
             return fullAsset
         # Otherwise increase the counters that will trigger caching
         elif asset_type not in self.ctxForTypeCounters:
             self.ctxForTypeCounters[asset_type] = 1
         else:
             self.ctxForTypeCounters[asset_type] += 1
+        self._recordCacheLookup("full_assets", False)
         # If we want to cache, wait until we're above the limit
         if cache and self.ctxForTypeCounters[asset_type] > limit:
             self._cacheFullAssets(self.fullCacheByRID, asset_type, workflow, batch)
@@ -595,6 +807,39 @@ class RestIGC(object):
                 self._getAllRelationshipsForAsset(fullAsset, workflow)
         return fullAsset
 
+    # Retrieves the full definitions of many assets of the same type at once
+    # (ie. ALL of their properties and relationships), using a single 'in'
+    # query per batch of RIDs rather than a query per asset
+    def getFullAssets(self, asset_type, rids, workflow, batch=100):
+        fullAssets = {}
+        # Note that this propertyMap includes only editable attributes;
+        # should be fine for our purposes (includes name and _context anyway)
+        asset_name, propertyMap = self.getPropertyMap(asset_type)
+        for idx in range(0, len(rids), batch):
+            q = {
+                "properties": list(propertyMap.keys()),
+                "types": [asset_type],
+                "pageSize": batch,
+                "where": {
+                    "conditions": [{
+                        "value": rids[idx:idx + batch],
+                        "operator": "in",
+                        "property": "_id"
+                    }],
+                    "operator": "and"
+                }
+            }
+            if workflow and self.isWorkflowType(asset_type):
+                q['workflowMode'] = "draft"
+            res = self.search(q)
+            if res == '':
+                self.module.warn("Unable to retrieve batch of full assets -- " + json.dumps(q))
+                continue
+            for fullAsset in res:
+                self._getAllRelationshipsForAsset(fullAsset, workflow)
+                fullAssets[fullAsset['_id']] = fullAsset
+        return fullAssets
+
     # Ensure the asset is put into an editable state
     # (ie. if it is in the workflow and not in DRAFT status, return it to
     # draft status)
@@ -729,3 +974,28 @@ class RestIGC(object):
             return self.update(from_asset['_id'], u)
         else:
             return 403, "Cannot update asset to add relationships: " + json.dumps(from_asset)
+
+
+# Summarises a search query by its types, properties and conditions (without
+# any of the values being compared), so that similar queries are counted together
+def get_query_shape(query):
+    shape = "search " + ",".join(sorted(query.get('types', [])))
+    if 'where' in query:
+        shape += " where " + _get_conditions_shape(query['where'])
+    if 'properties' in query:
+        shape += " properties " + ",".join(sorted(query['properties']))
+    return shape
+
+
+def _get_conditions_shape(where):
+    conditions = []
+    for condition in where.get('conditions', []):
+        if 'conditions' in condition:
+            conditions.append("(" + _get_conditions_shape(condition) + ")")
+        else:
+            conditions.append(str(condition.get('property')) + " " + str(condition.get('operator')))
+    return (" " + where.get('operator', 'and').upper() + " ").join(conditions)
+
+
+def get_update_shape(value):
+    return "update " + ",".join(sorted(value.keys()))
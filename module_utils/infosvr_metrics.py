@@ -0,0 +1,155 @@
+###
+# Copyright 2018 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+"""
+This module adds generic utility functions for measuring the REST API calls made against Information Server
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import re
+import threading
+import time
+
+# Any path segment following one of these is an identifier, rather than part of the endpoint
+_identifier_segments = ["assets", "bundles"]
+_bundle_endpoints = ["assets"]
+
+
+class RequestMetrics(object):
+    """
+    Records the count, latency and volume of every request made through a
+    requests.Session, per endpoint, along with any counters and cache lookups
+    """
+
+    def __init__(self, session, base_url):
+        self.baseURL = base_url
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.counters = {}
+        self.caches = {}
+        self._instrument(session)
+
+    def _instrument(self, session):
+        request = session.request
+
+        def timed_request(method, url, *args, **kwargs):
+            start = time.time()
+            r = request(method, url, *args, **kwargs)
+            elapsed = time.time() - start
+            self.recordRequest(method, url, elapsed, _get_bytes_sent(r), _get_bytes_received(r, kwargs.get('stream', False)), r.status_code)
+            return r
+
+        session.request = timed_request
+
+    def getEndpoint(self, method, url):
+        path = url[len(self.baseURL):] if url.startswith(self.baseURL) else url
+        path = path.split("?")[0]
+        path = re.sub(r'^/ibm/iis/[a-z-]+/(v1/|api/)?', '/', path)
+        segments = path.split("/")
+        for i in range(1, len(segments)):
+            if segments[i - 1] in _identifier_segments and segments[i] not in _bundle_endpoints and segments[i] != "":
+                segments[i] = "{id}"
+        return method.upper() + " " + "/".join(segments)
+
+    def recordRequest(self, method, url, elapsed, bytes_sent, bytes_received, status_code):
+        endpoint = self.getEndpoint(method, url)
+        with self.lock:
+            if endpoint not in self.endpoints:
+                self.endpoints[endpoint] = {
+                    "latencies": [],
+                    "bytes_sent": 0,
+                    "bytes_received": 0,
+                    "errors": 0
+                }
+            stats = self.endpoints[endpoint]
+            stats['latencies'].append(elapsed)
+            stats['bytes_sent'] += bytes_sent
+            stats['bytes_received'] += bytes_received
+            if status_code >= 400:
+                stats['errors'] += 1
+
+    def incrementCounter(self, name, count=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + count
+
+    def recordCacheLookup(self, cache_name, hit):
+        with self.lock:
+            if cache_name not in self.caches:
+                self.caches[cache_name] = {"hits": 0, "misses": 0}
+            if hit:
+                self.caches[cache_name]['hits'] += 1
+            else:
+                self.caches[cache_name]['misses'] += 1
+
+    def getSummary(self):
+        with self.lock:
+            summary = {
+                "endpoints": {},
+                "counters": dict(self.counters),
+                "caches": {}
+            }
+            for endpoint, stats in self.endpoints.items():
+                latencies = sorted(stats['latencies'])
+                summary['endpoints'][endpoint] = {
+                    "count": len(latencies),
+                    "errors": stats['errors'],
+                    "total_seconds": round(sum(latencies), 3),
+                    "p50_seconds": _get_percentile(latencies, 50),
+                    "p95_seconds": _get_percentile(latencies, 95),
+                    "p99_seconds": _get_percentile(latencies, 99),
+                    "max_seconds": round(latencies[-1], 3),
+                    "bytes_sent": stats['bytes_sent'],
+                    "bytes_received": stats['bytes_received']
+                }
+            for cache_name, lookups in self.caches.items():
+                total = lookups['hits'] + lookups['misses']
+                summary['caches'][cache_name] = {
+                    "hits": lookups['hits'],
+                    "misses": lookups['misses'],
+                    "hit_ratio": round(lookups['hits'] / total, 3) if total > 0 else 0
+                }
+            return summary
+
+
+# Nearest-rank percentile of an (already sorted) list of latencies
+def _get_percentile(latencies, percentile):
+    if len(latencies) == 0:
+        return 0
+    rank = int(-(-len(latencies) * percentile // 100))
+    return round(latencies[max(rank, 1) - 1], 3)
+
+
+def _get_bytes_sent(response):
+    body = response.request.body if response.request is not None else None
+    if body is None:
+        return 0
+    elif hasattr(body, '__len__'):
+        return len(body)
+    else:
+        return 0
+
+
+# (a streamed response cannot be measured without consuming it, so is only
+# measured when the server reports its length)
+def _get_bytes_received(response, stream):
+    length = response.headers.get('Content-Length')
+    if length is not None and length.isdigit():
+        return int(length)
+    elif not stream:
+        return len(response.content)
+    else:
+        return 0
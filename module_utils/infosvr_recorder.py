@@ -0,0 +1,236 @@
+###
+# Copyright 2018 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+"""
+This module adds generic utility functions for recording the REST API traffic of a run against Information Server
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import codecs
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Set to the name of a file to record every REST API request (and response) of the modules into it
+RECORD_ENV = "IBM_INFOSVR_IMPEXP_RECORD"
+BASE_URL_PLACEHOLDER = "{base_url}"
+SCRUBBED = "********"
+# Connectivity and credentials, which are never recorded as arguments
+_connection_args = ["host", "port", "user", "password", "cert"]
+
+
+class Recorder(object):
+    """
+    Appends every request made through a requests.Session (and its response)
+    to a fixture file, as JSON lines -- with the server's address and any
+    credentials scrubbed -- so that the run can later be replayed without a server
+    """
+
+    def __init__(self, module, session, base_url, api, filename):
+        self.baseURL = base_url
+        self.host = base_url.split("://")[-1].split(":")[0]
+        self.secrets = [v for v in getattr(module, 'no_log_values', []) if v and len(str(v)) > 2]
+        self.filename = filename
+        self.lock = threading.Lock()
+        # (unset arguments are left out, so that replaying them does not conflict with the arguments that were set)
+        args = dict((k, v) for k, v in module.params.items()
+                    if k not in _connection_args and not k.startswith('_') and v is not None)
+        self._write({
+            "session": {
+                "module": getattr(module, '_name', None),
+                "api": api,
+                "run": "%d-%d" % (os.getpid(), int(_get_run_start() * 1000)),
+                "recorded": int(time.time() * 1000),
+                "args": json.loads(self.scrub(json.dumps(args)))
+            }
+        })
+        self._instrument(session)
+
+    def _instrument(self, session):
+        request = session.request
+
+        def recorded_request(method, url, *args, **kwargs):
+            r = request(method, url, *args, **kwargs)
+            if kwargs.get('stream', False):
+                self.recordStreamedInteraction(r)
+            else:
+                self.recordInteraction(r)
+            return r
+
+        session.request = recorded_request
+
+    # Replaces the server's address (so that the fixture can be replayed
+    # against any other) and any secrets in the text
+    def scrub(self, text):
+        text = text.replace(self.baseURL, BASE_URL_PLACEHOLDER).replace(self.host, "{host}")
+        for secret in self.secrets:
+            text = text.replace(str(secret), SCRUBBED)
+        return text
+
+    def _getInteraction(self, response):
+        request = response.request
+        interaction = {
+            "method": request.method,
+            "url": self.scrub(request.url),
+            "status": response.status_code,
+            "type": response.headers.get('Content-Type', "")
+        }
+        body = request.body
+        if body is not None:
+            interaction['body'] = _get_compact(self.scrub(_to_text(body)))
+        return interaction
+
+    def recordInteraction(self, response):
+        interaction = self._getInteraction(response)
+        interaction['response'] = _get_compact(self.scrub(response.text))
+        self._write(interaction)
+
+    # Records a streamed response without ever reading it into memory: the
+    # chunks are scrubbed and spooled to a temporary file as the caller
+    # iterates through them, and the interaction is only written out (from
+    # that file) once the response has been fully read or is closed
+    def recordStreamedInteraction(self, response):
+        interaction = self._getInteraction(response)
+        spool = _StreamSpool(self)
+        iter_content = response.iter_content
+        close = response.close
+
+        def recorded_iter_content(*args, **kwargs):
+            for chunk in iter_content(*args, **kwargs):
+                spool.add(chunk)
+                yield chunk
+            spool.finish(interaction)
+
+        def recorded_close():
+            spool.finish(interaction)
+            close()
+
+        response.iter_content = recorded_iter_content
+        response.close = recorded_close
+
+    def _write(self, entry):
+        self._writeLine([json.dumps(entry, separators=(',', ':'), sort_keys=True)])
+
+    # Writes a single line from the parts provided (which may be a generator, so
+    # that a large entry need never be held in memory all at once)
+    def _writeLine(self, parts):
+        with self.lock:
+            if self.filename.endswith(".gz"):
+                f = gzip.open(self.filename, 'ab')
+                for part in parts:
+                    f.write(part.encode('utf-8'))
+                f.write(b"\n")
+            else:
+                f = io.open(self.filename, 'a', encoding='utf-8')
+                for part in parts:
+                    f.write(_to_unicode(part))
+                f.write(u"\n")
+            f.close()
+
+
+class _StreamSpool(object):
+    """
+    Scrubs the chunks of a streamed response into a temporary file, holding
+    back just enough of the end of each chunk that anything to be scrubbed
+    that spans two chunks is still found
+    """
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.holdBack = max([len(str(s)) for s in recorder.secrets] + [len(recorder.baseURL), len(recorder.host)]) - 1
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.pending = u""
+        self.finished = False
+        tmpfd, self.tmpfile = tempfile.mkstemp()
+        self.f = io.open(tmpfd, 'w', encoding='utf-8')
+
+    def add(self, chunk):
+        if isinstance(chunk, bytes):
+            chunk = self.decoder.decode(chunk)
+        self._spool(self.pending + chunk)
+
+    def _spool(self, text, final=False):
+        text = self.recorder.scrub(text)
+        cut = len(text) if final else max(len(text) - self.holdBack, 0)
+        self.f.write(_to_unicode(text[:cut]))
+        self.pending = text[cut:]
+
+    def finish(self, interaction):
+        if self.finished:
+            return
+        self.finished = True
+        self._spool(self.pending + self.decoder.decode(b"", final=True), final=True)
+        self.f.close()
+        try:
+            header = json.dumps(interaction, separators=(',', ':'), sort_keys=True)
+            self.recorder._writeLine(self._getParts(header))
+        finally:
+            os.unlink(self.tmpfile)
+
+    # (the response is always kept as a string, appended to the rest of the interaction)
+    def _getParts(self, header):
+        yield header[:-1] + ',"response":"'
+        with io.open(self.tmpfile, 'r', encoding='utf-8') as f:
+            while True:
+                text = f.read(1048576)
+                if not text:
+                    break
+                yield json.dumps(text)[1:-1]
+        yield '"}'
+
+
+# Returns a Recorder for the session if recording has been requested via the environment
+def get_recorder(module, session, base_url, api):
+    filename = os.environ.get(RECORD_ENV)
+    if filename:
+        return Recorder(module, session, base_url, api, filename)
+    return None
+
+
+# Keeps JSON as (compact) JSON within the fixture, rather than as an escaped string
+def _get_compact(text):
+    try:
+        return {"json": json.loads(text)}
+    except ValueError:
+        return text
+
+
+def _to_text(body):
+    if isinstance(body, bytes):
+        return body.decode('utf-8', 'replace')
+    return body
+
+
+# (Python 2 strings must be unicode to be written to an io file)
+def _to_unicode(text):
+    if isinstance(text, bytes):
+        return text.decode('utf-8')
+    return text
+
+
+# All the sessions of a single module run share the same start time
+_run_start = []
+
+
+def _get_run_start():
+    if len(_run_start) == 0:
+        _run_start.append(time.time())
+    return _run_start[0]
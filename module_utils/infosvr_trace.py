@@ -0,0 +1,99 @@
+###
+# Copyright 2018 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+"""
+This module adds generic utility functions for tracing the phases of processing against Information Server
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from contextlib import contextmanager
+import json
+import os
+import threading
+import time
+
+
+class Tracer(object):
+    """
+    Records timed spans in the Chrome Trace Event format (which can be opened
+    by chrome://tracing, Perfetto, Speedscope, etc) -- without a filename every
+    span is a no-op, so instrumentation can be left in place at (almost) no cost
+    """
+
+    def __init__(self, filename=None, process_name=None):
+        self.filename = filename
+        self.enabled = bool(filename)
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.events = []
+        if self.enabled and process_name:
+            self.events.append({
+                "name": "process_name",
+                "ph": "M",
+                "pid": self.pid,
+                "tid": 0,
+                "args": {"name": process_name}
+            })
+
+    @contextmanager
+    def span(self, name, category="phase", **args):
+        if not self.enabled:
+            yield
+            return
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.addSpan(name, category, start, time.time() - start, args)
+
+    def addSpan(self, name, category, start, duration, args=None):
+        if not self.enabled:
+            return
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            # (timestamps are in microseconds since the epoch, so that the
+            # traces of several tasks appended to the same file line up)
+            "ts": int(start * 1000000),
+            "dur": int(duration * 1000000),
+            "pid": self.pid,
+            "tid": threading.current_thread().ident
+        }
+        if args:
+            event['args'] = args
+        with self.lock:
+            self.events.append(event)
+
+    # Appends the spans recorded so far to any trace already in the file
+    def write(self):
+        if not self.enabled or len(self.events) == 0:
+            return
+        trace = {"traceEvents": [], "displayTimeUnit": "ms"}
+        if os.path.exists(self.filename):
+            try:
+                with open(self.filename, 'r') as f:
+                    existing = json.load(f)
+                if isinstance(existing, dict) and 'traceEvents' in existing:
+                    trace = existing
+            except ValueError:
+                pass
+        with self.lock:
+            trace['traceEvents'].extend(self.events)
+            self.events = []
+        with open(self.filename, 'w') as f:
+            json.dump(trace, f)
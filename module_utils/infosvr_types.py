@@ -22,6 +22,7 @@ __metaclass__ = type
 
 import re
 
+# The properties needed (on top of those to extract it) to track the watermark of an asset
 common_properties = ["modified_on"]
 
 # TODO: known missing asset types:
@@ -29,12 +30,14 @@ common_properties = ["modified_on"]
 #  - dsstage_type (related to adding your own stages in DataStage)
 #  - data_element (covered by table_definition, which will be modified when an element is modified)
 #  - (ds)data_connection (related to DCNs -- not clear how these are addressed in DataStage)
-asset_type_to_properties = {
-    "dsjob": ["type"] + common_properties,
-    "routine": common_properties,
-    "shared_container": ["type"] + common_properties,
-    "table_definition": ["data_store", "data_schema", "data_source_name", "data_source_type"] + common_properties,
-    "parameter_set": common_properties,
+# Only the properties needed to build the extract object of each type (see get_asset_extract_object)
+# -- the _id, _type, _name and _context of every asset are always returned
+asset_type_to_extract_properties = {
+    "dsjob": ["type"],
+    "routine": [],
+    "shared_container": ["type"],
+    "table_definition": ["data_source_name", "data_source_type"],
+    "parameter_set": [],
     "data_class": [
         "class_code",
         "provider",
@@ -42,22 +45,22 @@ asset_type_to_properties = {
         "parent_data_class.provider",
         "parent_data_class.parent_data_class.class_code",
         "parent_data_class.parent_data_class.provider"
-    ] + common_properties,
-    "extension_mapping_document": ["file_name", "parent_folder"] + common_properties,
-    "application": common_properties,
-    "file": common_properties,
-    "stored_procedure_definition": common_properties,
-    "data_rule_definition": ["project"] + common_properties,
-    "data_rule_set_definition": ["project"] + common_properties,
-    "data_rule": ["project"] + common_properties,
-    "data_rule_set": ["project"] + common_properties,
-    "metric": ["project"] + common_properties,
-    "label": ["name"],
-    "logical_data_model": ["namespace"] + common_properties,
-    "physical_data_model": ["namespace"] + common_properties,
-    "database": common_properties,
-    "database_schema": common_properties,
-    "data_file": common_properties
+    ],
+    "extension_mapping_document": ["file_name"],
+    "application": [],
+    "file": [],
+    "stored_procedure_definition": [],
+    "data_rule_definition": ["project"],
+    "data_rule_set_definition": ["project"],
+    "data_rule": ["project"],
+    "data_rule_set": ["project"],
+    "metric": ["project"],
+    "label": [],
+    "logical_data_model": ["namespace"],
+    "physical_data_model": ["namespace"],
+    "database": [],
+    "database_schema": [],
+    "data_file": []
 }
 
 asset_relationship_properties_to_single_types = {
@@ -169,12 +172,112 @@ asset_blacklists = {
     ]
 }
 
+# The nested relationship paths through which a change to a related asset is
+# considered a change to an asset of the type (for change detection), and how
+# a change to the asset itself combines with them:
+#  - 'and': the asset itself must have changed, as well as something along one of the paths
+#  - 'or': either the asset itself or something along one of the paths must have changed
+#  - 'nullable': as for 'and', but where there is nothing along a path it is also considered changed
+# (any type mapped to None has no modified_on against which to detect changes,
+# and any type not listed considers only changes to the asset itself)
+asset_type_to_change_paths = {
+    "application": {
+        "combine": "or",
+        "paths": [
+            "object_types",
+            "object_types.methods",
+            "object_types.methods.input_parameters",
+            "object_types.methods.output_values"
+        ]
+    },
+    "stored_procedure_definition": {
+        "combine": "or",
+        "paths": [
+            "in_parameters",
+            "out_parameters",
+            "inout_parameters",
+            "result_columns"
+        ]
+    },
+    "data_rule": {"combine": "nullable", "paths": ["execution_history"]},
+    "data_rule_set": {"combine": "nullable", "paths": ["execution_history"]},
+    "metric": {"combine": "nullable", "paths": ["execution_history"]},
+    "logical_data_model": {
+        "combine": "and",
+        "paths": [
+            "contains_logical_data_models",
+            "subject_areas",
+            "logical_entities",
+            "logical_domains"
+        ]
+    },
+    "physical_data_model": {
+        "combine": "and",
+        "paths": [
+            "contains_physical_models",
+            "contains_design_tables",
+            "contains_design_views",
+            "contains_design_stored_procedures",
+            "physical_domains"
+        ]
+    },
+    "database": {
+        "combine": "and",
+        "paths": [
+            "database_schemas",
+            "database_schemas.stored_procedures",
+            "database_schemas.views",
+            "database_schemas.database_tables",
+            "database_schemas.database_tables.database_columns",
+            "database_schemas.views.database_columns"
+        ]
+    },
+    "database_schema": {
+        "combine": "and",
+        "paths": [
+            "stored_procedures",
+            "views",
+            "database_tables",
+            "database_tables.database_columns",
+            "views.database_columns"
+        ]
+    },
+    "data_file": {
+        "combine": "and",
+        "paths": [
+            "data_file_records",
+            "data_file_records.data_file_fields"
+        ]
+    },
+    "label": None
+}
+
+
+# Returns the properties needed to extract the asset type and to track its
+# watermark (any type that has no modified_on has only those to extract it) --
+# where changes along a path are detected even if the asset itself has not
+# changed, the modified_on along that path is needed as well
+def get_properties(asset_type, additional_paths=None):
+    change_paths = get_change_paths(asset_type, additional_paths)
+    if change_paths is None:
+        return get_extract_properties(asset_type)
+    properties = get_extract_properties(asset_type) + common_properties
+    if change_paths['combine'] == "or":
+        properties += [path + ".modified_on" for path in change_paths['paths']]
+    return properties
 
-def get_properties(asset_type):
-    if asset_type in asset_type_to_properties:
-        return asset_type_to_properties[asset_type]
-    else:
-        return common_properties
+
+def get_extract_properties(asset_type):
+    return list(asset_type_to_extract_properties.get(asset_type, []))
+
+
+# Strips an asset (as returned by a search) down to what get_asset_extract_object
+# needs: its own _url, and the _id and _url of everything in its context
+def minify_for_extract(asset):
+    asset.pop('_url', None)
+    for ctx in asset.get('_context', []):
+        ctx.pop('_id', None)
+        ctx.pop('_url', None)
 
 
 def get_asset_extract_object(asset_type, rest_result):
@@ -221,6 +324,91 @@ def get_asset_extract_object(asset_type, rest_result):
         return "UNIMPLEMENTED"
 
 
+# Returns how changes are detected for the asset type (see asset_type_to_change_paths),
+# with any additional paths, or None if they cannot be detected
+def get_change_paths(asset_type, additional_paths=None):
+    if asset_type.startswith('$'):
+        # (changes to an OpenIGC asset are detected across all of the bundle's types at once)
+        change_paths = {"combine": "or", "paths": []}
+    elif asset_type in asset_type_to_change_paths:
+        change_paths = asset_type_to_change_paths[asset_type]
+    else:
+        change_paths = {"combine": "self", "paths": []}
+    if change_paths is None:
+        return None
+    change_paths = {"combine": change_paths['combine'], "paths": list(change_paths['paths'])}
+    if additional_paths:
+        if change_paths['combine'] == "self":
+            change_paths['combine'] = "or"
+        change_paths['paths'] += [path for path in additional_paths if path not in change_paths['paths']]
+    return change_paths
+
+
+# Returns the conditions (to be AND'd together) that detect changes to the
+# asset type between the times given, as a single query (nesting the paths
+# into one OR'd condition)
+def get_change_conditions(asset_type, from_time, to_time, additional_paths=None):
+    change_paths = get_change_paths(asset_type, additional_paths)
+    if change_paths is None:
+        return []
+    combine = change_paths['combine']
+    modified = _get_modified_condition(None, from_time, to_time)
+    if combine == "self":
+        return [modified]
+    nested = []
+    if combine == "or":
+        nested.append(modified)
+    for path in change_paths['paths']:
+        if combine == "nullable":
+            nested.append({"property": path, "operator": "isNull"})
+        nested.append(_get_modified_condition(path, from_time, to_time))
+    conditions = [{"conditions": nested, "operator": "or"}]
+    if combine != "or":
+        conditions.append(modified)
+    return conditions
+
+
+# Returns the same detection as get_change_conditions, but split into one
+# branch per path: each with the path and the conditions (to be AND'd
+# together) that detect changes along only that path -- the union of the
+# assets found by every branch is the same as those found by the single query
+def get_change_branches(asset_type, from_time, to_time, additional_paths=None):
+    change_paths = get_change_paths(asset_type, additional_paths)
+    if change_paths is None:
+        return [{"path": None, "conditions": []}]
+    combine = change_paths['combine']
+    modified = _get_modified_condition(None, from_time, to_time)
+    branches = []
+    if combine == "self" or combine == "or":
+        branches.append({"path": None, "conditions": [modified]})
+    for path in change_paths['paths']:
+        if combine == "or":
+            branches.append({"path": path, "conditions": [_get_modified_condition(path, from_time, to_time)]})
+        else:
+            if combine == "nullable":
+                branches.append({"path": path, "conditions": [{"property": path, "operator": "isNull"}, modified]})
+            branches.append({"path": path, "conditions": [_get_modified_condition(path, from_time, to_time), modified]})
+    return branches
+
+
+# Returns the conditions that any asset detected by get_change_branches must
+# meet itself, regardless of the branch through which it was detected
+def get_change_self_conditions(asset_type, from_time, to_time, additional_paths=None):
+    change_paths = get_change_paths(asset_type, additional_paths)
+    if change_paths is None or change_paths['combine'] == "self" or change_paths['combine'] == "or":
+        return []
+    return [_get_modified_condition(None, from_time, to_time)]
+
+
+def _get_modified_condition(path, from_time, to_time):
+    return {
+        "min": from_time,
+        "max": to_time,
+        "property": "modified_on" if path is None else path + ".modified_on",
+        "operator": "between"
+    }
+
+
 def get_mapped_value(from_type, from_property, from_value, mappings):
     # default case: return the originally-provided value
     mapped_value = from_value
@@ -245,19 +433,59 @@ def is_supported_by_import_asset_values(asset_type):
 
 
 def get_mapped_identity(json_object, mappings=[]):
-    new_obj = {}
-    _type = json_object['_type']
-    _name = get_mapped_value(_type, 'name', json_object['_name'], mappings)
-    new_obj['_type'] = _type
-    new_obj['_name'] = _name
-    new_obj['_context'] = []
-    for ctx in json_object['_context']:
-        _ctx = get_mapped_value(ctx['_type'], 'name', ctx['_name'], mappings)
-        new_obj['_context'].append({
-            '_type': ctx['_type'],
-            '_name': _ctx
-        })
-    return new_obj
+    return get_identity_as_json(_map_identity(_get_raw_identity(json_object), mappings))
+
+
+def get_identity_as_json(identity):
+    # Translates an identity tuple (as produced by IdentityMapper) back into
+    # the minimal JSON form used in relationship files
+    return {
+        '_type': identity[0],
+        '_name': identity[1],
+        '_context': [{'_type': ctx_type, '_name': ctx_name} for ctx_type, ctx_name in identity[2]]
+    }
+
+
+def _get_raw_identity(json_object):
+    ctx = tuple((item['_type'], item['_name']) for item in json_object['_context'])
+    return (json_object['_type'], json_object['_name'], ctx)
+
+
+def _map_identity(raw_identity, mappings):
+    _type, _name, ctx = raw_identity
+    mapped_ctx = tuple((ctx_type, get_mapped_value(ctx_type, 'name', ctx_name, mappings)) for ctx_type, ctx_name in ctx)
+    return (_type, get_mapped_value(_type, 'name', _name, mappings), mapped_ctx)
+
+
+class IdentityMapper(object):
+    """
+    Memoizes the mapping of asset identities: the same related asset (eg. a term
+    assigned to thousands of columns) is only mapped once, and every subsequent
+    lookup for it returns the same interned (hashable) identity tuple
+    """
+    def __init__(self, mappings=[]):
+        self.mappings = mappings
+        self.identityByRaw = {}
+        self.internedIdentities = {}
+        self.jsonByIdentity = {}
+
+    def getIdentity(self, json_object):
+        raw = _get_raw_identity(json_object)
+        identity = self.identityByRaw.get(raw)
+        if identity is None:
+            identity = _map_identity(raw, self.mappings)
+            identity = self.internedIdentities.setdefault(identity, identity)
+            self.identityByRaw[raw] = identity
+        return identity
+
+    # Returns a shared JSON representation of the identity, for output only
+    # (callers must not modify the returned object)
+    def getJson(self, identity):
+        as_json = self.jsonByIdentity.get(identity)
+        if as_json is None:
+            as_json = get_identity_as_json(identity)
+            self.jsonByIdentity[identity] = as_json
+        return as_json
 
 
 def _getRidOnly(rest_result):
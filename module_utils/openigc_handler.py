@@ -21,6 +21,8 @@ from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
 from lxml import etree
+from collections import OrderedDict
+import copy
 import re
 
 
@@ -31,6 +33,38 @@ ns = {
 t_format = "%Y-%m-%dT%H:%M:%S"
 
 
+def get_assets_to_keep(rids, type_by_rid, parent_by_rid, children_by_rid, complete_types):
+    """
+    Computes the closure of assets to keep: each of the provided RIDs, all of
+    its ancestors and its immediate children -- returned as (partial, complete,
+    missing) lists of RIDs, in a deterministic order (the order of first visit)
+    """
+    keep = OrderedDict()
+    missing = []
+    for rid in rids:
+        if rid not in type_by_rid:
+            missing.append(rid)
+            continue
+        if rid not in keep:
+            keep[rid] = True
+            # Every asset already in the closure has all of its ancestors in
+            # the closure as well, so the walk can stop at the first one found
+            current_rid = rid
+            while current_rid in parent_by_rid:
+                parent_rid = parent_by_rid[current_rid]
+                if parent_rid not in type_by_rid or parent_rid in keep:
+                    break
+                keep[parent_rid] = True
+                current_rid = parent_rid
+        for child_rid in children_by_rid.get(rid, []):
+            if child_rid in type_by_rid and child_rid not in keep:
+                keep[child_rid] = True
+    complete_types = set(complete_types)
+    partial = [rid for rid in keep if type_by_rid[rid] not in complete_types]
+    complete = [rid for rid in keep if type_by_rid[rid] in complete_types]
+    return partial, complete, missing
+
+
 class OpenIGCHandler(object):
     def __init__(self, module, result, oigcfile):
         self.module = module
@@ -39,75 +73,146 @@ class OpenIGCHandler(object):
         for key in ns:
             etree.register_namespace(key, ns[key])
         self.root = self.tree.getroot()
+        self._indexAssets()
+
+    # Indexes every asset by its RID, along with its parent and every asset it
+    # references, in a single pass of the document -- so that none of the
+    # lookups below need to scan the whole document again
+    def _indexAssets(self):
+        self.assetsByRid = {}
+        self.typeByRid = {}
+        self.parentByRid = {}
+        self.referencesByRid = {}
+        for e_asset in self.getAssets():
+            rid = self.getRid(e_asset)
+            if rid is None:
+                continue
+            if rid in self.assetsByRid:
+                self.module.warn("Multiple assets with same RID found: " + rid)
+                continue
+            self.assetsByRid[rid] = e_asset
+            self.typeByRid[rid] = self.getType(e_asset)
+            _index_references(e_asset, rid, self.parentByRid, references_by_rid=self.referencesByRid)
 
     def getAssets(self):
         return self.root.xpath("./x:assets/x:asset", namespaces=ns)
 
     def getRid(self, e_asset):
         # Trim off the 'ID_' portion of the id to get the rid
-        attr_id = e_asset.xpath("./@ID", namespaces=ns)
-        if len(attr_id) == 1:
-            return attr_id[0][3:]
-        elif len(attr_id) > 1:
-            self.module.warn("Found multiple ID attributes!")
-            return attr_id[0][3:]
+        attr_id = e_asset.get("ID")
+        if attr_id is not None:
+            return attr_id[3:]
         else:
-            self.module.warn("No ID attribute found: " + e_asset)
+            self.module.warn("No ID attribute found: " + e_asset.tag)
             return None
 
     def getType(self, e_asset):
-        type_id = e_asset.xpath("./@class", namespaces=ns)
-        if len(type_id) == 1:
-            return type_id[0]
-        elif len(type_id) > 1:
-            self.module.warn("Found multiple class attributes!")
-            return type_id[0]
+        type_id = e_asset.get("class")
+        if type_id is not None:
+            return type_id
         else:
-            self.module.warn("No class attribute found: " + e_asset)
+            self.module.warn("No class attribute found: " + e_asset.tag)
             return None
 
-    def getAssetById(self, rid):
-        asset_list = self.root.xpath("./x:assets/x:asset[@ID='ID_" + rid + "']", namespaces=ns)
-        if len(asset_list) == 1:
-            return asset_list[0]
-        elif len(asset_list) > 1:
-            self.module.warn("Multiple assets with same RID found: " + rid)
-            return asset_list[0]
-        else:
-            self.module.warn("Asset not found with RID: " + rid)
-            return None
+    # Splits the assets into chunks of (roughly) chunk_size assets, returned as
+    # a list of waves: every asset referenced by an asset (its ancestors, and
+    # any other asset it refers to) is in an earlier wave than the asset itself,
+    # unless they are in the same chunk, so the chunks within a wave can be
+    # loaded in any order.
+    # An asset of a complete type is always kept in the same chunk as all of
+    # its descendants, as loading it as complete without them would remove
+    # them from the target environment.
+    def getUploadChunks(self, chunk_size, complete_types):
+        complete_types = set(complete_types)
+        depthByRid = {}
+        for rid in self.assetsByRid:
+            self._getDepth(rid, depthByRid)
+        ordered = sorted(self.assetsByRid.keys(), key=lambda rid: depthByRid[rid])
+        # The anchor of each asset is its highest ancestor of a complete type,
+        # or the asset itself if there is no such ancestor
+        anchorByRid = {}
+        groups = OrderedDict()
+        for rid in ordered:
+            anchor = rid
+            parent_rid = self.parentByRid.get(rid)
+            if parent_rid in anchorByRid and self.typeByRid[anchorByRid[parent_rid]] in complete_types:
+                anchor = anchorByRid[parent_rid]
+            anchorByRid[rid] = anchor
+            groups.setdefault(anchor, []).append(rid)
+        waves = OrderedDict()
+        for anchor, group in groups.items():
+            # (a group follows every asset referenced from outside of the group)
+            in_group = set(group)
+            wave = 0
+            for rid in group:
+                for referenced_rid in self._getReferenced(rid):
+                    if referenced_rid not in in_group:
+                        wave = max(wave, depthByRid[referenced_rid] + 1)
+            chunks = waves.setdefault(wave, [[]])
+            if len(chunks[-1]) > 0 and len(chunks[-1]) + len(group) > chunk_size:
+                chunks.append([])
+            chunks[-1].extend(group)
+        return [waves[depth] for depth in sorted(waves.keys())]
 
-    def getReferencedAsset(self, e_asset):
-        e_ref = e_asset.xpath("./x:reference", namespaces=ns)
-        asset_ids = None
-        if len(e_ref) == 1:
-            asset_ids = e_ref[0].xpath("./@assetIDs", namespaces=ns)[0]
-        elif len(e_ref) > 1:
-            self.module.warn("Multiple references found for: " + self.getRid(e_asset))
-            asset_ids = e_ref[0].xpath("./@assetIDs", namespaces=ns)[0]
-        if asset_ids is not None:
-            return self.getAssetById(asset_ids[3:])
-        else:
-            return None
+    # The RIDs of the assets (within the document) that the asset references
+    def _getReferenced(self, rid):
+        return [ref_rid for ref_rid in self.referencesByRid.get(rid, []) if ref_rid in self.assetsByRid and ref_rid != rid]
 
-    def getAncestralAssetRids(self, rid):
-        e_asset = self.getAssetById(rid)
-        if e_asset is not None:
-            e_parent = self.getReferencedAsset(e_asset)
-            if e_parent is not None:
-                parent_rid = self.getRid(e_parent)
-                return ([parent_rid] + self.getAncestralAssetRids(parent_rid))
-            else:
-                return []
-        else:
-            return []
+    # Length of the longest chain of references from the asset to other assets
+    # within the document (ignoring any reference that would form a cycle)
+    def _getDepth(self, rid, depthByRid):
+        visiting = set()
+        stack = [rid]
+        while len(stack) > 0:
+            current_rid = stack[-1]
+            if current_rid in depthByRid:
+                stack.pop()
+                continue
+            referenced = self._getReferenced(current_rid)
+            if current_rid not in visiting:
+                visiting.add(current_rid)
+                pending = [ref_rid for ref_rid in referenced if ref_rid not in depthByRid and ref_rid not in visiting]
+                if len(pending) > 0:
+                    stack.extend(pending)
+                    continue
+            depthByRid[current_rid] = max([depthByRid[ref_rid] + 1 for ref_rid in referenced if ref_rid in depthByRid] + [0])
+            visiting.discard(current_rid)
+            stack.pop()
+        return depthByRid[rid]
 
-    def getAssetChildrenRids(self, rid):
-        a_references = []
-        references = self.root.xpath("./x:assets/x:asset/x:reference[@assetIDs='ID_" + rid + "']", namespaces=ns)
-        for reference in references:
-            a_references.append(self.getRid(reference.getparent()))
-        return a_references
+    # Builds a self-contained document for only the provided RIDs: any asset
+    # they reference (directly, or through the assets they reference in turn,
+    # such as their ancestors) that is not itself in the chunk is included as a
+    # partial, so that every reference in the chunk can be resolved
+    def getChunkAsString(self, rids, complete_types):
+        complete_types = set(complete_types)
+        in_chunk = set(rids)
+        context_rids = []
+        seen = set()
+        pending = list(rids)
+        while len(pending) > 0:
+            for ref_rid in self._getReferenced(pending.pop()):
+                if ref_rid not in in_chunk and ref_rid not in seen:
+                    seen.add(ref_rid)
+                    context_rids.append(ref_rid)
+                    pending.append(ref_rid)
+        # (referenced assets precede those that reference them)
+        depthByRid = {}
+        context_rids.sort(key=lambda ref_rid: self._getDepth(ref_rid, depthByRid))
+        e_root = etree.Element(self.root.tag, attrib=dict(self.root.attrib), nsmap=self.root.nsmap)
+        e_assets = etree.SubElement(e_root, _qname('assets'))
+        for rid in context_rids + list(rids):
+            e_assets.append(copy.deepcopy(self.assetsByRid[rid]))
+        e_original = self.root.xpath("./x:importAction", namespaces=ns)
+        e_importAction = etree.SubElement(e_root, _qname('importAction'))
+        if len(e_original) > 0:
+            for key, value in e_original[0].attrib.items():
+                e_importAction.set(key, value)
+        partial_rids = context_rids + [rid for rid in rids if self.typeByRid[rid] not in complete_types]
+        complete_rids = [rid for rid in rids if self.typeByRid[rid] in complete_types]
+        _setImportActionIds(e_importAction, "partialAssetIDs", partial_rids)
+        _setImportActionIds(e_importAction, "completeAssetIDs", complete_rids)
+        return etree.tostring(e_root, encoding='UTF-8', xml_declaration=True)
 
     def getImportActions(self):
         e_importAction = self.root.xpath("./x:importAction", namespaces=ns)
@@ -134,6 +239,12 @@ class OpenIGCHandler(object):
             e_importAction[0].attrib.pop("completeAssetIDs", None)
 
     def dropAsset(self, e_asset):
+        rid = self.getRid(e_asset)
+        if self.assetsByRid.get(rid) is e_asset:
+            del self.assetsByRid[rid]
+            del self.typeByRid[rid]
+            self.parentByRid.pop(rid, None)
+            self.referencesByRid.pop(rid, None)
         parent = e_asset.getparent()
         parent.remove(e_asset)
         self.result['changed'] = True
@@ -143,3 +254,147 @@ class OpenIGCHandler(object):
 
     def getCustomizedXMLAsString(self):
         return etree.tostring(self.root, encoding='UTF-8', xml_declaration=True)
+
+
+class OpenIGCStreamFilter(object):
+    """
+    Filters an OpenIGC bundle XML file without ever holding the whole document
+    in memory: a first streaming pass collects only the IDs, classes and parent
+    references of the assets, and a second streaming pass writes out only the
+    assets to keep (clearing every element as soon as it has been processed)
+    """
+    def __init__(self, module, result, oigcfile):
+        self.module = module
+        self.result = result
+        self.oigcfile = oigcfile
+        for key in ns:
+            etree.register_namespace(key, ns[key])
+        self._indexAssets()
+
+    def _indexAssets(self):
+        self.typeByRid = {}
+        self.parentByRid = {}
+        self.childrenByRid = {}
+        self.multipleReferences = set()
+        for event, e_asset in etree.iterparse(self.oigcfile, events=('end',), tag=_qname('asset'), huge_tree=True):
+            attr_id = e_asset.get("ID")
+            if attr_id is None:
+                self.module.warn("No ID attribute found: " + e_asset.tag)
+            elif attr_id[3:] in self.typeByRid:
+                self.module.warn("Multiple assets with same RID found: " + attr_id[3:])
+            else:
+                rid = attr_id[3:]
+                self.typeByRid[rid] = e_asset.get("class")
+                if _index_references(e_asset, rid, self.parentByRid, self.childrenByRid) > 1:
+                    self.multipleReferences.add(rid)
+            _releaseElement(e_asset)
+
+    def getAssetsToKeep(self, rids, complete_types):
+        partial, complete, missing = get_assets_to_keep(rids,
+                                                        self.typeByRid,
+                                                        self.parentByRid,
+                                                        self.childrenByRid,
+                                                        complete_types)
+        for rid in missing:
+            self.module.warn("Asset not found with RID: " + rid)
+        return partial, complete
+
+    # Streams the document into filename, retaining only the partial and
+    # complete assets (and setting them as the import action's partials and
+    # completes) -- returns the number of assets that were retained
+    def writeFilteredXML(self, filename, partial_rids, complete_rids):
+        keep = set(partial_rids) | set(complete_rids)
+        # (only the first reference of an asset is taken as its parent)
+        for rid in sorted(keep & self.multipleReferences):
+            self.module.warn("Multiple references found for: " + rid)
+        kept_count = 0
+        depth = 0
+        open_elements = []
+        with etree.xmlfile(filename, encoding='UTF-8') as xf:
+            xf.write_declaration()
+            for event, element in etree.iterparse(self.oigcfile, events=('start', 'end'), huge_tree=True):
+                if event == 'start':
+                    depth += 1
+                    # Only the root and the assets container are left open, so
+                    # that assets can be streamed into them one at a time (with
+                    # the namespaces declared only once, on the root)
+                    if depth == 1 or (depth == 2 and element.tag == _qname('assets')):
+                        e_open = xf.element(element.tag, dict(element.attrib), nsmap=element.nsmap if depth == 1 else None)
+                        e_open.__enter__()
+                        open_elements.append(e_open)
+                    continue
+                if depth == 3 and element.tag == _qname('asset') and element.getparent().tag == _qname('assets'):
+                    attr_id = element.get("ID")
+                    if attr_id is not None and attr_id[3:] in keep:
+                        _writeElement(xf, element)
+                        kept_count += 1
+                    else:
+                        self.result['changed'] = True
+                    _releaseElement(element)
+                elif depth == 2:
+                    if element.tag == _qname('assets'):
+                        open_elements.pop().__exit__(None, None, None)
+                    else:
+                        if element.tag == _qname('importAction'):
+                            _setImportActionIds(element, "partialAssetIDs", partial_rids)
+                            _setImportActionIds(element, "completeAssetIDs", complete_rids)
+                        _writeElement(xf, element)
+                    _releaseElement(element)
+                elif depth == 1:
+                    open_elements.pop().__exit__(None, None, None)
+                depth -= 1
+        return kept_count
+
+
+# Indexes the references of an asset: the asset is a child of every asset it
+# references, but only the first reference is taken as its parent -- returns
+# the number of references
+def _index_references(e_asset, rid, parent_by_rid, children_by_rid=None, references_by_rid=None):
+    e_refs = e_asset.findall("./x:reference", namespaces=ns)
+    referenced = []
+    for e_ref in e_refs:
+        asset_ids = e_ref.get("assetIDs")
+        if asset_ids is not None and asset_ids[3:] not in referenced:
+            referenced.append(asset_ids[3:])
+    if len(e_refs) > 0 and e_refs[0].get("assetIDs") is not None:
+        parent_by_rid[rid] = e_refs[0].get("assetIDs")[3:]
+    if children_by_rid is not None:
+        for referenced_rid in referenced:
+            children_by_rid.setdefault(referenced_rid, []).append(rid)
+    if references_by_rid is not None:
+        references_by_rid[rid] = referenced
+    return len(e_refs)
+
+
+# Writes an element into an incremental xmlfile within the elements already
+# open there (as xf.write would redeclare every namespace on the element)
+def _writeElement(xf, element):
+    if callable(element.tag):
+        xf.write(element)
+        return
+    with xf.element(element.tag, dict(element.attrib)):
+        if element.text:
+            xf.write(element.text)
+        for child in element:
+            _writeElement(xf, child)
+            if child.tail:
+                xf.write(child.tail)
+
+
+def _qname(tag):
+    return "{" + ns['x'] + "}" + tag
+
+
+# Frees the memory of an element (and any preceding siblings) once it has been processed
+def _releaseElement(element):
+    element.clear()
+    while element.getprevious() is not None:
+        del element.getparent()[0]
+
+
+def _setImportActionIds(e_importAction, attr_name, asset_rids):
+    # Put the 'ID_' prefix back onto all of the assets that are left
+    if len(asset_rids) > 0:
+        e_importAction.set(attr_name, "ID_" + (" ID_".join(asset_rids)))
+    else:
+        e_importAction.attrib.pop(attr_name, None)
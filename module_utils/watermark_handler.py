@@ -0,0 +1,127 @@
+###
+# Copyright 2018 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+"""
+This module adds generic utility functions for persisting change-detection watermarks (JSON state files)
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from ansible.module_utils._text import to_bytes, to_native
+
+
+class WatermarkHandler(object):
+    """
+    Tracks the latest modified_on seen by each export (by module, asset type
+    and criteria) in a state file, so that the next run can pick up exactly
+    where the last successful one left off
+    """
+
+    def __init__(self, module, result, state_file):
+        self.module = module
+        self.result = result
+        self.stateFile = state_file
+        self.state = {"watermarks": {}}
+        if os.path.exists(state_file):
+            try:
+                with open(state_file, 'r') as f:
+                    self.state = json.load(f)
+            except ValueError:
+                module.fail_json(msg='Unable to read watermarks from state file: ' + state_file, **result)
+        self.tracked = {}
+
+    # Starts tracking the watermark of an export, returning a summary of it
+    # (its key, and its value before and after this run) that is kept up-to-date
+    def track(self, scope, asset_type, criteria):
+        key = get_watermark_key(scope, asset_type, criteria)
+        previous = self.state['watermarks'].get(key, {}).get('modified_on')
+        self.tracked[key] = {
+            "asset_type": asset_type,
+            "criteria": criteria,
+            "summary": {
+                "key": key,
+                "previous": previous,
+                "current": previous
+            }
+        }
+        return self.tracked[key]['summary']
+
+    # Returns the time from which to consider changes: just after the
+    # watermark, if there is one, otherwise the default provided
+    def getFromTime(self, key, default):
+        previous = self.tracked[key]['summary']['previous']
+        if previous is None:
+            return default
+        return previous + 1
+
+    # Advances the watermark to the latest modified_on of the assets: their own,
+    # or that along any path retrieved (eg. "object_types.modified_on") -- ignoring
+    # any after the to_time of the run, which the next run will still pick up
+    def observeAssets(self, key, assets):
+        summary = self.tracked[key]['summary']
+        current = summary['current']
+        to_time = summary.get('to_time')
+        for asset in assets:
+            for prop, values in asset.items():
+                if prop != 'modified_on' and not prop.endswith('.modified_on'):
+                    continue
+                if not isinstance(values, list):
+                    values = [values]
+                for modified_on in values:
+                    if not isinstance(modified_on, (int, float)) or (to_time is not None and modified_on > to_time):
+                        continue
+                    if current is None or modified_on > current:
+                        current = modified_on
+        summary['current'] = current
+
+    # Persists the watermarks (only called once the export has succeeded, so
+    # that a failed run is retried from the same point next time)
+    def save(self):
+        advanced = False
+        for key, tracked in self.tracked.items():
+            summary = tracked['summary']
+            if summary['current'] is None or summary['current'] == summary['previous']:
+                continue
+            self.state['watermarks'][key] = {
+                "asset_type": tracked['asset_type'],
+                "criteria": tracked['criteria'],
+                "modified_on": summary['current'],
+                "saved": int(time.time() * 1000)
+            }
+            advanced = True
+        if not advanced:
+            return
+        try:
+            tmpfd, tmpfile = tempfile.mkstemp()
+            f = os.fdopen(tmpfd, 'w')
+            json.dump(self.state, f, indent=2, sort_keys=True)
+            f.close()
+        except IOError:
+            self.module.fail_json(msg='Unable to create temporary file to output watermarks', **self.result)
+        b_dest = to_bytes(self.stateFile, errors='surrogate_or_strict')
+        self.module.atomic_move(tmpfile, to_native(os.path.realpath(b_dest), errors='surrogate_or_strict'))
+
+
+# Watermarks are kept separately for every combination of module, asset type
+# and criteria (conditions, etc) -- as each is a different export
+def get_watermark_key(scope, asset_type, criteria):
+    digest = hashlib.sha1(to_bytes(json.dumps(criteria, sort_keys=True))).hexdigest()
+    return scope + "::" + asset_type + "::" + digest[:12]
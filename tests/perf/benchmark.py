@@ -0,0 +1,418 @@
+#!/usr/bin/env python
+
+###
+# Copyright 2018 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+"""
+Benchmarks the modules of the role against synthetic catalogs of increasing
+scale (served in-process by igc_fake_server), recording the wall time, CPU
+time, peak memory and REST API requests of every run as JSON -- so that the
+effect of a change can be measured, and compared across versions.
+
+    python benchmark.py --scales 1000,100000,1000000 --output results.json
+
+Every module is run in a separate (child) process, so that the peak memory of
+one run does not mask that of the next; the input files each module needs
+(relationships JSON, a business glossary XML) are generated up-front, into
+the work directory, from the same synthetic catalog that is served.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROLE = os.path.abspath(os.path.join(HERE, "..", ".."))
+BASE_URL = "https://fake:9446"
+BG_NS = "http://www.ibm.com/is/bg/importexport"
+
+# The arguments of each module (other than connectivity), given the dataset files of a scale
+BENCHMARKS = {
+    "igc_extract_relationships": lambda data: {
+        "asset_type": "term",
+        "relationships": ["assigned_assets"],
+        "dest": data['output'] + ".json"
+    },
+    "igc_load_relationships": lambda data: {
+        "src": data['relationships_a'],
+        "mode": "APPEND"
+    },
+    "igc_merge_relationships": lambda data: {
+        "src": [data['relationships_a'], data['relationships_b']],
+        "dest": data['output'] + ".json"
+    },
+    "igc_json_to_asset_values_csv": lambda data: {
+        "src": data['relationships_a'],
+        "dest": data['output'] + ".csv"
+    },
+    "glossary_filter_changes": lambda data: {
+        "src": data['glossary_copy'],
+        "assets_to_keep": data['glossary_keep']
+    },
+    "igc_extract_openigc_assets": lambda data: {
+        "bundle_name": "$Synthetic",
+        "dest": data['output'] + ".xml",
+        "assets_to_keep": data['bundle_keep']
+    }
+}
+# Modules that do not connect to the REST API
+OFFLINE = ["igc_merge_relationships", "glossary_filter_changes"]
+
+
+def _import_fake_server():
+    if HERE not in sys.path:
+        sys.path.insert(0, HERE)
+    import igc_fake_server
+    return igc_fake_server
+
+
+def _get_reference(catalog, asset_type, idx):
+    return {
+        "_type": catalog.levels[asset_type].context_type,
+        "_name": catalog.getName(asset_type, idx)
+    }
+
+
+def _get_identity(catalog, asset_type, idx):
+    identity = _get_reference(catalog, asset_type, idx)
+    identity['_context'] = [_get_reference(catalog, t, i) for t, i in catalog.getContext(asset_type, idx)]
+    return identity
+
+
+# Writes the terms of the catalog (and their assigned assets) in the format
+# produced by igc_extract_relationships -- one asset at a time, so that large
+# scales do not need to be held in memory; the offset shifts the assignments
+# (and the start) so that two files overlap without being identical
+def write_relationships(catalog, filename, offset=0):
+    terms = catalog.levels['term'].count
+    columns = catalog.levels['database_column'].count
+    with open(filename, 'w') as f:
+        f.write("[")
+        for n, idx in enumerate(range(offset * terms // 2, terms)):
+            asset = _get_identity(catalog, "term", idx)
+            related = catalog.getRelated("term", idx, "assigned_assets")[1]
+            asset['assigned_assets'] = [
+                _get_identity(catalog, t, (i + offset) % columns) for t, i in related
+            ]
+            f.write((", " if n > 0 else "") + json.dumps(asset))
+        f.write("]")
+
+
+# Writes the glossary of the catalog as a business glossary XML export,
+# returning the RIDs of every tenth asset (to keep)
+def write_glossary(catalog, filename):
+    keep = []
+    with io.open(filename, 'w', encoding='utf-8') as f:
+        f.write(u'<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write(u'<glossary xmlns="%s">\n' % BG_NS)
+        f.write(u'<customAttributesDefinitions>\n')
+        for n in range(10):
+            f.write(u'<customAttributeDef rid="ca%d" name="Attribute_%d"><appliesTo>'
+                    u'<classType value="TERM"/></appliesTo></customAttributeDef>\n' % (n, n))
+        f.write(u'</customAttributesDefinitions>\n')
+        for section, element, asset_type in [
+            ("categories", "category", "category"),
+            ("terms", "term", "term"),
+            ("rules", "rule", "information_governance_rule"),
+            ("labelDefinitions", "labelDefinition", "label")
+        ]:
+            f.write(u'<%s>\n' % section)
+            for idx in range(catalog.levels[asset_type].count):
+                rid = catalog.getRid(asset_type, idx)
+                if idx % 10 == 0:
+                    keep.append(rid)
+                f.write(u'<%s rid="%s" name="%s"><customAttributes>'
+                        u'<customAttributeValue customAttribute="Attribute_%d" value="%d"/>'
+                        u'</customAttributes></%s>\n' % (element, rid, catalog.getName(asset_type, idx), idx % 10, idx, element))
+            f.write(u'</%s>\n' % section)
+        f.write(u'<synonymGroups>\n')
+        for idx in range(0, catalog.levels['term'].count - 1, 2):
+            f.write(u'<synonymGroup><synonyms><termRef rid="%s"/><termRef rid="%s"/></synonyms></synonymGroup>\n' % (
+                catalog.getRid("term", idx), catalog.getRid("term", idx + 1)))
+        f.write(u'</synonymGroups>\n')
+        f.write(u'</glossary>\n')
+    return keep
+
+
+def generate_datasets(fake_server, scale, options, workdir):
+    catalog = fake_server.SyntheticCatalog(scale, options.fanout, options.assignments)
+    data = {}
+    data['relationships_a'] = os.path.join(workdir, "relationships_a.json")
+    data['relationships_b'] = os.path.join(workdir, "relationships_b.json")
+    data['glossary'] = os.path.join(workdir, "glossary.xml")
+    write_relationships(catalog, data['relationships_a'])
+    write_relationships(catalog, data['relationships_b'], 1)
+    data['glossary_keep'] = write_glossary(catalog, data['glossary'])
+    leaves = catalog.levels['$Synthetic-Leaf'].count
+    data['bundle_keep'] = [catalog.getRid('$Synthetic-Leaf', idx) for idx in range(0, leaves, 100)]
+    data['catalog_assets'] = sum(level.count for level in catalog.levels.values())
+    return data
+
+
+def _get_peak_rss():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # (reported in bytes on macOS, but kilobytes elsewhere)
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _load_module(name):
+    filename = os.path.join(ROLE, "library", name + ".py")
+    try:
+        import importlib.util
+        spec = importlib.util.spec_from_file_location(name, filename)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    except ImportError:
+        import imp
+        return imp.load_source(name, filename)
+
+
+# Runs a single module in this (child) process, against an in-process fake
+# (or a replay of recorded traffic), and prints a JSON summary of the run as
+# the last line of output
+def run_child(spec):
+    fake_server = _import_fake_server()
+    import ansible.module_utils
+    ansible.module_utils.__path__.append(os.path.join(ROLE, "module_utils"))
+    from ansible.module_utils import basic
+    from ansible.module_utils._text import to_bytes
+
+    # (never record the traffic of a benchmark, or a replay, over any recording)
+    os.environ.pop("IBM_INFOSVR_IMPEXP_RECORD", None)
+    if 'fixture' in spec:
+        import igc_replay
+        run = igc_replay.load_fixture(spec['fixture'])[spec['run']]
+        fake = igc_replay.ReplayIGC(run['interactions'], BASE_URL)
+    else:
+        catalog = fake_server.SyntheticCatalog(spec['scale'], spec['fanout'], spec['assignments'])
+        fake = fake_server.FakeIGC(catalog, BASE_URL, spec['latency'])
+    fake_server.install(fake)
+
+    args = dict(spec['args'])
+    if spec['module'] not in OFFLINE:
+        args.update({"host": "fake", "port": "9446", "user": "benchmark", "password": "benchmark"})
+    basic._ANSIBLE_ARGS = to_bytes(json.dumps({"ANSIBLE_MODULE_ARGS": args}))
+    if hasattr(basic, '_ANSIBLE_PROFILE'):
+        # (more recent versions of Ansible also expect the serialization profile of the arguments)
+        basic._ANSIBLE_PROFILE = "legacy"
+    module = _load_module(spec['module'])
+
+    try:
+        from StringIO import StringIO
+    except ImportError:
+        from io import StringIO
+    output = StringIO()
+    stdout = sys.stdout
+    error = None
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    rss_before = _get_peak_rss()
+    start = time.time()
+    sys.stdout = output
+    try:
+        module.main()
+    except SystemExit:
+        pass
+    except Exception:
+        error = traceback.format_exc()
+    finally:
+        sys.stdout = stdout
+    wall = time.time() - start
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+
+    module_result = {}
+    try:
+        module_result = json.loads(output.getvalue().strip().splitlines()[-1])
+    except (ValueError, IndexError):
+        pass
+    summary = {
+        "wall_seconds": round(wall, 3),
+        "cpu_user_seconds": round(usage_after.ru_utime - usage_before.ru_utime, 3),
+        "cpu_system_seconds": round(usage_after.ru_stime - usage_before.ru_stime, 3),
+        "peak_rss_bytes": _get_peak_rss(),
+        "baseline_rss_bytes": rss_before,
+        "failed": error is not None or module_result.get('failed', False),
+        "requests": fake.getStats()
+    }
+    if error is not None:
+        summary['error'] = error[-2000:]
+    elif 'msg' in module_result:
+        summary['msg'] = module_result['msg']
+    # Retain only the counts of the module's result (not the assets themselves)
+    summary['result'] = dict((k, v) for k, v in module_result.items()
+                             if isinstance(v, (int, float)) and not isinstance(v, bool))
+    print(json.dumps(summary))
+
+
+def run_benchmark(options, module, scale, data):
+    if module == "glossary_filter_changes":
+        # (the module filters its src in-place, so each run needs a fresh copy)
+        data['glossary_copy'] = os.path.join(options.workdir, str(scale), "glossary_filtered.xml")
+        shutil.copyfile(data['glossary'], data['glossary_copy'])
+    data['output'] = os.path.join(options.workdir, str(scale), module + "_output")
+    spec = {
+        "module": module,
+        "scale": scale,
+        "fanout": options.fanout,
+        "assignments": options.assignments,
+        "latency": options.latency,
+        "args": BENCHMARKS[module](data)
+    }
+    run = {"module": module, "scale": scale, "args": _summarise_args(spec['args'])}
+    run.update(run_spec(options, spec))
+    return run
+
+
+# Runs the module described by the spec in a child process, returning the summary of its run
+def run_spec(options, spec):
+    # (the spec is passed on stdin, as the arguments can be longer than a command-line allows)
+    command = [options.python, os.path.abspath(__file__), "--child"]
+    start = time.time()
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               universal_newlines=True)
+    timer = _Timeout(process, options.timeout)
+    stdout, stderr = process.communicate(json.dumps(spec))
+    timer.cancel()
+    try:
+        return json.loads(stdout.strip().splitlines()[-1])
+    except (ValueError, IndexError):
+        return {
+            "failed": True,
+            "wall_seconds": round(time.time() - start, 3),
+            "error": "timed out" if timer.expired else (stderr.strip() or "no output")[-2000:]
+        }
+
+
+class _Timeout(object):
+    """
+    Kills a child process that has run for longer than the timeout
+    """
+
+    def __init__(self, process, timeout):
+        import threading
+        self.expired = False
+        self.timer = None
+        if timeout > 0:
+            self.timer = threading.Timer(timeout, self._kill, [process])
+            self.timer.start()
+
+    def _kill(self, process):
+        self.expired = True
+        process.kill()
+
+    def cancel(self):
+        if self.timer is not None:
+            self.timer.cancel()
+
+
+# Long lists of arguments (eg. RIDs to keep) are recorded as their length only
+def _summarise_args(args):
+    summary = {}
+    for k, v in args.items():
+        summary[k] = ("<%d items>" % len(v)) if isinstance(v, list) and len(v) > 10 else v
+    return summary
+
+
+def _get_environment(options):
+    try:
+        revision = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROLE,
+                                           universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    interpreter = subprocess.check_output([options.python, "-c", "import platform; print(platform.python_version())"],
+                                          universal_newlines=True).strip()
+    return {
+        "timestamp": datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "revision": revision,
+        "python": interpreter,
+        "platform": platform.platform(),
+        "fanout": options.fanout,
+        "assignments": options.assignments,
+        "latency": options.latency
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the modules against synthetic catalogs")
+    parser.add_argument("--scales", default="1000,100000", help="comma-separated catalog sizes")
+    parser.add_argument("--modules", default=",".join(sorted(BENCHMARKS.keys())), help="comma-separated modules")
+    parser.add_argument("--repeat", type=int, default=1, help="runs of each module at each scale")
+    parser.add_argument("--fanout", type=int, default=10, help="children per parent in the data hierarchy")
+    parser.add_argument("--assignments", type=int, default=3, help="related assets per term / rule")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of latency added to every request")
+    parser.add_argument("--timeout", type=float, default=3600, help="seconds before a run is abandoned (0 = never)")
+    parser.add_argument("--python", default=sys.executable, help="interpreter with which to run the modules")
+    parser.add_argument("--workdir", help="directory for the generated datasets (default: a temporary one)")
+    parser.add_argument("--output", help="file into which to write the results (default: stdout)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.child:
+        run_child(json.loads(sys.stdin.read()))
+        return
+
+    modules = [m.strip() for m in options.modules.split(",") if m.strip() != ""]
+    for module in modules:
+        if module not in BENCHMARKS:
+            parser.error("unknown module: %s (expected one of %s)" % (module, ", ".join(sorted(BENCHMARKS.keys()))))
+    cleanup = options.workdir is None
+    options.workdir = options.workdir or tempfile.mkdtemp(prefix="infosvr-benchmark-")
+    fake_server = _import_fake_server()
+
+    results = {"environment": _get_environment(options), "runs": []}
+    try:
+        for scale in [int(s) for s in options.scales.split(",")]:
+            scale_dir = os.path.join(options.workdir, str(scale))
+            if not os.path.isdir(scale_dir):
+                os.makedirs(scale_dir)
+            start = time.time()
+            data = generate_datasets(fake_server, scale, options, scale_dir)
+            sys.stderr.write("scale %d: %d assets, datasets generated in %.1fs\n" % (
+                scale, data['catalog_assets'], time.time() - start))
+            for module in modules:
+                for n in range(options.repeat):
+                    run = run_benchmark(options, module, scale, data)
+                    run['catalog_assets'] = data['catalog_assets']
+                    run['repetition'] = n
+                    results['runs'].append(run)
+                    sys.stderr.write("  %-30s %10.3fs %8d requests %8.1f MB%s\n" % (
+                        module, run['wall_seconds'], run.get('requests', {}).get('requests', 0),
+                        run.get('peak_rss_bytes', 0) / 1048576.0, "  FAILED" if run['failed'] else ""))
+    finally:
+        if cleanup:
+            shutil.rmtree(options.workdir, ignore_errors=True)
+
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    else:
+        print(json.dumps(results, indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,847 @@
+#!/usr/bin/env python
+
+###
+# Copyright 2018 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+"""
+A stand-in for the IGC (and IA) REST APIs of an Information Server domain tier,
+serving a synthetic catalog -- so that the modules can be benchmarked and
+regression-tested without a live environment.
+
+The catalog is generated procedurally (assets are computed from their index
+rather than held in memory), so catalogs of millions of assets cost little more
+than small ones; only the changes made through the API are held in memory.
+
+It can be used either in-process (by mounting FakeIGCAdapter onto a
+requests.Session, or by calling install() to mount it onto every new session),
+or as a server on localhost:
+
+    python igc_fake_server.py --size 100000 --port 9446 --certfile cert.pem --keyfile key.pem
+
+(RestIGC always connects over HTTPS, so a certificate is needed for the
+server to be used by the modules; eg. generate a self-signed one with
+"openssl req -x509 -newkey rsa:2048 -nodes -keyout key.pem -out cert.pem -subj /CN=localhost
+-addext subjectAltName=DNS:localhost", and pass cert.pem as the cert of the modules)
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import argparse
+import io
+import json
+import random
+import re
+import ssl
+import threading
+import time
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+try:
+    from urllib.parse import urlsplit, parse_qs
+except ImportError:
+    from urlparse import urlsplit, parse_qs
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+IGC_REST = "/ibm/iis/igc-rest/v1"
+IA_REST = "/ibm/iis/ia/api"
+BUNDLE = "$Synthetic"
+WORKFLOW_TYPES = ["category", "term", "information_governance_policy", "information_governance_rule"]
+WORKFLOW_TRANSITIONS = {
+    "request": ("DRAFT", "WAITING_APPROVAL"),
+    "approve": ("WAITING_APPROVAL", "APPROVED"),
+    "publish": ("APPROVED", None),
+    "return": (None, "DRAFT"),
+    "discard": (None, None)
+}
+# All assets are last modified within the 30 days prior to this time (ms)
+BASE_TIME = 1546300800000
+TIME_SPAN = 30 * 24 * 60 * 60 * 1000
+
+
+class AssetLevel(object):
+    """
+    One type of asset in the catalog: its assets are spread evenly across the
+    assets of its parent type, so that both directions can be computed directly
+    """
+
+    def __init__(self, asset_type, display_name, prefix, count, parent_type=None, parent_prop=None,
+                 children_prop=None, context_type=None, properties=None):
+        self.asset_type = asset_type
+        self.display_name = display_name
+        self.prefix = prefix
+        self.count = max(1, int(count))
+        self.parent_type = parent_type
+        self.parent_prop = parent_prop
+        self.children_prop = children_prop
+        self.context_type = context_type or asset_type
+        self.properties = properties or []
+
+
+class Assignment(object):
+    """
+    A many-to-many relationship from every source asset to per_source target
+    assets, laid out so that the inverse relationship can also be computed
+    """
+
+    def __init__(self, source_type, prop, target_type, inverse_prop, per_source):
+        self.source_type = source_type
+        self.prop = prop
+        self.target_type = target_type
+        self.inverse_prop = inverse_prop
+        self.per_source = per_source
+
+
+class SyntheticCatalog(object):
+    """
+    A catalog of roughly size assets: a physical data hierarchy (hosts down to
+    columns), a glossary (categories and terms assigned to columns), governance
+    rules implemented by columns and governing tables, labels, and an OpenIGC
+    bundle of three levels
+    """
+
+    def __init__(self, size=1000, fanout=10, assignments=3, workflow_ratio=0.0, seed=0):
+        self.size = size
+        self.seed = seed
+        self.lock = threading.Lock()
+        columns = size * 0.6
+        tables = columns / fanout
+        schemas = tables / fanout
+        databases = schemas / 5
+        terms = size * 0.2
+        categories = terms / 50
+        bundle = size * 0.1
+        self.levels = {}
+        for level in [
+            AssetLevel("host", "Host", "hst", databases / 5, context_type="host_(engine)",
+                       children_prop="databases"),
+            AssetLevel("database", "Database", "db", databases, "host", "host", "database_schemas"),
+            AssetLevel("database_schema", "Database Schema", "sch", schemas, "database", "database", "database_tables"),
+            AssetLevel("database_table", "Database Table", "tbl", tables, "database_schema", "database_schema",
+                       "database_columns"),
+            AssetLevel("database_column", "Database Column", "col", columns, "database_table", "database_table",
+                       properties=["data_type", "position"]),
+            AssetLevel("category", "Category", "cat", categories, children_prop="terms"),
+            AssetLevel("term", "Term", "trm", terms, "category", "parent_category"),
+            AssetLevel("label", "Label", "lbl", 10),
+            AssetLevel("information_governance_rule", "Information Governance Rule", "igr", size * 0.01),
+            AssetLevel(BUNDLE + "-Root", "Root", "oro", bundle * 0.01, children_prop="$Child"),
+            AssetLevel(BUNDLE + "-Child", "Child", "och", bundle * 0.09, BUNDLE + "-Root", "$Root", "$Leaf"),
+            AssetLevel(BUNDLE + "-Leaf", "Leaf", "olf", bundle * 0.9, BUNDLE + "-Child", "$Child")
+        ]:
+            self.levels[level.asset_type] = level
+        self.typeByPrefix = dict((level.prefix, level.asset_type) for level in self.levels.values())
+        self.assignments = [
+            Assignment("term", "assigned_assets", "database_column", "assigned_to_terms", assignments),
+            Assignment("information_governance_rule", "implemented_by_assets", "database_column",
+                       "implements_rules", assignments),
+            Assignment("information_governance_rule", "governs_assets", "database_table",
+                       "governed_by_rules", assignments),
+            Assignment("term", "labels", "label", "labeled_assets", 1)
+        ]
+        self.workflowPeriod = int(round(1 / workflow_ratio)) if workflow_ratio > 0 else 0
+        # Only changes made through the API are held in memory
+        self.overrides = {}
+        self.created = {}
+
+    # Identity and basic properties
+
+    def getRid(self, asset_type, idx):
+        return "%s.%s.%d" % ("b1c497ce", self.levels[asset_type].prefix, idx)
+
+    def parseRid(self, rid):
+        parts = rid.split(".")
+        if len(parts) != 3 or parts[0] != "b1c497ce" or parts[1] not in self.typeByPrefix:
+            return None, None
+        asset_type = self.typeByPrefix[parts[1]]
+        try:
+            idx = int(parts[2])
+        except ValueError:
+            return None, None
+        if idx < 0 or idx >= self.levels[asset_type].count:
+            return None, None
+        return asset_type, idx
+
+    def getName(self, asset_type, idx):
+        return "%s_%d" % (self.levels[asset_type].display_name.replace(" ", ""), idx)
+
+    def getModifiedOn(self, asset_type, idx):
+        overridden = self.overrides.get(self.getRid(asset_type, idx), {})
+        if 'modified_on' in overridden:
+            return overridden['modified_on']
+        # (deterministic, but spread across the whole span)
+        return BASE_TIME + ((idx * 2654435761 + len(asset_type) * 40503) % TIME_SPAN)
+
+    def getWorkflowState(self, asset_type, idx):
+        if asset_type not in WORKFLOW_TYPES or self.workflowPeriod == 0:
+            return []
+        overridden = self.overrides.get(self.getRid(asset_type, idx), {})
+        if 'workflow_current_state' in overridden:
+            return overridden['workflow_current_state']
+        return ["DRAFT"] if idx % self.workflowPeriod == 0 else []
+
+    def isWorkflowEnabled(self):
+        return self.workflowPeriod > 0
+
+    # Relationships
+
+    def getParent(self, asset_type, idx):
+        level = self.levels[asset_type]
+        if level.parent_type is None:
+            return None
+        parent = self.levels[level.parent_type]
+        return level.parent_type, idx * parent.count // level.count
+
+    def getChildren(self, asset_type, idx):
+        for level in self.levels.values():
+            if level.parent_type == asset_type:
+                parent_count = self.levels[asset_type].count
+                start = -(-idx * level.count // parent_count)
+                end = -(-(idx + 1) * level.count // parent_count)
+                return level.asset_type, range(start, end)
+        return None, []
+
+    def getContext(self, asset_type, idx):
+        context = []
+        parent = self.getParent(asset_type, idx)
+        while parent is not None:
+            context.insert(0, parent)
+            parent = self.getParent(parent[0], parent[1])
+        return context
+
+    def _getAssigned(self, assignment, idx):
+        source_count = self.levels[assignment.source_type].count
+        target_count = self.levels[assignment.target_type].count
+        stride = max(1, target_count // source_count)
+        return sorted(set((idx * stride + j) % target_count for j in range(assignment.per_source)))
+
+    def _getAssignedInverse(self, assignment, idx):
+        source_count = self.levels[assignment.source_type].count
+        target_count = self.levels[assignment.target_type].count
+        stride = max(1, target_count // source_count)
+        sources = set()
+        for j in range(assignment.per_source):
+            for value in (idx - j, idx - j + target_count):
+                if value >= 0 and value % stride == 0 and value // stride < source_count:
+                    sources.add(value // stride)
+        return sorted(s for s in sources if idx in self._getAssigned(assignment, s))
+
+    # Returns the related (type, idx) pairs of the relationship, (True, pairs) for
+    # a multi-valued relationship or (False, pairs) for a single-valued one, or
+    # None if the property is not a relationship of the asset type
+    def getRelated(self, asset_type, idx, prop):
+        rid = self.getRid(asset_type, idx)
+        overridden = self.overrides.get(rid, {})
+        level = self.levels[asset_type]
+        multi = None
+        related = None
+        if prop == level.parent_prop:
+            multi = False
+            parent = self.getParent(asset_type, idx)
+            related = [parent] if parent is not None else []
+        elif prop == level.children_prop:
+            multi = True
+            child_type, child_range = self.getChildren(asset_type, idx)
+            related = [(child_type, i) for i in child_range]
+        else:
+            for assignment in self.assignments:
+                if assignment.source_type == asset_type and assignment.prop == prop:
+                    multi = True
+                    related = [(assignment.target_type, i) for i in self._getAssigned(assignment, idx)]
+                elif assignment.target_type == asset_type and assignment.inverse_prop == prop:
+                    multi = True
+                    related = [(assignment.source_type, i) for i in self._getAssignedInverse(assignment, idx)]
+        if multi is None:
+            return None
+        if prop in overridden:
+            related = [self.parseRid(r) for r in overridden[prop]]
+            related = [r for r in related if r[0] is not None]
+        return multi, related
+
+    def getRelationshipProperties(self, asset_type):
+        level = self.levels[asset_type]
+        props = []
+        if level.parent_prop:
+            props.append(level.parent_prop)
+        if level.children_prop:
+            props.append(level.children_prop)
+        for assignment in self.assignments:
+            if assignment.source_type == asset_type:
+                props.append(assignment.prop)
+            elif assignment.target_type == asset_type:
+                props.append(assignment.inverse_prop)
+        return props
+
+    # The asset type at the other end of a relationship property (or None if it is not one)
+    def getRelatedType(self, asset_type, prop):
+        level = self.levels[asset_type]
+        if prop == level.parent_prop:
+            return level.parent_type
+        elif prop == level.children_prop:
+            return self.getChildren(asset_type, 0)[0]
+        for assignment in self.assignments:
+            if assignment.source_type == asset_type and assignment.prop == prop:
+                return assignment.target_type
+            elif assignment.target_type == asset_type and assignment.inverse_prop == prop:
+                return assignment.source_type
+        return None
+
+    def getEditableProperties(self, asset_type):
+        props = ["name", "short_description"] + self.levels[asset_type].properties
+        return props + self.getRelationshipProperties(asset_type)
+
+    # Values of a (possibly dotted) property path, as a list (empty when null)
+    def getValues(self, asset_type, idx, path):
+        prop, _, rest = path.partition(".")
+        related = self.getRelated(asset_type, idx, prop)
+        if related is not None:
+            if rest == "":
+                return [self.getRid(t, i) for t, i in related[1]]
+            values = []
+            for rel_type, rel_idx in related[1]:
+                values.extend(self.getValues(rel_type, rel_idx, rest))
+            return values
+        value = self.getScalar(asset_type, idx, prop)
+        if value is None:
+            return []
+        elif isinstance(value, list):
+            return value
+        return [value]
+
+    def getScalar(self, asset_type, idx, prop):
+        overridden = self.overrides.get(self.getRid(asset_type, idx), {})
+        if prop in overridden and prop not in ('modified_on', 'workflow_current_state'):
+            return overridden[prop]
+        if prop == "_id":
+            return self.getRid(asset_type, idx)
+        elif prop == "name" or prop == "_name":
+            return self.getName(asset_type, idx)
+        elif prop == "modified_on":
+            return self.getModifiedOn(asset_type, idx)
+        elif prop == "created_on":
+            return BASE_TIME - TIME_SPAN
+        elif prop == "workflow_current_state":
+            return self.getWorkflowState(asset_type, idx)
+        elif prop == "short_description":
+            return "Synthetic %s %d" % (self.levels[asset_type].display_name.lower(), idx)
+        elif prop == "data_type":
+            return ["VARCHAR", "INTEGER", "DATE", "DECIMAL"][idx % 4]
+        elif prop == "position":
+            return idx % 50
+        return None
+
+    # Updates
+
+    def update(self, rid, value):
+        asset_type, idx = self.parseRid(rid)
+        if asset_type is None:
+            return False
+        with self.lock:
+            overridden = self.overrides.setdefault(rid, {})
+            for prop, new_value in value.items():
+                related = self.getRelated(asset_type, idx, prop)
+                if related is not None and related[0] and isinstance(new_value, dict):
+                    items = list(new_value.get('items', []))
+                    if new_value.get('mode', 'append') == 'append':
+                        existing = [self.getRid(t, i) for t, i in related[1]]
+                        items = existing + [r for r in items if r not in existing]
+                    overridden[prop] = items
+                elif related is not None:
+                    overridden[prop] = [new_value] if new_value else []
+                else:
+                    overridden[prop] = new_value
+            overridden['modified_on'] = int(time.time() * 1000)
+        return True
+
+    def takeWorkflowAction(self, rids, action):
+        if action not in WORKFLOW_TRANSITIONS or not self.isWorkflowEnabled():
+            return False
+        from_state, to_state = WORKFLOW_TRANSITIONS[action]
+        with self.lock:
+            for rid in rids:
+                asset_type, idx = self.parseRid(rid)
+                if asset_type is None:
+                    return False
+                current = self.getWorkflowState(asset_type, idx)
+                if from_state is not None and current != [from_state]:
+                    return False
+                overridden = self.overrides.setdefault(rid, {})
+                overridden['workflow_current_state'] = [to_state] if to_state else []
+        return True
+
+
+class QueryEngine(object):
+    """
+    Evaluates IGC REST search queries (types, properties, nested where
+    conditions and paging) against a SyntheticCatalog
+    """
+
+    def __init__(self, catalog, base_url):
+        self.catalog = catalog
+        self.baseURL = base_url
+        self.cursors = {}
+        self.cursorCount = 0
+        self.lock = threading.Lock()
+
+    def search(self, query):
+        types = [t for t in query.get('types', []) if t in self.catalog.levels]
+        where = query.get('where')
+        matches = []
+        for asset_type in types:
+            for idx in self._getCandidates(asset_type, where):
+                if where is None or self._matches(asset_type, idx, where):
+                    matches.append((asset_type, idx))
+        with self.lock:
+            self.cursorCount += 1
+            cursor = str(self.cursorCount)
+            self.cursors[cursor] = (query, matches)
+        return self.getPage(cursor, 0, int(query.get('pageSize', 10)))
+
+    def getPage(self, cursor, begin, page_size):
+        if cursor not in self.cursors:
+            return None
+        query, matches = self.cursors[cursor]
+        end = min(begin + page_size, len(matches))
+        items = [self.renderAsset(t, i, query.get('properties', [])) for t, i in matches[begin:end]]
+        paging = {
+            "numTotal": len(matches),
+            "pageSize": page_size,
+            "begin": begin,
+            "end": end - 1
+        }
+        if end < len(matches):
+            paging['next'] = "%s%s/search?cursor=%s&begin=%d&pageSize=%d" % (self.baseURL, IGC_REST, cursor, end, page_size)
+        return {"items": items, "paging": paging}
+
+    # Only the assets named by an _id condition (if any) need be evaluated
+    def _getCandidates(self, asset_type, where):
+        if where is not None and where.get('operator', 'and').lower() == 'and':
+            for condition in where.get('conditions', []):
+                if condition.get('property') == '_id' and not condition.get('negated', False):
+                    if condition.get('operator') == '=':
+                        rids = [condition.get('value')]
+                    elif condition.get('operator') == 'in':
+                        rids = condition.get('value', [])
+                    else:
+                        continue
+                    candidates = []
+                    for rid in rids:
+                        rid_type, idx = self.catalog.parseRid(rid)
+                        if rid_type == asset_type:
+                            candidates.append(idx)
+                    return candidates
+        return range(self.catalog.levels[asset_type].count)
+
+    def _matches(self, asset_type, idx, where):
+        results = []
+        for condition in where.get('conditions', []):
+            if 'conditions' in condition:
+                results.append(self._matches(asset_type, idx, condition))
+            else:
+                results.append(self._matchesCondition(asset_type, idx, condition))
+        if len(results) == 0:
+            return True
+        if where.get('operator', 'and').lower() == 'or':
+            return any(results)
+        return all(results)
+
+    def _matchesCondition(self, asset_type, idx, condition):
+        values = self.catalog.getValues(asset_type, idx, condition.get('property', ''))
+        operator = condition.get('operator')
+        expected = condition.get('value')
+        if operator == '=':
+            result = expected in values
+        elif operator == '<>':
+            result = expected not in values
+        elif operator == 'in':
+            result = any(v in expected for v in values)
+        elif operator == 'between':
+            result = any(condition['min'] <= v <= condition['max'] for v in values)
+        elif operator == '>':
+            result = any(v > expected for v in values)
+        elif operator == '>=':
+            result = any(v >= expected for v in values)
+        elif operator == '<':
+            result = any(v < expected for v in values)
+        elif operator == '<=':
+            result = any(v <= expected for v in values)
+        elif operator == 'like':
+            pattern = re.compile("^" + ".*".join(re.escape(p) for p in expected.split("%")) + "$")
+            result = any(pattern.match(str(v)) for v in values)
+        elif operator == 'contains':
+            result = any(expected in str(v) for v in values)
+        elif operator == 'isNull':
+            result = (len(values) == 0)
+        else:
+            result = False
+        if condition.get('negated', False):
+            return not result
+        return result
+
+    # Rendering
+
+    def getURL(self, rid):
+        return self.baseURL + IGC_REST + "/assets/" + rid
+
+    def renderReference(self, asset_type, idx):
+        rid = self.catalog.getRid(asset_type, idx)
+        return {
+            "_type": asset_type,
+            "_id": rid,
+            "_name": self.catalog.getName(asset_type, idx),
+            "_url": self.getURL(rid)
+        }
+
+    def renderContext(self, asset_type, idx):
+        context = []
+        for ctx_type, ctx_idx in self.catalog.getContext(asset_type, idx):
+            reference = self.renderReference(ctx_type, ctx_idx)
+            reference['_type'] = self.catalog.levels[ctx_type].context_type
+            context.append(reference)
+        return context
+
+    def renderAsset(self, asset_type, idx, properties, page_size=10):
+        asset = self.renderReference(asset_type, idx)
+        asset['_context'] = self.renderContext(asset_type, idx)
+        for prop in properties:
+            if "." in prop:
+                asset[prop] = self.catalog.getValues(asset_type, idx, prop)
+                continue
+            related = self.catalog.getRelated(asset_type, idx, prop)
+            if related is None:
+                value = self.catalog.getScalar(asset_type, idx, prop)
+                if value is not None:
+                    asset[prop] = value
+            elif related[0]:
+                asset[prop] = self.renderRelationshipPage(asset_type, idx, prop, 0, page_size)
+            elif len(related[1]) > 0:
+                asset[prop] = self.renderReference(related[1][0][0], related[1][0][1])
+            else:
+                asset[prop] = {}
+        return asset
+
+    def renderRelationshipPage(self, asset_type, idx, prop, begin, page_size):
+        related = self.catalog.getRelated(asset_type, idx, prop)[1]
+        end = min(begin + page_size, len(related))
+        paging = {
+            "numTotal": len(related),
+            "pageSize": page_size,
+            "begin": begin,
+            "end": end - 1
+        }
+        if end < len(related):
+            paging['next'] = "%s/%s?begin=%d&pageSize=%d" % (
+                self.getURL(self.catalog.getRid(asset_type, idx)), prop, end, page_size)
+        return {
+            "items": [self.renderReference(t, i) for t, i in related[begin:end]],
+            "paging": paging
+        }
+
+
+class FakeIGC(object):
+    """
+    Dispatches REST API requests against a SyntheticCatalog: returning a
+    (status, content type, body) tuple for every request, counting them by
+    endpoint and (optionally) injecting latency into each
+    """
+
+    def __init__(self, catalog, base_url="https://localhost:9446", latency=0.0, jitter=0.0, latency_per_item=0.0):
+        self.catalog = catalog
+        self.baseURL = base_url
+        self.engine = QueryEngine(catalog, base_url)
+        self.latency = latency
+        self.jitter = jitter
+        self.latencyPerItem = latency_per_item
+        self.random = random.Random(catalog.seed)
+        self.lock = threading.Lock()
+        self.requestCounts = {}
+        self.bytesSent = 0
+        self.bytesReceived = 0
+
+    def getStats(self):
+        with self.lock:
+            return {
+                "requests": sum(self.requestCounts.values()),
+                "by_endpoint": dict(self.requestCounts),
+                "bytes_received": self.bytesReceived,
+                "bytes_sent": self.bytesSent
+            }
+
+    def handle(self, method, url, body=None):
+        parts = urlsplit(url)
+        path = parts.path
+        params = dict((k, v[0]) for k, v in parse_qs(parts.query).items())
+        if body is not None and not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        status, content_type, response, items = self._dispatch(method.upper(), path, params, body)
+        if not isinstance(response, bytes):
+            if content_type == "application/json":
+                response = json.dumps(response)
+            response = response.encode('utf-8')
+        with self.lock:
+            endpoint = method.upper() + " " + re.sub(r'/assets/[^/]+', '/assets/{id}', path)
+            self.requestCounts[endpoint] = self.requestCounts.get(endpoint, 0) + 1
+            self.bytesReceived += len(body) if body is not None else 0
+            self.bytesSent += len(response)
+            delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter > 0 else 0)
+        delay += self.latencyPerItem * items
+        if delay > 0:
+            time.sleep(delay)
+        return status, content_type, response
+
+    def _dispatch(self, method, path, params, body):
+        if path.startswith(IGC_REST):
+            return self._dispatchIGC(method, path[len(IGC_REST):], params, body)
+        elif path.startswith(IA_REST):
+            return self._dispatchIA(method, path[len(IA_REST):], params, body)
+        return 404, "application/json", {"message": "Not found: " + path}, 0
+
+    def _dispatchIGC(self, method, path, params, body):
+        if path == "/search" and method == "POST":
+            result = self.engine.search(json.loads(body.decode('utf-8')))
+            return 200, "application/json", result, len(result['items'])
+        elif path == "/search" and method == "GET":
+            result = self.engine.getPage(params.get('cursor'), int(params.get('begin', 0)), int(params.get('pageSize', 10)))
+            if result is None:
+                return 400, "application/json", {"message": "Unknown cursor"}, 0
+            return 200, "application/json", result, len(result['items'])
+        elif path == "/types" and method == "GET":
+            types = [{"_id": t, "_name": level.display_name, "_url": self.baseURL + IGC_REST + "/types/" + t}
+                     for t, level in sorted(self.catalog.levels.items())]
+            return 200, "application/json", types, len(types)
+        elif path.startswith("/types/") and method == "GET":
+            asset_type = path[len("/types/"):]
+            if asset_type not in self.catalog.levels:
+                return 404, "application/json", {"message": "Unknown type: " + asset_type}, 0
+            props = [{"name": p, "displayName": p.replace("_", " ").title()}
+                     for p in self.catalog.getEditableProperties(asset_type)]
+            response = {
+                "_id": asset_type,
+                "_name": self.catalog.levels[asset_type].display_name,
+                "editInfo": {"properties": props}
+            }
+            if params.get('showViewProperties') == "true":
+                response['viewInfo'] = {"properties": [self._renderViewProperty(asset_type, p) for p in props]}
+            return 200, "application/json", response, 0
+        elif path.startswith("/assets/"):
+            return self._dispatchAsset(method, path[len("/assets/"):].split("/"), params, body)
+        elif path == "/bundles/assets" and method == "GET":
+            if params.get('family') != BUNDLE:
+                return 404, "application/json", {"message": "Unknown bundle"}, 0
+            return 200, "application/xml", self.getBundleXML(), 0
+        elif path == "/bundles/assets" and method == "POST":
+            ids = re.findall(r'ID="(ID_[^"]+)"', body.decode('utf-8'))
+            return 200, "application/json", dict((i, self._getCreatedRid(i[3:])) for i in ids), len(ids)
+        elif path.startswith("/workflow/") and method == "POST":
+            payload = json.loads(body.decode('utf-8'))
+            if self.catalog.takeWorkflowAction(payload.get('ids', []), path[len("/workflow/"):]):
+                return 200, "application/json", {}, len(payload.get('ids', []))
+            return 400, "application/json", {"message": "Invalid workflow action"}, 0
+        elif path == "/logout":
+            return 200, "application/json", {}, 0
+        return 404, "application/json", {"message": "Not found: " + path}, 0
+
+    def _renderViewProperty(self, asset_type, prop):
+        related_type = self.catalog.getRelatedType(asset_type, prop['name'])
+        view = dict(prop)
+        if related_type is not None:
+            view['type'] = {
+                "_id": related_type,
+                "_name": self.catalog.levels[related_type].display_name,
+                "_url": self.baseURL + IGC_REST + "/types/" + related_type
+            }
+            view['maxNumber'] = -1 if self.catalog.getRelated(asset_type, 0, prop['name'])[0] else 1
+        else:
+            view['type'] = {"_id": "string", "_name": "String"}
+            view['maxNumber'] = 1
+        return view
+
+    def _dispatchAsset(self, method, segments, params, body):
+        asset_type, idx = self.catalog.parseRid(segments[0])
+        if asset_type is None:
+            return 404, "application/json", {"message": "Unknown asset: " + segments[0]}, 0
+        if method == "GET" and len(segments) == 1:
+            props = ["short_description", "modified_on", "created_on"] + self.catalog.getEditableProperties(asset_type)
+            if asset_type in WORKFLOW_TYPES and self.catalog.isWorkflowEnabled():
+                props.append("workflow_current_state")
+            return 200, "application/json", self.engine.renderAsset(asset_type, idx, props), 1
+        elif method == "GET" and len(segments) == 2:
+            if self.catalog.getRelated(asset_type, idx, segments[1]) is None:
+                return 404, "application/json", {"message": "Unknown relationship: " + segments[1]}, 0
+            page = self.engine.renderRelationshipPage(asset_type, idx, segments[1],
+                                                      int(params.get('begin', 0)), int(params.get('pageSize', 10)))
+            return 200, "application/json", page, len(page['items'])
+        elif method == "PUT" and len(segments) == 1:
+            value = json.loads(body.decode('utf-8'))
+            if self.catalog.update(segments[0], value):
+                return 200, "application/json", self.engine.renderReference(asset_type, idx), 1
+            return 400, "application/json", {"message": "Unable to update"}, 0
+        return 405, "application/json", {"message": "Method not allowed"}, 0
+
+    def _getCreatedRid(self, oigc_id):
+        asset_type, idx = self.catalog.parseRid(oigc_id)
+        if asset_type is not None:
+            return oigc_id
+        with self.lock:
+            if oigc_id not in self.catalog.created:
+                self.catalog.created[oigc_id] = "c0ffee00.new.%d" % len(self.catalog.created)
+            return self.catalog.created[oigc_id]
+
+    def getBundleXML(self):
+        parts = ['<?xml version="1.0" encoding="UTF-8"?>\n<doc xmlns="http://www.ibm.com/iis/flow-doc">\n<assets>\n']
+        ids = []
+        for asset_type in [BUNDLE + "-Root", BUNDLE + "-Child", BUNDLE + "-Leaf"]:
+            level = self.catalog.levels[asset_type]
+            for idx in range(level.count):
+                rid = self.catalog.getRid(asset_type, idx)
+                ids.append("ID_" + rid)
+                reference = ""
+                parent = self.catalog.getParent(asset_type, idx)
+                if parent is not None:
+                    reference = '<reference name="%s" assetIDs="ID_%s"/>' % (
+                        parent[0], self.catalog.getRid(parent[0], parent[1]))
+                parts.append('<asset class="%s" repr="%s" ID="ID_%s"><attribute name="name" value="%s"/>%s</asset>\n' % (
+                    asset_type, self.catalog.getName(asset_type, idx), rid, self.catalog.getName(asset_type, idx), reference))
+        parts.append('</assets>\n<importAction partialAssetIDs="%s"/>\n</doc>\n' % " ".join(ids))
+        return "".join(parts)
+
+    def _dispatchIA(self, method, path, params, body):
+        ns = 'xmlns:iaapi="http://www.ibm.com/investigate/api/iaapi"'
+        if path == "/projects" and method == "GET":
+            return 200, "application/xml", '<iaapi:Projects %s><Project name="Synthetic"/></iaapi:Projects>' % ns, 1
+        elif path == "/project" and method == "GET":
+            if params.get('projectName') != "Synthetic":
+                return 404, "application/xml", "", 0
+            return 200, "application/xml", ('<iaapi:Projects %s><Project name="Synthetic">'
+                                            '<description>Synthetic project</description></Project></iaapi:Projects>' % ns), 1
+        elif path in ("/ruleDefinitions", "/executableRules", "/metrics") and method == "GET":
+            return 200, "application/xml", '<iaapi:Project %s name="%s"/>' % (ns, params.get('projectName', '')), 0
+        elif path == "/globalVariables" and method == "GET":
+            return 200, "application/xml", '<iaapi:Project %s/>' % ns, 0
+        elif path in ("/create", "/update") and method == "POST":
+            return 200, "application/xml", '<iaapi:Response %s status="ok"/>' % ns, 1
+        return 404, "application/xml", "", 0
+
+
+class FakeIGCAdapter(BaseAdapter):
+    """
+    A requests transport adapter that answers every request from a FakeIGC,
+    without any network traffic
+    """
+
+    def __init__(self, fake):
+        super(FakeIGCAdapter, self).__init__()
+        self.fake = fake
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        status, content_type, body = self.fake.handle(request.method, request.url, request.body)
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict({"Content-Type": content_type, "Content-Length": str(len(body))})
+        response._content = body
+        response._content_consumed = True
+        response.raw = io.BytesIO(body)
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response.reason = "OK" if status == 200 else "Error"
+        return response
+
+    def close(self):
+        pass
+
+
+# Mounts the adapter onto every requests.Session subsequently created (for the
+# base URL of the fake), so that modules can be run against it in-process
+def install(fake):
+    original_init = requests.Session.__init__
+
+    def init_with_fake(session, *args, **kwargs):
+        original_init(session, *args, **kwargs)
+        session.mount(fake.baseURL, FakeIGCAdapter(fake))
+
+    requests.Session.__init__ = init_with_fake
+    return original_init
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def make_server(fake, host="localhost", port=9446, certfile=None, keyfile=None):
+    class FakeIGCRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _respond(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length > 0 else None
+            status, content_type, response = fake.handle(self.command, fake.baseURL + self.path, body)
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(response)))
+            self.end_headers()
+            self.wfile.write(response)
+
+        do_GET = _respond
+        do_POST = _respond
+        do_PUT = _respond
+
+        def log_message(self, format, *args):
+            pass
+
+    server = _ThreadingHTTPServer((host, port), FakeIGCRequestHandler)
+    if certfile:
+        context = ssl.SSLContext(getattr(ssl, 'PROTOCOL_TLS_SERVER', ssl.PROTOCOL_SSLv23))
+        context.load_cert_chain(certfile, keyfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic IGC catalog over the IGC REST API")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=9446)
+    parser.add_argument("--certfile", help="certificate to serve HTTPS (required for use by the modules)")
+    parser.add_argument("--keyfile", help="private key of the certificate")
+    parser.add_argument("--size", type=int, default=1000, help="approximate number of assets in the catalog")
+    parser.add_argument("--fanout", type=int, default=10, help="children per parent in the data hierarchy")
+    parser.add_argument("--assignments", type=int, default=3, help="related assets per term / rule")
+    parser.add_argument("--workflow-ratio", type=float, default=0.0, help="fraction of glossary assets in workflow")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of latency added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="maximum seconds of random latency added")
+    parser.add_argument("--latency-per-item", type=float, default=0.0, help="seconds of latency per item returned")
+    args = parser.parse_args()
+    catalog = SyntheticCatalog(args.size, args.fanout, args.assignments, args.workflow_ratio)
+    scheme = "https" if args.certfile else "http"
+    fake = FakeIGC(catalog, "%s://%s:%d" % (scheme, args.host, args.port), args.latency, args.jitter, args.latency_per_item)
+    server = make_server(fake, args.host, args.port, args.certfile, args.keyfile)
+    print("Serving a synthetic catalog of %d assets on %s" % (sum(level.count for level in catalog.levels.values()), fake.baseURL))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
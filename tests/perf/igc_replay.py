@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+
+###
+# Copyright 2018 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+"""
+Replays the REST API traffic recorded from a real run of the modules (see
+module_utils/infosvr_recorder.py) against the same modules, without any
+server -- reporting any run that now makes more requests (or moves more
+bytes) than it did when recorded, or makes requests that were never recorded
+(eg. because the shape of a query has changed).
+
+To record (the variable must be set in the environment of the modules):
+
+    IBM_INFOSVR_IMPEXP_RECORD=/tmp/recorded.jsonl.gz ansible-playbook ...
+
+and then to replay every module run in the recording:
+
+    python igc_replay.py /tmp/recorded.jsonl.gz
+
+The replay can also be used in-process, in the same way as igc_fake_server:
+
+    replay = igc_replay.ReplayIGC(igc_replay.load_fixture(filename)[0]['interactions'])
+    igc_fake_server.install(replay)
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import argparse
+import gzip
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+
+try:
+    from urllib.parse import urlsplit
+except ImportError:
+    from urlparse import urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASE_URL = "https://fake:9446"
+BASE_URL_PLACEHOLDER = "{base_url}"
+# Arguments naming files that a module writes, which are redirected into a temporary directory on replay
+OUTPUT_ARGS = ["dest", "query_log", "trace_file"]
+
+
+# Reads a recording into a list of module runs, each with the module's name,
+# arguments and the (ordered) interactions of all of its sessions
+def load_fixture(filename):
+    if filename.endswith(".gz"):
+        f = io.TextIOWrapper(gzip.open(filename, 'rb'), encoding='utf-8') if sys.version_info[0] > 2 else gzip.open(filename, 'rb')
+    else:
+        f = io.open(filename, 'r', encoding='utf-8')
+    runs = []
+    runsById = {}
+    current = None
+    with f:
+        for line in f:
+            line = line.strip()
+            if line == "":
+                continue
+            entry = json.loads(line)
+            if 'session' in entry:
+                session = entry['session']
+                current = runsById.get(session['run'])
+                if current is None:
+                    current = {
+                        "module": session['module'],
+                        "args": session['args'],
+                        "apis": [],
+                        "interactions": []
+                    }
+                    runsById[session['run']] = current
+                    runs.append(current)
+                current['apis'].append(session['api'])
+            elif current is not None:
+                current['interactions'].append(entry)
+    return runs
+
+
+def _get_key(method, url, body):
+    return method.upper() + " " + url + " " + _normalise_body(body)
+
+
+def _normalise_body(body):
+    if body is None:
+        return ""
+    elif isinstance(body, dict) and 'json' in body:
+        return json.dumps(body['json'], sort_keys=True)
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', 'replace')
+    try:
+        return json.dumps(json.loads(body), sort_keys=True)
+    except ValueError:
+        return body
+
+
+class ReplayIGC(object):
+    """
+    Answers REST API requests from recorded interactions: each request is
+    matched (by method, URL and body) to the next recorded response for the
+    same request -- or the last one, once they are exhausted -- and any
+    request that was never recorded is answered with a 404
+    """
+
+    def __init__(self, interactions, base_url=BASE_URL):
+        self.baseURL = base_url
+        self.lock = threading.Lock()
+        self.responses = {}
+        self.served = {}
+        for interaction in interactions:
+            key = _get_key(interaction['method'], interaction['url'], interaction.get('body'))
+            self.responses.setdefault(key, []).append(interaction)
+        self.requestCounts = {}
+        self.bytesSent = 0
+        self.bytesReceived = 0
+        self.unmatched = []
+
+    def getStats(self):
+        with self.lock:
+            return {
+                "requests": sum(self.requestCounts.values()),
+                "by_endpoint": dict(self.requestCounts),
+                "bytes_received": self.bytesReceived,
+                "bytes_sent": self.bytesSent,
+                "unmatched": len(self.unmatched),
+                "unmatched_requests": self.unmatched[:10]
+            }
+
+    def handle(self, method, url, body=None):
+        recorded_url = url.replace(self.baseURL, BASE_URL_PLACEHOLDER)
+        key = _get_key(method, recorded_url, body)
+        with self.lock:
+            candidates = self.responses.get(key)
+            if candidates:
+                n = self.served.get(key, 0)
+                self.served[key] = n + 1
+                interaction = candidates[min(n, len(candidates) - 1)]
+                status, content_type = interaction['status'], interaction['type']
+                response = interaction['response']
+                if isinstance(response, dict) and 'json' in response:
+                    response = json.dumps(response['json'])
+                response = response.replace(BASE_URL_PLACEHOLDER, self.baseURL).encode('utf-8')
+            else:
+                self.unmatched.append(method.upper() + " " + recorded_url)
+                status, content_type, response = 404, "application/json", b'{"message": "not recorded"}'
+            endpoint = method.upper() + " " + re.sub(r'/assets/[^/]+', '/assets/{id}', urlsplit(url).path)
+            self.requestCounts[endpoint] = self.requestCounts.get(endpoint, 0) + 1
+            self.bytesReceived += len(body) if body is not None else 0
+            self.bytesSent += len(response)
+        return status, content_type, response
+
+
+# The requests and bytes of a run as recorded, for comparison with its replay
+def get_recorded_stats(run):
+    replay = ReplayIGC(run['interactions'])
+    for interaction in run['interactions']:
+        body = interaction.get('body')
+        if isinstance(body, dict) and 'json' in body:
+            body = json.dumps(body['json'])
+        replay.handle(interaction['method'], interaction['url'].replace(BASE_URL_PLACEHOLDER, BASE_URL), body)
+    return replay.getStats()
+
+
+def _find_regressions(recorded, replayed, tolerance):
+    regressions = []
+    if replayed.get('unmatched', 0) > 0:
+        regressions.append("%d requests were never recorded (eg. %s)" % (
+            replayed['unmatched'], replayed['unmatched_requests'][0]))
+    for measure in ["requests", "bytes_sent", "bytes_received"]:
+        if replayed.get(measure, 0) > recorded[measure] * (1 + tolerance):
+            regressions.append("%s increased from %d to %d" % (measure, recorded[measure], replayed[measure]))
+    return regressions
+
+
+def main():
+    if HERE not in sys.path:
+        sys.path.insert(0, HERE)
+    import benchmark
+
+    parser = argparse.ArgumentParser(description="Replay recorded REST API traffic against the modules")
+    parser.add_argument("fixture", help="recording (from IBM_INFOSVR_IMPEXP_RECORD) to replay")
+    parser.add_argument("--run", type=int, action="append", help="index of a module run to replay (default: all)")
+    parser.add_argument("--args", default="{}", help="JSON object of arguments overriding the recorded ones")
+    parser.add_argument("--tolerance", type=float, default=0.0, help="fractional increase allowed before failing")
+    parser.add_argument("--python", default=sys.executable, help="interpreter with which to run the modules")
+    parser.add_argument("--output", help="file into which to write the results (default: stdout)")
+    options = parser.parse_args()
+    options.timeout = 3600
+
+    runs = load_fixture(options.fixture)
+    indexes = options.run if options.run else range(len(runs))
+    overrides = json.loads(options.args)
+    workdir = tempfile.mkdtemp(prefix="infosvr-replay-")
+    results = []
+    try:
+        for idx in indexes:
+            run = runs[idx]
+            args = dict(run['args'])
+            for arg in OUTPUT_ARGS:
+                if args.get(arg):
+                    args[arg] = os.path.join(workdir, "%d_%s" % (idx, os.path.basename(args[arg])))
+            args.update(overrides)
+            spec = {"module": run['module'], "args": args, "fixture": options.fixture, "run": idx}
+            replayed = benchmark.run_spec(options, spec)
+            recorded = get_recorded_stats(run)
+            regressions = _find_regressions(recorded, replayed.get('requests', {}), options.tolerance)
+            if replayed['failed']:
+                regressions.insert(0, "module failed: %s" % (replayed.get('msg') or replayed.get('error', ''))[-500:])
+            results.append({
+                "run": idx,
+                "module": run['module'],
+                "recorded": recorded,
+                "replayed": replayed,
+                "regressions": regressions
+            })
+            sys.stderr.write("%3d %-30s %8d -> %8d requests %s\n" % (
+                idx, run['module'], recorded['requests'], replayed.get('requests', {}).get('requests', 0),
+                "; ".join(regressions) if regressions else "ok"))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    else:
+        print(json.dumps(results, indent=2, sort_keys=True))
+    sys.exit(1 if any(r['regressions'] for r in results) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+###
+# Copyright 2018 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+"""
+Makes the role's module_utils importable (as ansible.module_utils.*) and its
+modules runnable in-process, against the synthetic IGC REST API in tests/perf
+"""
+
+import importlib.util
+import io
+import json
+import os
+import sys
+
+import pytest
+
+ROLE = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+sys.path.insert(0, os.path.join(ROLE, "tests", "perf"))
+
+import ansible.module_utils  # noqa: E402
+if os.path.join(ROLE, "module_utils") not in ansible.module_utils.__path__:
+    ansible.module_utils.__path__.append(os.path.join(ROLE, "module_utils"))
+
+
+class _Module(object):
+    """A stand-in for AnsibleModule, for exercising the module_utils directly"""
+
+    def __init__(self):
+        self.warnings = []
+
+    def warn(self, msg):
+        self.warnings.append(msg)
+
+
+@pytest.fixture
+def module():
+    return _Module()
+
+
+IGC_ARGS = {"host": "fake", "port": "9446", "user": "tests", "password": "tests"}
+
+
+# Imports one of the role's modules (without running it)
+def _load_module(name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROLE, "library", name + ".py"))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+@pytest.fixture
+def load_module():
+    return _load_module
+
+
+# Runs one of the role's modules in-process with the arguments (along with
+# the connection details of the fake_igc), returning the module's result
+def _run_module(name, args):
+    from ansible.module_utils import basic
+    from ansible.module_utils._text import to_bytes
+    module_args = dict(IGC_ARGS)
+    module_args.update(args)
+    basic._ANSIBLE_ARGS = to_bytes(json.dumps({"ANSIBLE_MODULE_ARGS": module_args}))
+    if hasattr(basic, '_ANSIBLE_PROFILE'):
+        # (more recent versions of Ansible also expect the serialization profile of the arguments)
+        basic._ANSIBLE_PROFILE = "legacy"
+    mod = _load_module(name)
+    output = io.StringIO()
+    stdout = sys.stdout
+    sys.stdout = output
+    try:
+        mod.main()
+    except SystemExit:
+        pass
+    finally:
+        sys.stdout = stdout
+    return json.loads(output.getvalue().strip().splitlines()[-1])
+
+
+@pytest.fixture
+def run_module():
+    return _run_module
+
+
+# The (rough) number of assets in the fake_igc's catalog -- override it in a
+# test module that needs more of the hierarchy
+@pytest.fixture
+def catalog_size():
+    return 1000
+
+
+# The proportion of the fake_igc's glossary assets in the workflow (none, by
+# default) -- override it in a test module that exercises the workflow
+@pytest.fixture
+def workflow_ratio():
+    return 0.0
+
+
+# A synthetic catalog, served in-process to every requests.Session
+@pytest.fixture
+def fake_igc(catalog_size, workflow_ratio):
+    import requests
+    import igc_fake_server
+    catalog = igc_fake_server.SyntheticCatalog(catalog_size, workflow_ratio=workflow_ratio)
+    fake = igc_fake_server.FakeIGC(catalog, "https://fake:9446")
+    original_init = igc_fake_server.install(fake)
+    yield fake
+    requests.Session.__init__ = original_init
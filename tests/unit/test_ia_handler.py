@@ -0,0 +1,63 @@
+###
+# Copyright 2018 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+from ansible.module_utils.ia_handler import IAHandler, _resolve_replacements
+
+# A project whose data source name appears within its schema name
+PROJECT = """<?xml version="1.0" encoding="UTF-8"?>
+<iaapi:Project xmlns:iaapi="http://www.ibm.com/investigate/api/iaapi" name="P">
+  <DataSources>
+    <DataSource host="HOST1" name="SRCB"><Schema name="SCHSRCB"/></DataSource>
+  </DataSources>
+  <DataRuleDefinitions>
+    <DataRuleDefinition name="DEF" folder="F">
+      <ExecutableRules>
+        <ExecutableRule name="R" folder="F">
+          <BoundExpression>HOST1.SRCB.SCHSRCB.T.C exists</BoundExpression>
+        </ExecutableRule>
+      </ExecutableRules>
+    </DataRuleDefinition>
+  </DataRuleDefinitions>
+</iaapi:Project>
+"""
+
+
+def _apply_mappings(tmpdir, mappings):
+    project = tmpdir.join("project.xml")
+    project.write(PROJECT)
+    handler = IAHandler(None, {'replacements': 0, 'changed': False}, str(project))
+    handler.applyMappings(mappings)
+    return handler.root.xpath(".//ExecutableRule/BoundExpression")[0].text
+
+
+def test_name_within_another_name_is_not_replaced(tmpdir):
+    assert _apply_mappings(tmpdir, [
+        {"type": "DataSource", "attr": "name", "from": "SRCB", "to": "SRCC"},
+        {"type": "Schema", "attr": "name", "from": "SCH", "to": "S"}
+    ]) == "HOST1.SRCC.SSRCB.T.C exists"
+
+
+def test_chained_renames_are_propagated(tmpdir):
+    assert _apply_mappings(tmpdir, [
+        {"type": "DataSource", "attr": "host", "from": "HOST1", "to": "HOST2"},
+        {"type": "DataSource", "attr": "host", "from": "HOST2", "to": "HOST3"}
+    ]) == "HOST3.SRCB.SCHSRCB.T.C exists"
+
+
+def test_resolve_replacements():
+    assert _resolve_replacements([("A", "B"), ("C", "D"), ("B", "C"), ("A", "X")]) == \
+        {"A": "C", "B": "C", "C": "D"}
+    assert _resolve_replacements([("A", "B"), ("B", "A")]) == {"A": "A", "B": "A"}
@@ -0,0 +1,101 @@
+###
+# Copyright 2018 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+import json
+
+import pytest
+
+from igc_fake_server import BASE_TIME, TIME_SPAN
+
+
+# (enough of the hierarchy for several databases, each with several schemas)
+@pytest.fixture
+def catalog_size():
+    return 20000
+
+
+def _get_changes(run_module, asset_type, shape, conditions):
+    result = run_module('igc_get_changed_assets', {
+        "asset_type": asset_type,
+        "from_time": BASE_TIME,
+        "to_time": BASE_TIME + TIME_SPAN // 2,
+        "conditions": conditions,
+        "query_shape": shape
+    })
+    assert not result.get('failed'), result.get('msg')
+    return result
+
+
+@pytest.mark.parametrize("asset_type,conditions", [
+    ("database_schema", []),
+    ("database_schema", [{"property": "database.name", "operator": "=", "value": "Database_0"}]),
+    ("database", [{"property": "name", "operator": "=", "value": "Database_1"}])
+])
+def test_split_matches_combined(fake_igc, run_module, asset_type, conditions):
+    combined = _get_changes(run_module, asset_type, "combined", conditions)
+    split = _get_changes(run_module, asset_type, "split", conditions)
+    assert any(branch['rerooted_type'] is not None for branch in split['branches'])
+    assert combined['asset_count'] > 0
+    assert sorted(json.dumps(a, sort_keys=True) for a in split['assets']) == \
+        sorted(json.dumps(a, sort_keys=True) for a in combined['assets'])
+
+
+class _RestIGC(object):
+    """Returns the same related assets for every search"""
+
+    def __init__(self, related):
+        self.related = related
+
+    def search(self, query, get_all=True, minify=None, keep=None):
+        return self.related
+
+
+def test_reroot_onto_nearest_context(load_module):
+    igc_get_changed_assets = load_module('igc_get_changed_assets')
+    related = [{
+        "_id": "dm3",
+        "_type": "logical_entity",
+        "_context": [
+            {"_id": "dm1", "_type": "logical_data_model"},
+            {"_id": "dm2", "_type": "logical_data_model"}
+        ]
+    }]
+    branch = {
+        "path": "logical_entities",
+        "related_type": "logical_entity",
+        "conditions": [{"property": "logical_entities.modified_on", "operator": "between", "min": 0, "max": 1}]
+    }
+    reqJSON = {
+        "properties": [],
+        "types": ["logical_data_model"],
+        "where": {"conditions": [], "operator": "and"},
+        "pageSize": 10
+    }
+    found = igc_get_changed_assets.searchBranch(_RestIGC(related), reqJSON, "logical_data_model", branch)
+    assert found == {"rids": ["dm2"], "rerooted": True}
+
+
+@pytest.mark.parametrize("workers", [0, 1])
+def test_fewer_than_two_workers_search_in_turn(fake_igc, run_module, workers):
+    result = run_module('igc_get_changed_assets', {
+        "asset_types": ["database_schema", "database"],
+        "from_time": BASE_TIME,
+        "to_time": BASE_TIME + TIME_SPAN // 2,
+        "query_shape": "split",
+        "workers": workers
+    })
+    assert not result.get('failed'), result.get('msg')
+    assert result['asset_count'] > 0
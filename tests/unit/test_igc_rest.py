@@ -0,0 +1,89 @@
+###
+# Copyright 2018 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+import pytest
+import requests
+
+from ansible.module_utils.igc_rest import RestIGC
+
+
+class _Response(object):
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class _Session(object):
+    """Rejects (with the status or exception given) any workflow action that includes a bad RID"""
+
+    def __init__(self, bad_rids, failure):
+        self.bad_rids = bad_rids
+        self.failure = failure
+        self.posted = []
+
+    def request(self, method, url, json=None, auth=None):
+        self.posted.append(list(json['ids']))
+        if not any(rid in self.bad_rids for rid in json['ids']):
+            return _Response(200)
+        elif isinstance(self.failure, Exception):
+            raise self.failure
+        return _Response(self.failure)
+
+
+def _rest_igc(module, session):
+    igcrest = RestIGC.__new__(RestIGC)
+    igcrest.module = module
+    igcrest.baseURL = "https://fake:9446"
+    igcrest.username = "tests"
+    igcrest.password = "tests"
+    igcrest.session = session
+    return igcrest
+
+
+@pytest.mark.parametrize("failure", [409, 504, requests.exceptions.Timeout("timed out"), requests.exceptions.ConnectionError("reset")])
+def test_rejected_chunks_are_halved(module, failure):
+    session = _Session(["r5"], failure)
+    rids = ["r%d" % idx for idx in range(8)]
+    outcomes = _rest_igc(module, session).takeWorkflowActionInChunks(rids, "approve", chunk_size=8)
+    assert session.posted == [rids, rids[:4], rids[4:], ["r4", "r5"], ["r4"], ["r5"], ["r6", "r7"]]
+    assert [o['items'] for o in outcomes if not o['success'] and not o['retried']] == [["r5"]]
+
+
+def test_minimum_chunk_size_stops_halving(module):
+    session = _Session(["r5"], 500)
+    rids = ["r%d" % idx for idx in range(8)]
+    outcomes = _rest_igc(module, session).takeWorkflowActionInChunks(rids, "approve", chunk_size=8, min_chunk_size=2)
+    assert session.posted == [rids, rids[:4], rids[4:], ["r4", "r5"], ["r6", "r7"]]
+    assert [o['items'] for o in outcomes if not o['success'] and not o['retried']] == [["r4", "r5"]]
+
+
+@pytest.mark.parametrize("failure", [401, requests.exceptions.InvalidURL("bad")])
+def test_other_failures_are_not_retried(module, failure):
+    session = _Session(["r5"], failure)
+    rids = ["r%d" % idx for idx in range(8)]
+    outcomes = _rest_igc(module, session).takeWorkflowActionInChunks(rids, "approve", chunk_size=8)
+    assert session.posted == [rids]
+    assert len(outcomes) == 1 and not outcomes[0]['success']
+
+
+@pytest.mark.parametrize("size, expected", [(2, [3, 4]), (0, []), (-1, [0, 1, 2, 3, 4])])
+def test_query_log_keeps_most_recent(module, size, expected):
+    result = {'queries': []}
+    igcrest = RestIGC(module, result, "tests", "tests", "fake", "9446", False, query_log_size=size)
+    for idx in range(0, 5):
+        igcrest._logQuery('queries', idx, 'shape')
+    igcrest.recordMetrics()
+    assert result['queries'] == expected
+    assert result['query_summary'] == {'shape': 5}
@@ -0,0 +1,46 @@
+###
+# Copyright 2018 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+import pytest
+
+
+@pytest.fixture
+def workflow_ratio():
+    return 0.5
+
+
+def _compare(run_module, cache, from_state, action):
+    result = run_module('igc_workflow', {
+        "asset_type": "term",
+        "from_state": from_state,
+        "action": action,
+        "compared_to_published": "SAME_OR_NEW",
+        "batch_compare": True,
+        "fingerprint_cache": cache
+    })
+    assert not result.get('failed'), result.get('msg')
+    return result
+
+
+def test_second_run_reuses_fingerprints(fake_igc, run_module, tmpdir):
+    cache = str(tmpdir.join("fingerprints.json"))
+    first = _compare(run_module, cache, "DRAFT", "request")
+    assert first['asset_count'] > 0
+    assert first['fingerprints_reused'] == 0
+    # (the terms all relate to their parent_category, which is covered by their context)
+    second = _compare(run_module, cache, "WAITING_APPROVAL", "approve")
+    assert second['asset_count'] == first['asset_count']
+    assert second['fingerprints_reused'] == second['asset_count']
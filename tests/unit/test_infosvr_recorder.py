@@ -0,0 +1,89 @@
+###
+# Copyright 2018 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+import json
+
+from ansible.module_utils.infosvr_recorder import Recorder
+
+BASE_URL = "https://igc.example.com:9446"
+
+
+class _Module(object):
+    _name = "igc_extract_openigc_assets"
+    no_log_values = ["s3cr3t"]
+    params = {"host": "igc.example.com", "password": "s3cr3t", "bundle_name": "$Test", "cert": None, "dest": None}
+
+
+class _Request(object):
+    method = "GET"
+    url = BASE_URL + "/ibm/iis/igc-rest/v1/bundles/assets?family=$Test"
+    body = None
+
+
+class _StreamedResponse(object):
+    status_code = 200
+    headers = {"Content-Type": "application/xml"}
+    request = _Request()
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    def iter_content(self, chunk_size=1):
+        for chunk in self.chunks:
+            yield chunk
+
+    @property
+    def text(self):
+        raise AssertionError("a streamed response should never be read into memory")
+
+    def close(self):
+        self.closed = True
+
+
+class _Session(object):
+    def __init__(self, response):
+        self.response = response
+
+    def request(self, method, url, *args, **kwargs):
+        return self.response
+
+
+def _read_fixture(filename):
+    with open(filename) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_unset_args_are_not_recorded(tmpdir):
+    fixture = str(tmpdir.join("fixture.jsonl"))
+    Recorder(_Module(), _Session(None), BASE_URL, "igc", fixture)
+    assert _read_fixture(fixture)[0]['session']['args'] == {"bundle_name": "$Test"}
+
+
+def test_streamed_response_is_recorded_as_it_is_read(tmpdir):
+    fixture = str(tmpdir.join("fixture.jsonl"))
+    # (the secret and the server's address each span two chunks)
+    chunks = [b"<doc>s3c", b"r3t \xc3", b"\xa9 https://igc.exam", b"ple.com:9446/x</doc>"]
+    session = _Session(_StreamedResponse(chunks))
+    Recorder(_Module(), session, BASE_URL, "igc", fixture)
+    response = session.request("GET", _Request.url, stream=True)
+    assert b"".join(response.iter_content(chunk_size=8)) == b"".join(chunks)
+    response.close()
+    assert response.closed
+    entries = _read_fixture(fixture)
+    assert len(entries) == 2
+    assert entries[1]['response'] == u"<doc>******** é {base_url}/x</doc>"
+    assert entries[1]['url'] == "{base_url}/ibm/iis/igc-rest/v1/bundles/assets?family=$Test"
@@ -0,0 +1,36 @@
+###
+# Copyright 2018 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+from ansible.module_utils.infosvr_types import get_properties
+
+
+def test_properties_track_modified_on():
+    assert get_properties('table_definition') == ['data_source_name', 'data_source_type', 'modified_on']
+
+
+def test_label_properties_have_no_modified_on():
+    assert get_properties('label') == []
+
+
+def test_or_paths_track_modified_on_along_paths():
+    assert get_properties('stored_procedure_definition') == [
+        'modified_on',
+        'in_parameters.modified_on',
+        'out_parameters.modified_on',
+        'inout_parameters.modified_on',
+        'result_columns.modified_on'
+    ]
+    assert get_properties('database_table', ['database_columns']) == ['modified_on', 'database_columns.modified_on']
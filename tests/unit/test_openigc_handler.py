@@ -0,0 +1,133 @@
+###
+# Copyright 2018 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+from lxml import etree
+
+from ansible.module_utils.openigc_handler import OpenIGCHandler, OpenIGCStreamFilter, ns
+
+# A bundle where the field refers to its record from its first reference, and
+# to the (unrelated) lookup table from a second reference
+BUNDLE = """<?xml version="1.0" encoding="UTF-8"?>
+<doc xmlns="http://www.ibm.com/iis/flow-doc">
+  <assets>
+    <asset class="$Test-File" repr="file" ID="ID_file"/>
+    <asset class="$Test-Record" repr="record" ID="ID_record">
+      <reference name="$File" assetIDs="ID_file"/>
+    </asset>
+    <asset class="$Test-Lookup" repr="lookup" ID="ID_lookup"/>
+    <asset class="$Test-Field" repr="field" ID="ID_field">
+      <reference name="$Record" assetIDs="ID_record"/>
+      <reference name="$Lookup" assetIDs="ID_lookup"/>
+    </asset>
+  </assets>
+  <importAction partialAssetIDs="ID_file ID_record ID_lookup ID_field"/>
+</doc>
+"""
+
+# A bundle where the field's second reference is to a lookup that is deeper
+# in its own hierarchy than the field's parent
+DEEP_LOOKUP_BUNDLE = """<?xml version="1.0" encoding="UTF-8"?>
+<doc xmlns="http://www.ibm.com/iis/flow-doc">
+  <assets>
+    <asset class="$Test-File" repr="file" ID="ID_file"/>
+    <asset class="$Test-Record" repr="record" ID="ID_record">
+      <reference name="$File" assetIDs="ID_file"/>
+    </asset>
+    <asset class="$Test-Field" repr="field" ID="ID_field">
+      <reference name="$Record" assetIDs="ID_record"/>
+      <reference name="$Lookup" assetIDs="ID_lookup"/>
+    </asset>
+    <asset class="$Test-Catalog" repr="catalog" ID="ID_catalog"/>
+    <asset class="$Test-Schema" repr="schema" ID="ID_schema">
+      <reference name="$Catalog" assetIDs="ID_catalog"/>
+    </asset>
+    <asset class="$Test-Lookup" repr="lookup" ID="ID_lookup">
+      <reference name="$Schema" assetIDs="ID_schema"/>
+    </asset>
+  </assets>
+  <importAction partialAssetIDs="ID_file ID_record ID_field ID_catalog ID_schema ID_lookup"/>
+</doc>
+"""
+
+
+def _write_bundle(tmpdir, content=BUNDLE):
+    bundle = tmpdir.join("bundle.xml")
+    bundle.write(content)
+    return str(bundle)
+
+
+def test_parent_from_first_reference(tmpdir, module):
+    handler = OpenIGCHandler(module, {}, _write_bundle(tmpdir))
+    assert handler.parentByRid == {'record': 'file', 'field': 'record'}
+
+
+def test_children_from_every_reference(tmpdir, module):
+    stream_filter = OpenIGCStreamFilter(module, {}, _write_bundle(tmpdir))
+    assert stream_filter.childrenByRid == {'file': ['record'], 'record': ['field'], 'lookup': ['field']}
+
+
+def test_keep_children_referring_from_second_reference(tmpdir, module):
+    stream_filter = OpenIGCStreamFilter(module, {}, _write_bundle(tmpdir))
+    partial, complete = stream_filter.getAssetsToKeep(['lookup'], [])
+    assert partial == ['lookup', 'field']
+    assert complete == []
+    # (the parent of an asset is still only that of its first reference)
+    assert stream_filter.parentByRid == {'record': 'file', 'field': 'record'}
+
+
+def test_waves_follow_every_reference(tmpdir, module):
+    handler = OpenIGCHandler(module, {}, _write_bundle(tmpdir, DEEP_LOOKUP_BUNDLE))
+    waves = handler.getUploadChunks(1, [])
+    wave_by_rid = dict((rid, idx) for idx, wave in enumerate(waves) for chunk in wave for rid in chunk)
+    assert wave_by_rid['field'] > wave_by_rid['lookup'] > wave_by_rid['schema'] > wave_by_rid['catalog']
+    assert wave_by_rid['field'] > wave_by_rid['record'] > wave_by_rid['file']
+
+
+def test_chunks_are_self_contained(tmpdir, module):
+    handler = OpenIGCHandler(module, {}, _write_bundle(tmpdir, DEEP_LOOKUP_BUNDLE))
+    e_root = etree.fromstring(handler.getChunkAsString(['field'], []))
+    ids = [e_asset.get("ID") for e_asset in e_root.xpath("./x:assets/x:asset", namespaces=ns)]
+    for e_ref in e_root.xpath("./x:assets/x:asset/x:reference", namespaces=ns):
+        assert e_ref.get("assetIDs") in ids
+    # (every referenced asset precedes the assets that refer to it)
+    assert ids.index("ID_catalog") < ids.index("ID_schema") < ids.index("ID_lookup") < ids.index("ID_field")
+    assert ids.index("ID_file") < ids.index("ID_record") < ids.index("ID_field")
+    e_importAction = e_root.xpath("./x:importAction", namespaces=ns)[0]
+    assert sorted(e_importAction.get("partialAssetIDs").split(" ")) == sorted(ids)
+
+
+def test_filtered_bundle_declares_namespace_once(tmpdir, module):
+    stream_filter = OpenIGCStreamFilter(module, {}, _write_bundle(tmpdir))
+    filtered = str(tmpdir.join("filtered.xml"))
+    assert stream_filter.writeFilteredXML(filtered, ['file', 'record', 'field'], []) == 3
+    with open(filtered) as f:
+        content = f.read()
+    assert content.count("xmlns=") == 1
+    e_root = etree.fromstring(content.encode('utf-8'))
+    ids = [e_asset.get("ID") for e_asset in e_root.xpath("./x:assets/x:asset", namespaces=ns)]
+    assert ids == ['ID_file', 'ID_record', 'ID_field']
+    assert len(e_root.xpath("./x:assets/x:asset/x:reference", namespaces=ns)) == 3
+    e_importAction = e_root.xpath("./x:importAction", namespaces=ns)[0]
+    assert e_importAction.get("partialAssetIDs") == "ID_file ID_record ID_field"
+
+
+def test_warn_multiple_references_only_when_kept(tmpdir, module):
+    stream_filter = OpenIGCStreamFilter(module, {}, _write_bundle(tmpdir))
+    assert module.warnings == []
+    stream_filter.writeFilteredXML(str(tmpdir.join("without.xml")), ['file', 'record'], [])
+    assert module.warnings == []
+    stream_filter.writeFilteredXML(str(tmpdir.join("with.xml")), ['file', 'record', 'field'], [])
+    assert module.warnings == ["Multiple references found for: field"]
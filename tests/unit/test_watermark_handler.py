@@ -0,0 +1,28 @@
+###
+# Copyright 2018 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+from ansible.module_utils.watermark_handler import WatermarkHandler
+
+
+def test_watermark_includes_paths_up_to_to_time(module, tmpdir):
+    watermarks = WatermarkHandler(module, {}, str(tmpdir.join("state.json")))
+    summary = watermarks.track('tests', 'application', {})
+    summary['to_time'] = 100
+    watermarks.observeAssets(summary['key'], [
+        {"_id": "a1", "modified_on": 10, "object_types.modified_on": [20, 50]},
+        {"_id": "a2", "modified_on": 30, "object_types.modified_on": [], "object_types.methods.modified_on": [150, 60]}
+    ])
+    assert summary['current'] == 60